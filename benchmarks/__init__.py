@@ -0,0 +1 @@
+# Benchmarks voor de factuurtool; draai vanuit de repo-root met `python -m benchmarks.<naam>`.
@@ -0,0 +1,78 @@
+# Benchmark: laden van het historie-dashboard bij een groeiende historie, met de oude
+# JOIN/GROUP BY over alle resultaten vs. de samenvattingstabel + gepagineerde runlijst.
+#
+#   python -m benchmarks.bench_dashboard --runs 100 400 1600 --rijen-per-run 200
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from factuurtool.historie import historie_totalen, init_db, lees_runs, maak_run, voeg_resultaten_toe
+
+from .bench_historie import maak_resultaten
+
+OUDE_QUERY = """
+    SELECT r.id AS run_id, r.ts, r.label,
+           COUNT(res.id) AS regels,
+           SUM(CASE WHEN res.status = '❌ Afwijking' THEN 1 ELSE 0 END) AS afwijkingen,
+           SUM(CASE WHEN res.status = '✅ Binnen marge' THEN 1 ELSE 0 END) AS binnen_marge
+    FROM runs r
+    LEFT JOIN results res ON res.run_id = r.id
+    GROUP BY r.id, r.ts, r.label
+    ORDER BY r.id DESC
+"""
+
+
+def dashboard_oud(db_path: str):
+    con = sqlite3.connect(db_path)
+    try:
+        pd.read_sql_query("SELECT id, ts, COALESCE(label, '') AS label FROM runs ORDER BY id DESC", con)
+        df = pd.read_sql_query(OUDE_QUERY, con)
+    finally:
+        con.close()
+    return len(df), int(df["regels"].sum())
+
+
+def dashboard_nieuw(db_path: str):
+    totalen = historie_totalen(db_path)
+    lees_runs(db_path, limiet=25, offset=0)
+    return totalen["runs"], totalen["regels"]
+
+
+def meet(functie, db_path: str, herhalingen: int = 5) -> float:
+    duur = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        functie(db_path)
+        duur.append(time.perf_counter() - start)
+    return min(duur)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark laden van het historie-dashboard.")
+    parser.add_argument("--runs", type=int, nargs="+", default=[100, 400, 1600])
+    parser.add_argument("--rijen-per-run", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    df = maak_resultaten(args.rijen_per_run)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        con = init_db(db_path)
+        aantal = 0
+        for doel in sorted(args.runs):
+            with con:
+                for _ in range(doel - aantal):
+                    voeg_resultaten_toe(con, maak_run(con, "benchmark"), df)
+            aantal = doel
+            assert dashboard_oud(db_path) == dashboard_nieuw(db_path)
+            oud, nieuw = meet(dashboard_oud, db_path), meet(dashboard_nieuw, db_path)
+            print(f"{aantal:>6} runs  {aantal * args.rijen_per_run:>9} rijen   oud {oud * 1000:8.1f} ms   nieuw {nieuw * 1000:8.1f} ms")
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
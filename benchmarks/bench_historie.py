@@ -0,0 +1,111 @@
+# Benchmark: opslaan van een run in de SQLite-historie, rijgewijs (oude methode) vs. bulk.
+#
+#   python -m benchmarks.bench_historie --rijen 20000
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from factuurtool.historie import RESULT_KOLOMMEN, init_db, save_run_and_results
+
+
+def maak_resultaten(n: int, seed: int = 1) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    statussen = ["✅ Binnen marge", "❌ Afwijking", "⚠️ Bedrag niet gevonden", "⚠️ Onbekende taakcode"]
+    rows = []
+    for i in range(n):
+        code = str(rnd.randint(10**7, 10**10))
+        prijs = round(rnd.uniform(1, 500), 2)
+        aantal = rnd.choice([1.0, 2.0, 3.5, 10.0])
+        gevonden = None if rnd.random() < 0.1 else round(prijs * aantal * rnd.uniform(0.95, 1.05), 2)
+        rows.append({
+            "Bestandsnaam": f"Leverancier {i // 40}.pdf",
+            "Factuurnummer": f"2025{i // 40:06d}",
+            "Taakcode_gevonden": code,
+            "Taakcode": code,
+            "Fuzzy_score": 100.0,
+            "Aantal (geschat)": aantal,
+            "Omschrijving": "WONING PER RUIMTE BESCHERMEN/AFDEKKEN",
+            "Totaalprijs boek": prijs,
+            "Verwacht bedrag": round(prijs * aantal, 2),
+            "Prijs op factuur (som)": gevonden,
+            "Afwijking": None if gevonden is None else round(abs(gevonden - prijs * aantal), 2),
+            "Status": rnd.choice(statussen),
+            "Regels": f"{code} WONING PER RUIMTE BESCHERMEN/AFDEKKEN {aantal:.2f} ruimte € {prijs:.2f}",
+            "Verwerkingsmethode": "PDF-tabel",
+        })
+    return pd.DataFrame(rows)
+
+
+def save_rijgewijs(db_path: str, run_label: str, df: pd.DataFrame):
+    """De oorspronkelijke implementatie (iterrows + één INSERT per rij, rollback-journal)."""
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=DELETE")
+    cur = con.cursor()
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur.execute("INSERT INTO runs (ts, label) VALUES (?, ?)", (ts, run_label or None))
+    run_id = cur.lastrowid
+    for _, row in df[RESULT_KOLOMMEN].iterrows():
+        cur.execute(
+            """
+            INSERT INTO results (
+                run_id, bestandsnaam, taakcode_gevonden, taakcode_gematcht, fuzzy_score,
+                aantal_geschat, omschrijving, totaalprijs_boek, verwacht_bedrag,
+                prijs_op_factuur, afwijking, status, regels, verwerkingsmethode
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                run_id,
+                row["Bestandsnaam"],
+                row["Taakcode_gevonden"],
+                row["Taakcode"],
+                None if pd.isna(row.get("Fuzzy_score", None)) else float(row.get("Fuzzy_score")),
+                float(row["Aantal (geschat)"]) if pd.notna(row["Aantal (geschat)"]) else None,
+                row["Omschrijving"],
+                float(row["Totaalprijs boek"]) if pd.notna(row["Totaalprijs boek"]) else None,
+                float(row["Verwacht bedrag"]) if pd.notna(row["Verwacht bedrag"]) else None,
+                float(row["Prijs op factuur (som)"]) if pd.notna(row["Prijs op factuur (som)"]) else None,
+                float(row["Afwijking"]) if pd.notna(row["Afwijking"]) else None,
+                row["Status"],
+                row["Regels"],
+                row["Verwerkingsmethode"],
+            ),
+        )
+    con.commit()
+    con.close()
+    return run_id
+
+
+def meet(functie, df: pd.DataFrame) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path).close()
+        if functie is save_rijgewijs:
+            # vergelijk met de oude situatie zonder WAL
+            con = sqlite3.connect(db_path)
+            con.execute("PRAGMA journal_mode=DELETE")
+            con.close()
+        start = time.perf_counter()
+        functie(db_path, "benchmark", df)
+        return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark opslag van resultaten in de SQLite-historie.")
+    parser.add_argument("--rijen", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    df = maak_resultaten(args.rijen)
+    for naam, functie in [("rijgewijs (oud)", save_rijgewijs), ("bulk (executemany)", save_run_and_results)]:
+        duur = meet(functie, df)
+        print(f"{naam:<20} {args.rijen:>8} rijen  {duur:8.3f} s  {args.rijen / duur:>10,.0f} rijen/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Benchmark van de OCR-profielen: doorvoer vs. nauwkeurigheid op gescande facturen met bekende
+# inhoud (schone scans en fax-achtige kopieën, zie benchmarks/corpus.py).
+#
+#   python -m benchmarks.bench_ocr --aantal 10 --uitvoer ocr.json
+#   python -m benchmarks.bench_ocr --profielen snel nauwkeurig --soorten fax
+#   python -m benchmarks.bench_ocr --voorbeelden "Kernbouw*.pdf"
+#
+# Per profiel en soort:
+#   pagina's/s       doorvoer van process_pdf_path (routering, probe als het profiel die heeft, OCR, matching; zonder cache)
+#   codes            aandeel van de taakcodes op de factuur dat gevonden is
+#   bedragen         aandeel van de taakcodes waarvan ook het factuurbedrag exact klopt
+#
+# Met --voorbeelden draait de meting op de echte voorbeeldfacturen (zonder bekende inhoud): per
+# profiel pagina's/s en het aantal gevonden taakcodes uit het prijzenboek. Vooraf, zonder
+# tesseract, per profiel met een regio: hoeveel tekstregels (inktbanden) op die pagina's binnen de
+# regio vallen, erdoor doorgesneden worden of erbuiten vallen.
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import pdfplumber
+
+from factuurtool.resultaten import STATUS_ONBEKENDE_TAAKCODE
+from factuurtool.verwerking import OCR_PROFIELEN, laad_prijzenboek, normalize_code, process_pdf_path
+
+from .corpus import STANDAARD_PRIJZENBOEK, _laad_prijzen, maak_regels, schrijf_scan_pdf
+
+SCAN_SOORTEN = ("scan", "fax")
+VOORBEELDEN_MAP = os.path.dirname(STANDAARD_PRIJZENBOEK)
+
+
+def maak_scans(map_pad: str, aantal: int, soorten, seed: int, prijzenboek_pad: str):
+    """Gescande facturen met de verwachte bedragen per taakcode: [(pad, soort, paginas, {code: bedrag})]."""
+    rnd = random.Random(seed)
+    prijzen = _laad_prijzen(prijzenboek_pad)
+    scans = []
+    for i in range(aantal):
+        soort = soorten[i % len(soorten)]
+        factuurnummer = f"2025{i:06d}"
+        regels = maak_regels(prijzen, rnd, rnd.randint(8, 30))
+        pad = os.path.join(map_pad, f"{soort} {factuurnummer}.pdf")
+        paginas = schrijf_scan_pdf(pad, regels, factuurnummer, fax=(soort == "fax"))
+        verwacht = defaultdict(float)
+        for regel in regels:
+            verwacht[normalize_code(regel.code)] += regel.bedrag
+        scans.append((pad, soort, paginas, {code: round(bedrag, 2) for code, bedrag in verwacht.items()}))
+    return scans
+
+
+def meet_profiel(naam: str, scans, prijzenboek):
+    per_soort = defaultdict(lambda: {"facturen": 0, "paginas": 0, "seconden": 0.0, "codes": 0, "gevonden": 0, "bedrag_goed": 0})
+    for pad, soort, paginas, verwacht in scans:
+        start = time.perf_counter()
+        rows = process_pdf_path(pad, prijzenboek, use_fuzzy=False, fuzzy_threshold=100, ocr_profiel=naam)
+        duur = time.perf_counter() - start
+        gevonden = {r["Taakcode"]: r["Prijs op factuur (som)"] for r in rows if r["Taakcode"] in verwacht}
+        s = per_soort[soort]
+        s["facturen"] += 1
+        s["paginas"] += paginas
+        s["seconden"] += duur
+        s["codes"] += len(verwacht)
+        s["gevonden"] += len(gevonden)
+        s["bedrag_goed"] += sum(1 for code, bedrag in gevonden.items() if bedrag is not None and abs(bedrag - verwacht[code]) <= 0.01)
+    metingen = []
+    for soort, s in per_soort.items():
+        metingen.append({
+            "profiel": naam,
+            "soort": soort,
+            "facturen": s["facturen"],
+            "paginas": s["paginas"],
+            "seconden": round(s["seconden"], 3),
+            "paginas_per_s": round(s["paginas"] / s["seconden"], 3) if s["seconden"] else None,
+            "codes": round(s["gevonden"] / s["codes"], 3) if s["codes"] else None,
+            "bedragen": round(s["bedrag_goed"] / s["codes"], 3) if s["codes"] else None,
+        })
+    return metingen
+
+
+def _inktbanden(image, donker: int = 160, gat: int = 3):
+    """Tekstregels op een gerenderde pagina als (boven, onder, links, rechts) in fracties van de pagina."""
+    inkt = image.convert("L").point(lambda v: 255 if v < donker else 0)
+    breedte, hoogte = inkt.size
+    banden = []
+    for y in range(hoogte):
+        # meest linkse en rechtse donkere pixel in deze pixelrij (None zonder inkt)
+        bbox = inkt.crop((0, y, breedte, y + 1)).getbbox()
+        if bbox is None:
+            continue
+        links, rechts = bbox[0], bbox[2]
+        if banden and y - banden[-1][1] <= gat:
+            boven, _, b_links, b_rechts = banden[-1]
+            banden[-1] = (boven, y + 1, min(links, b_links), max(rechts, b_rechts))
+        else:
+            banden.append((y, y + 1, links, rechts))
+    return [(boven / hoogte, onder / hoogte, links / breedte, rechts / breedte) for boven, onder, links, rechts in banden]
+
+
+def meet_regio(paden, regio, resolutie: int = 100):
+    """Tekstregels van de pagina's binnen, doorgesneden door en buiten een regio (links, boven, rechts, onder)."""
+    links, boven, rechts, onder = regio
+    telling = {"paginas": 0, "binnen": 0, "doorgesneden": 0, "buiten": 0, "doorgesneden_op": []}
+    for pad in paden:
+        with pdfplumber.open(pad) as pdf:
+            for paginanr, page in enumerate(pdf.pages, start=1):
+                telling["paginas"] += 1
+                for b_boven, b_onder, b_links, b_rechts in _inktbanden(page.to_image(resolution=resolutie).original):
+                    if b_onder <= boven or b_boven >= onder or b_rechts <= links or b_links >= rechts:
+                        telling["buiten"] += 1
+                    elif b_boven >= boven and b_onder <= onder and b_links >= links and b_rechts <= rechts:
+                        telling["binnen"] += 1
+                    else:
+                        telling["doorgesneden"] += 1
+                        telling["doorgesneden_op"].append(f"{os.path.basename(pad)} p{paginanr} y={b_boven:.3f}-{b_onder:.3f}")
+    return telling
+
+
+def meet_voorbeelden(naam: str, paden, prijzenboek):
+    """Doorvoer en gevonden taakcodes (uit het prijzenboek) van een profiel op de voorbeeldfacturen."""
+    paginas, seconden, codes = 0, 0.0, 0
+    for pad in paden:
+        metingen = {}
+        start = time.perf_counter()
+        rows = process_pdf_path(pad, prijzenboek, use_fuzzy=False, fuzzy_threshold=100, metingen=metingen, ocr_profiel=naam)
+        seconden += time.perf_counter() - start
+        paginas += metingen.get("paginas") or 0
+        codes += len({r["Taakcode"] for r in rows if r["Status"] != STATUS_ONBEKENDE_TAAKCODE})
+    return {
+        "profiel": naam,
+        "soort": "voorbeeld",
+        "facturen": len(paden),
+        "paginas": paginas,
+        "seconden": round(seconden, 3),
+        "paginas_per_s": round(paginas / seconden, 3) if seconden else None,
+        "codes": codes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark van de OCR-profielen (doorvoer vs. nauwkeurigheid).")
+    parser.add_argument("--aantal", type=int, default=10, help="Aantal gescande facturen.")
+    parser.add_argument("--soorten", nargs="+", default=list(SCAN_SOORTEN), choices=SCAN_SOORTEN)
+    parser.add_argument("--profielen", nargs="+", default=list(OCR_PROFIELEN), choices=list(OCR_PROFIELEN))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prijzenboek", default=STANDAARD_PRIJZENBOEK)
+    parser.add_argument("--uitvoer", default=None, help="Schrijf de metingen als JSON naar dit bestand.")
+    parser.add_argument("--voorbeelden", default=None, metavar="PATROON",
+                        help=f"Meet op echte facturen (glob, relatief aan {VOORBEELDEN_MAP}) in plaats van het synthetische corpus.")
+    args = parser.parse_args(argv)
+
+    with open(args.prijzenboek, "rb") as fh:
+        prijzenboek = laad_prijzenboek(fh.read())
+    metingen = []
+    regio_metingen = {}
+    if args.voorbeelden:
+        paden = sorted(glob.glob(os.path.join(VOORBEELDEN_MAP, args.voorbeelden)))
+        if not paden:
+            print(f"Geen voorbeeldfacturen gevonden voor {args.voorbeelden!r}.", file=sys.stderr)
+            return 2
+        for naam in args.profielen:
+            if OCR_PROFIELEN[naam].regio:
+                regio_metingen[naam] = meet_regio(paden, OCR_PROFIELEN[naam].regio)
+                r = regio_metingen[naam]
+                print(f"regio {naam}: {r['paginas']} pagina's, tekstregels binnen {r['binnen']}, doorgesneden {r['doorgesneden']}, buiten {r['buiten']}")
+                for plek in r["doorgesneden_op"]:
+                    print(f"  doorgesneden: {plek}")
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.voorbeelden:
+            scans = maak_scans(tmp, args.aantal, tuple(args.soorten), args.seed, args.prijzenboek)
+        for naam in args.profielen:
+            try:
+                if args.voorbeelden:
+                    metingen.append(meet_voorbeelden(naam, paden, prijzenboek))
+                else:
+                    metingen.extend(meet_profiel(naam, scans, prijzenboek))
+            except Exception as e:
+                print(f"OCR niet beschikbaar ({type(e).__name__}: {e}); installeer poppler en tesseract.", file=sys.stderr)
+                return 2
+
+    if args.voorbeelden:
+        print(f"{'profiel':<14} {'pagina/s':>9} {'codes':>7}")
+        for m in metingen:
+            print(f"{m['profiel']:<14} {m['paginas_per_s'] or 0:>9.2f} {m['codes']:>7}")
+    else:
+        print(f"{'profiel':<14} {'soort':<6} {'pagina/s':>9} {'codes':>7} {'bedragen':>9}")
+        for m in metingen:
+            print(f"{m['profiel']:<14} {m['soort']:<6} {m['paginas_per_s'] or 0:>9.2f} {m['codes']:>7.1%} {m['bedragen']:>9.1%}")
+
+    if args.uitvoer:
+        with open(args.uitvoer, "w", encoding="utf-8") as fh:
+            json.dump({
+                "tijdstip": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "profielen": {naam: OCR_PROFIELEN[naam]._asdict() for naam in args.profielen},
+                "voorbeelden": args.voorbeelden,
+                "regio": regio_metingen,
+                "metingen": metingen,
+            }, fh, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
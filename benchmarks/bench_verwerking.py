@@ -0,0 +1,215 @@
+# Benchmarksuite voor de verwerking: genereert een synthetisch corpus (zie benchmarks/corpus.py)
+# en meet per stap de doorvoer. Resultaten gaan als JSON naar --uitvoer; met --vergelijk wordt
+# een eerdere meting ernaast gezet (regressie als een stap meer dan --drempel trager is).
+#
+#   python -m benchmarks.bench_verwerking --aantal 30 --uitvoer bench.json
+#   python -m benchmarks.bench_verwerking --aantal 30 --vergelijk bench.json
+#
+# Stappen:
+#   tekstextractie   pdfplumber (woorden één keer, daaruit tabelrijen + tekstregels) op PDF's met tekstlaag
+#   ocr              extractie van gescande PDF's: routering per pagina, renderen + tesseract
+#                    (overgeslagen zonder poppler/tesseract)
+#   codedetectie     taakcodes zoeken + regel-index opbouwen op de geëxtraheerde regels
+#   matching         process_pdf_path met de extractie uit geheugen (prijzenboek, aantallen, bedragen)
+#   choose_line_amount / extract_bedragen_with_flags   per regel, zonder regelcache
+#   historie         alle resultaatregels (samengevoegde ResultaatBouwer) als één run opslaan in SQLite
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from factuurtool.historie import save_run_and_results
+from factuurtool.resultaten import voeg_samen
+from factuurtool.verwerking import (
+    RegelIndex,
+    choose_line_amount,
+    detecteer_codes,
+    extract_bedragen_with_flags,
+    extraheer_regels_en_codes,
+    laad_prijzenboek,
+    process_pdf_path,
+    scan_regel,
+)
+
+from .corpus import SOORTEN, STANDAARD_PRIJZENBOEK, genereer_corpus
+
+
+def piek_rss_mb():
+    if resource is None:
+        return None
+    piek = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux rapporteert in KB, macOS in bytes
+    return round(piek / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class GeheugenCache:
+    """Extractiecache in het geheugen (zelfde interface als ExtractieCache) om extractie over te slaan."""
+
+    def __init__(self, extracties):
+        self._extracties = extracties
+
+    @staticmethod
+    def sleutel_voor_pad(path, instellingen, vingerafdruk=None):
+        return path
+
+    def get(self, sleutel):
+        return self._extracties.get(sleutel)
+
+    def put(self, sleutel, *extractie):
+        self._extracties[sleutel] = extractie
+
+
+def meet_stap(naam, functie, items, regels_van=None):
+    """Voer functie(item) uit voor alle items; geeft een meting (dict) en de uitkomsten terug."""
+    uitkomsten = []
+    start = time.perf_counter()
+    for item in items:
+        uitkomsten.append(functie(item))
+    duur = time.perf_counter() - start
+    regels = sum(regels_van(u) for u in uitkomsten) if regels_van else len(items)
+    return {
+        "stap": naam,
+        "seconden": round(duur, 4),
+        "facturen": len(items),
+        "regels": regels,
+        "facturen_per_s": round(len(items) / duur, 2) if duur else None,
+        "regels_per_s": round(regels / duur, 1) if duur else None,
+        "piek_rss_mb": piek_rss_mb(),
+    }, uitkomsten
+
+
+def draai(corpus, prijzenboek):
+    metingen = []
+    tekst_pdfs = [b.pad for b in corpus if b.soort != "scan"]
+    scan_pdfs = [b.pad for b in corpus if b.soort == "scan"]
+
+    meting, extracties = meet_stap("tekstextractie", extraheer_regels_en_codes, tekst_pdfs, lambda e: len(e[0]))
+    metingen.append(meting)
+    extracties = dict(zip(tekst_pdfs, extracties))
+
+    if scan_pdfs:
+        try:
+            meting, scan_extracties = meet_stap("ocr", extraheer_regels_en_codes, scan_pdfs, lambda e: len(e[0]))
+            metingen.append(meting)
+            extracties.update(zip(scan_pdfs, scan_extracties))
+        except Exception as e:
+            metingen.append({"stap": "ocr", "overgeslagen": f"{type(e).__name__}: {e}"})
+
+    paden = list(extracties)
+    regels_per_pdf = [extracties[p][0] for p in paden]
+    meting, _ = meet_stap(
+        "codedetectie",
+        lambda regels: (detecteer_codes("\n".join(regels)), RegelIndex(regels)),
+        regels_per_pdf,
+        lambda u: len(u[1].regels),
+    )
+    metingen.append(meting)
+
+    cache = GeheugenCache(extracties)
+    scan_regel.cache_clear()
+    meting, resultaten = meet_stap(
+        "matching",
+        lambda p: process_pdf_path(p, prijzenboek, use_fuzzy=False, fuzzy_threshold=100, cache=cache),
+        paden,
+    )
+    # regels/s hier: geëxtraheerde regels die de matching doorloopt
+    alle_regels = [r for regels in regels_per_pdf for r in regels]
+    meting["regels"] = len(alle_regels)
+    meting["regels_per_s"] = round(len(alle_regels) / meting["seconden"], 1) if meting["seconden"] else None
+    metingen.append(meting)
+
+    # Regel-niveau: elke geëxtraheerde regel met de prijs van een willekeurige (vaste) taakcode
+    prijs = next(iter(prijzenboek.values())).prijs
+    for naam, functie in [
+        ("choose_line_amount", lambda r: choose_line_amount(r, prijs)),
+        ("extract_bedragen_with_flags", extract_bedragen_with_flags),
+    ]:
+        scan_regel.cache_clear()
+        meting, _ = meet_stap(naam, functie, alle_regels)
+        meting["facturen"] = len(paden)
+        meting["facturen_per_s"] = round(len(paden) / meting["seconden"], 2) if meting["seconden"] else None
+        metingen.append(meting)
+
+    rows = voeg_samen(resultaten)
+    with tempfile.TemporaryDirectory() as tmp:
+        meting, _ = meet_stap("historie", lambda r: save_run_and_results(os.path.join(tmp, "bench.db"), "benchmark", r), [rows], lambda _: len(rows))
+        meting["facturen"] = len(paden)
+        meting["facturen_per_s"] = round(len(paden) / meting["seconden"], 2) if meting["seconden"] else None
+        metingen.append(meting)
+    return metingen
+
+
+def vergelijk(metingen, basis, drempel: float):
+    """Print de verhouding tot een eerdere meting; geeft het aantal regressies terug."""
+    basis_per_stap = {m["stap"]: m for m in basis.get("metingen", [])}
+    regressies = 0
+    for m in metingen:
+        b = basis_per_stap.get(m["stap"])
+        if not b or "seconden" not in m or "seconden" not in b or not b["seconden"]:
+            continue
+        factor = m["seconden"] / b["seconden"]
+        regressie = factor > 1 + drempel
+        regressies += regressie
+        print(f"  {m['stap']:<28} {b['seconden']:>9.3f} s -> {m['seconden']:>9.3f} s  x{factor:5.2f}{'  REGRESSIE' if regressie else ''}")
+    return regressies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark van de factuurverwerking op een synthetisch corpus.")
+    parser.add_argument("--aantal", type=int, default=30, help="Aantal facturen in het corpus.")
+    parser.add_argument("--soorten", nargs="+", default=list(SOORTEN), choices=SOORTEN)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prijzenboek", default=STANDAARD_PRIJZENBOEK)
+    parser.add_argument("--corpus", default=None, help="Map voor het corpus (standaard een tijdelijke map).")
+    parser.add_argument("--uitvoer", default=None, help="Schrijf de metingen als JSON naar dit bestand.")
+    parser.add_argument("--vergelijk", default=None, help="Eerdere JSON-meting om mee te vergelijken.")
+    parser.add_argument("--drempel", type=float, default=0.2, help="Relatieve vertraging die als regressie telt.")
+    args = parser.parse_args(argv)
+
+    with open(args.prijzenboek, "rb") as fh:
+        prijzenboek = laad_prijzenboek(fh.read())
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = genereer_corpus(args.corpus or tmp, args.aantal, tuple(args.soorten), args.seed, args.prijzenboek)
+        metingen = draai(corpus, prijzenboek)
+
+    for m in metingen:
+        if "overgeslagen" in m:
+            print(f"{m['stap']:<28} overgeslagen ({m['overgeslagen']})")
+            continue
+        print(
+            f"{m['stap']:<28} {m['seconden']:>9.3f} s  {m['facturen_per_s'] or 0:>9.1f} facturen/s  "
+            f"{m['regels_per_s'] or 0:>11,.0f} regels/s  piek RSS {m['piek_rss_mb']} MB"
+        )
+
+    resultaat = {
+        "tijdstip": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {"aantal": args.aantal, "soorten": args.soorten, "seed": args.seed, "pdfs": [b._asdict() for b in corpus]},
+        "metingen": metingen,
+    }
+    if args.uitvoer:
+        with open(args.uitvoer, "w", encoding="utf-8") as fh:
+            json.dump(resultaat, fh, indent=2, ensure_ascii=False)
+    if args.vergelijk:
+        with open(args.vergelijk, "r", encoding="utf-8") as fh:
+            basis = json.load(fh)
+        print(f"Vergelijking met {args.vergelijk} ({basis.get('tijdstip')}):")
+        if vergelijk(metingen, basis, args.drempel):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# Synthetisch factuurcorpus voor benchmarks, offline te genereren zonder externe tools.
+#
+# Drie soorten PDF's, naar het voorbeeld van de Kernbouw/Toekomstservice-facturen:
+#   tekst     - tekstlaag met een tabel (Aantal | Eenh. | Omschrijving + taakcode | BTW | Prijs | Bedrag)
+#   scan      - dezelfde factuur als afbeelding zonder tekstlaag (gaat via OCR)
+#   afschrift - meerpagina-overzicht in tekstvorm zonder tabelranden, plus een pagina voorwaarden
+# Taakcodes en prijzen komen uit het prijzenboek; een deel van de regels wijkt bewust af.
+#
+#   python -m benchmarks.corpus --map /tmp/corpus --aantal 30
+
+import argparse
+import os
+import random
+from collections import namedtuple
+
+import pandas as pd
+
+from factuurtool.verwerking import build_prijzenboek_lookup, normalize_code
+
+SOORTEN = ("tekst", "scan", "afschrift")
+STANDAARD_PRIJZENBOEK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Prijzenboek.xlsx")
+
+FactuurRegel = namedtuple("FactuurRegel", ["aantal", "eenheid", "code", "omschrijving", "btw", "prijs", "bedrag"])
+CorpusBestand = namedtuple("CorpusBestand", ["pad", "soort", "paginas", "regels"])
+
+VOORWAARDEN = [
+    "Op al onze leveringen zijn de algemene voorwaarden van toepassing.",
+    "Betaling binnen 30 dagen na factuurdatum onder vermelding van het factuurnummer.",
+    "Bij niet tijdige betaling is de wettelijke handelsrente verschuldigd.",
+    "Reclames dienen binnen 8 dagen na ontvangst schriftelijk te worden gemeld.",
+    "Loonkostenbestanddeel en G-rekening conform de Wet ketenaansprakelijkheid.",
+]
+
+
+def _euro(bedrag: float) -> str:
+    return f"{bedrag:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _laad_prijzen(prijzenboek_pad: str):
+    df = pd.read_excel(prijzenboek_pad)
+    index = build_prijzenboek_lookup(df)
+    eenheden = dict(zip(df["Taakcode"].astype(str).map(normalize_code), df["Eenheid"].astype(str)))
+    return [(code, info.prijs, info.omschrijving, eenheden.get(code, "st")) for code, info in index.items()]
+
+
+def maak_regels(prijzen, rnd: random.Random, aantal: int, afwijkend: float = 0.2):
+    regels = []
+    for _ in range(aantal):
+        code, prijs, omschrijving, eenheid = rnd.choice(prijzen)
+        hoeveelheid = rnd.choice([1.0, 2.0, 3.0, 1.5, 10.0, 19.0])
+        if rnd.random() < afwijkend:
+            prijs = round(prijs * rnd.choice([0.9, 1.1, 1.25]), 2)
+        regels.append(FactuurRegel(
+            hoeveelheid, eenheid, code, omschrijving[:45].title(), rnd.choice("HL"), prijs, round(hoeveelheid * prijs, 2),
+        ))
+    return regels
+
+
+# ---------- Minimale PDF-schrijver (Helvetica, lijnen) ----------
+
+def _tekst(x, y, s, grootte=8):
+    s = s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"BT /F1 {grootte} Tf {x} {y} Td ({s}) Tj ET"
+
+
+def schrijf_tekst_pdf(pad: str, paginas):
+    """Schrijf een PDF waarvan elke pagina een lijst PDF-operatoren is (A4, Helvetica)."""
+    objecten = []
+
+    def voeg_toe(inhoud):
+        objecten.append(inhoud)
+        return len(objecten)
+
+    font = voeg_toe(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = voeg_toe(None)
+    kids = []
+    for operatoren in paginas:
+        stroom = "\n".join(operatoren).encode("cp1252", "replace")
+        inhoud = voeg_toe(b"<< /Length %d >>\nstream\n" % len(stroom) + stroom + b"\nendstream")
+        kids.append(voeg_toe(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font, inhoud)
+        ))
+    objecten[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    catalogus = voeg_toe(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    uit = b"%PDF-1.4\n"
+    posities = []
+    for i, obj in enumerate(objecten, 1):
+        posities.append(len(uit))
+        uit += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(uit)
+    uit += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objecten) + 1)
+    uit += b"".join(b"%010d 00000 n \n" % p for p in posities)
+    uit += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objecten) + 1, catalogus, xref)
+    with open(pad, "wb") as fh:
+        fh.write(uit)
+
+
+def _kop(factuurnummer: str, leverancier: str):
+    return [
+        _tekst(40, 800, leverancier, 14),
+        _tekst(40, 740, "FACTUUR", 12),
+        _tekst(40, 715, "Datum:"), _tekst(140, 715, "28-03-2025"),
+        _tekst(40, 703, "Factuurnummer:"), _tekst(140, 703, factuurnummer),
+        _tekst(40, 691, "Werkorder:"), _tekst(140, 691, "042534-0197"),
+        _tekst(300, 703, "Werkadres:"), _tekst(380, 703, "Rijnlaan 102 te Heemstede"),
+    ]
+
+
+def tekst_paginas(regels, factuurnummer: str, leverancier: str = "KernBouw", per_pagina: int = 20):
+    """Kernbouw-achtige factuur: tabel met randen, taakcode vooraan in de omschrijving."""
+    kolommen = [40, 85, 120, 380, 410, 480, 555]
+    paginas = []
+    for start in range(0, max(1, len(regels)), per_pagina):
+        ops = _kop(factuurnummer, leverancier) + ["0.5 w"]
+        y = 650
+        kop = ["Aantal", "Eenh.", "Omschrijving", "BTW", "Prijs", "Bedrag"]
+        for tekst, x in zip(kop, kolommen):
+            ops.append(_tekst(x + 2, y + 4, tekst))
+        for regel in regels[start:start + per_pagina]:
+            y -= 16
+            cellen = [_euro(regel.aantal), regel.eenheid, f"{regel.code} {regel.omschrijving}", regel.btw, f"{_euro(regel.prijs)} €", f"{_euro(regel.bedrag)} €"]
+            for tekst, x in zip(cellen, kolommen):
+                ops.append(_tekst(x + 2, y + 4, tekst))
+        for rij_y in range(y, 667, 16):
+            ops.append(f"{kolommen[0]} {rij_y} m {kolommen[-1]} {rij_y} l S")
+        for x in kolommen:
+            ops.append(f"{x} {y} m {x} 666 l S")
+        paginas.append(ops)
+    paginas[-1].append(_tekst(380, y - 30, f"Totaalbedrag EUR {_euro(sum(r.bedrag for r in regels))}"))
+    paginas[-1].append(_tekst(40, y - 50, "IBAN NL03 RABO 0190 1071 97  KvK 28.100.062"))
+    return paginas
+
+
+def afschrift_paginas(regels, factuurnummer: str, per_pagina: int = 25):
+    """Toekomstservice-achtig overzicht over meerdere pagina's: vrije tekst, geen tabelranden."""
+    paginas = []
+    for start in range(0, max(1, len(regels)), per_pagina):
+        ops = _kop(factuurnummer, "ToekomstGroep")
+        y = 660
+        for regel in regels[start:start + per_pagina]:
+            ops.append(_tekst(40, y, f"{_euro(regel.aantal)} {regel.eenheid}"))
+            ops.append(_tekst(100, y, f"{regel.code} {regel.omschrijving}"))
+            ops.append(_tekst(380, y, f"€ {_euro(regel.prijs)}"))
+            ops.append(_tekst(470, y, f"{_euro(regel.bedrag)} {regel.btw}"))
+            y -= 22
+        paginas.append(ops)
+    paginas[-1] += [
+        _tekst(300, y - 20, f"Subtotaal EUR {_euro(sum(r.bedrag for r in regels))}"),
+        _tekst(40, y - 40, "Loonkostenbestanddeel 100% | G-rekening NL29 RABO 0991 2523 30"),
+    ]
+    paginas.append([_tekst(40, 800 - 14 * i, zin) for i, zin in enumerate(VOORWAARDEN * 4)])
+    return paginas
+
+
+def _als_fax(img, rnd: random.Random):
+    """Maak een gescande pagina fax-achtig: halve resolutie, zwart-wit en wat ruis."""
+    from PIL import Image
+
+    klein = img.resize((img.width // 2, img.height // 2), Image.BILINEAR)
+    zwartwit = klein.point(lambda v: 0 if v < 160 else 255)
+    pixels = zwartwit.load()
+    for _ in range(zwartwit.width * zwartwit.height // 400):
+        pixels[rnd.randrange(zwartwit.width), rnd.randrange(zwartwit.height)] = 0
+    return zwartwit
+
+
+def schrijf_scan_pdf(pad: str, regels, factuurnummer: str, dpi: int = 150, fax: bool = False):
+    """Dezelfde factuur als gerenderde afbeelding zonder tekstlaag (zoals een gescande PDF).
+
+    Met fax=True op halve resolutie, zwart-wit en met ruis (zoals een doorgefaxte factuur).
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    schaal = dpi / 72
+    try:
+        font = ImageFont.load_default(size=int(9 * schaal))
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    afbeeldingen = []
+    for ops in tekst_paginas(regels, factuurnummer):
+        img = Image.new("L", (int(595 * schaal), int(842 * schaal)), 255)
+        teken = ImageDraw.Draw(img)
+        for op in ops:
+            if op.startswith("BT"):
+                # "BT /F1 8 Tf x y Td (tekst) Tj ET" -> tekst op (x, y) met y van onder
+                kop, _, rest = op.partition("Td (")
+                x, y = (float(v) for v in kop.split()[-2:])
+                tekst = rest.rsplit(") Tj", 1)[0].replace("\\(", "(").replace("\\)", ")").replace("\\\\", "\\")
+                teken.text((x * schaal, (842 - y - 8) * schaal), tekst, fill=0, font=font)
+            elif op.endswith(" l S"):
+                x1, y1, _, x2, y2, _, _ = op.split()
+                teken.line([(float(x1) * schaal, (842 - float(y1)) * schaal), (float(x2) * schaal, (842 - float(y2)) * schaal)], fill=0)
+        afbeeldingen.append(_als_fax(img, random.Random(factuurnummer)) if fax else img)
+    resolutie = dpi / 2 if fax else dpi
+    afbeeldingen[0].save(pad, "PDF", resolution=resolutie, save_all=True, append_images=afbeeldingen[1:])
+    return len(afbeeldingen)
+
+
+def genereer_corpus(map_pad: str, aantal: int = 30, soorten=SOORTEN, seed: int = 1, prijzenboek_pad: str = STANDAARD_PRIJZENBOEK,
+                    regels_per_factuur=(8, 40)):
+    """Genereer `aantal` PDF's (soorten om en om) in map_pad; geeft [CorpusBestand] terug."""
+    os.makedirs(map_pad, exist_ok=True)
+    rnd = random.Random(seed)
+    prijzen = _laad_prijzen(prijzenboek_pad)
+    corpus = []
+    for i in range(aantal):
+        soort = soorten[i % len(soorten)]
+        factuurnummer = f"2025{i:06d}"
+        regels = maak_regels(prijzen, rnd, rnd.randint(*regels_per_factuur))
+        pad = os.path.join(map_pad, f"{soort} {factuurnummer}.pdf")
+        if soort == "tekst":
+            paginas = tekst_paginas(regels, factuurnummer)
+            schrijf_tekst_pdf(pad, paginas)
+            aantal_paginas = len(paginas)
+        elif soort == "afschrift":
+            paginas = afschrift_paginas(regels, factuurnummer)
+            schrijf_tekst_pdf(pad, paginas)
+            aantal_paginas = len(paginas)
+        else:
+            aantal_paginas = schrijf_scan_pdf(pad, regels, factuurnummer)
+        corpus.append(CorpusBestand(pad, soort, aantal_paginas, len(regels)))
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genereer een synthetisch factuurcorpus.")
+    parser.add_argument("--map", required=True)
+    parser.add_argument("--aantal", type=int, default=30)
+    parser.add_argument("--soorten", nargs="+", default=list(SOORTEN), choices=SOORTEN)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prijzenboek", default=STANDAARD_PRIJZENBOEK)
+    args = parser.parse_args(argv)
+    corpus = genereer_corpus(args.map, args.aantal, tuple(args.soorten), args.seed, args.prijzenboek)
+    for bestand in corpus:
+        print(f"{bestand.soort:<10} {bestand.paginas:>3} p. {bestand.regels:>4} regels  {bestand.pad}")
+
+
+if __name__ == "__main__":
+    main()
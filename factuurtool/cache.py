@@ -0,0 +1,146 @@
+# Persistente extractiecache: hergebruik de (dure) pdfplumber/OCR-extractie per PDF-inhoud.
+# De cache staat in de SQLite-historie (zelfde bestand als runs/results) en is daardoor gedeeld
+# tussen Streamlit-reruns, sessies en worker-processen.
+
+import json
+import sqlite3
+import time
+
+from .historie import vingerafdruk_bestand
+from .uploads import PdfInGeheugen
+
+STANDAARD_MAX_BYTES = 200 * 1024 * 1024
+# 'laatst_gebruikt' wordt bij een hit alleen bijgewerkt als het langer dan dit (s) geleden is:
+# genoeg voor de LRU-volgorde, zonder schrijftransactie per opzoeking.
+GEBRUIK_RESOLUTIE = 3600
+
+
+class ExtractieCache:
+    """Cache van (regels_gevonden, gevonden_codes, verwerkingsmethode) per PDF.
+
+    De sleutel is de vingerafdruk van de PDF-inhoud (dezelfde als voor de registratie van verwerkte
+    bestanden, zie historie.vingerafdruk_bestand) plus de extractie-/OCR-instellingen. Als de totale
+    grootte boven max_bytes komt, worden de minst recent gebruikte items verwijderd. Een opzoeking
+    schrijft niets: hits en misses telt de scan zelf (ook die uit worker-processen) en schrijft ze na
+    afloop in één keer bij met tel().
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = STANDAARD_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = int(max_bytes)
+        con = self._connect()
+        try:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extractie_cache (
+                    sleutel TEXT PRIMARY KEY,
+                    regels TEXT NOT NULL,
+                    codes TEXT NOT NULL,
+                    methode TEXT NOT NULL,
+                    grootte INTEGER NOT NULL,
+                    laatst_gebruikt REAL NOT NULL
+                )
+                """
+            )
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extractie_cache_teller (
+                    naam TEXT PRIMARY KEY,
+                    waarde INTEGER NOT NULL
+                )
+                """
+            )
+            con.execute("INSERT OR IGNORE INTO extractie_cache_teller(naam, waarde) VALUES ('hits', 0), ('misses', 0)")
+            con.commit()
+        finally:
+            con.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def sleutel_voor_pad(path, instellingen: str, vingerafdruk: str = None) -> str:
+        """Cachesleutel; met een al berekende vingerafdruk wordt het bestand niet opnieuw gelezen."""
+        if vingerafdruk is None:
+            vingerafdruk = path.vingerafdruk if isinstance(path, PdfInGeheugen) else vingerafdruk_bestand(path)
+        return f"{vingerafdruk}|{instellingen}"
+
+    def get(self, sleutel: str):
+        con = self._connect()
+        try:
+            row = con.execute("SELECT regels, codes, methode, laatst_gebruikt FROM extractie_cache WHERE sleutel = ?", (sleutel,)).fetchone()
+            nu = time.time()
+            if row and nu - row[3] > GEBRUIK_RESOLUTIE:
+                with con:
+                    con.execute("UPDATE extractie_cache SET laatst_gebruikt = ? WHERE sleutel = ?", (nu, sleutel))
+        finally:
+            con.close()
+        if not row:
+            return None
+        return json.loads(row[0]), json.loads(row[1]), row[2]
+
+    def tel(self, hits: int, misses: int):
+        """Hits en misses van een scan bij de tellers optellen (één transactie per scan)."""
+        if not hits and not misses:
+            return
+        con = self._connect()
+        try:
+            with con:
+                con.executemany(
+                    "UPDATE extractie_cache_teller SET waarde = waarde + ? WHERE naam = ?",
+                    ((int(hits), "hits"), (int(misses), "misses")),
+                )
+        finally:
+            con.close()
+
+    def put(self, sleutel: str, regels, codes, methode: str):
+        regels_json = json.dumps(list(regels), ensure_ascii=False)
+        codes_json = json.dumps(list(codes))
+        grootte = len(regels_json.encode("utf-8")) + len(codes_json) + len(sleutel)
+        if grootte > self.max_bytes:
+            return
+        con = self._connect()
+        try:
+            con.execute(
+                "INSERT OR REPLACE INTO extractie_cache(sleutel, regels, codes, methode, grootte, laatst_gebruikt) VALUES (?, ?, ?, ?, ?, ?)",
+                (sleutel, regels_json, codes_json, methode, grootte, time.time()),
+            )
+            self._evict(con)
+            con.commit()
+        finally:
+            con.close()
+
+    def _evict(self, con):
+        totaal = con.execute("SELECT COALESCE(SUM(grootte), 0) FROM extractie_cache").fetchone()[0]
+        if totaal <= self.max_bytes:
+            return
+        weg = []
+        for sleutel, grootte in con.execute("SELECT sleutel, grootte FROM extractie_cache ORDER BY laatst_gebruikt ASC"):
+            if totaal <= self.max_bytes:
+                break
+            weg.append((sleutel,))
+            totaal -= grootte
+        con.executemany("DELETE FROM extractie_cache WHERE sleutel = ?", weg)
+
+    def statistieken(self) -> dict:
+        con = self._connect()
+        try:
+            tellers = dict(con.execute("SELECT naam, waarde FROM extractie_cache_teller").fetchall())
+            items, grootte = con.execute("SELECT COUNT(*), COALESCE(SUM(grootte), 0) FROM extractie_cache").fetchone()
+        finally:
+            con.close()
+        return {
+            "hits": int(tellers.get("hits", 0)),
+            "misses": int(tellers.get("misses", 0)),
+            "items": int(items),
+            "bytes": int(grootte),
+        }
+
+    def leeg(self):
+        con = self._connect()
+        try:
+            con.execute("DELETE FROM extractie_cache")
+            con.execute("UPDATE extractie_cache_teller SET waarde = 0")
+            con.commit()
+        finally:
+            con.close()
@@ -0,0 +1,173 @@
+# Headless entry point: verwerk een inbox zonder Streamlit, bijv. vanuit cron of een queue-worker.
+#
+#   python -m factuurtool scan --folder /pad/naar/inbox --prijzenboek Prijzenboek.xlsx --db factuurtool_history.db
+
+import argparse
+import os
+import sys
+
+from .cache import STANDAARD_MAX_BYTES, ExtractieCache
+from .export import EXPORT_FORMATEN, exporteer_run
+from .historie import init_db, laatste_run, save_run_and_results
+from .planner import ScanPlanner, map_bron
+from .scan import (
+    maak_factuur_summary,
+    maak_metingen_df,
+    maak_resultaat_df,
+    overgeslagen_paginas,
+    schrijf_excel,
+    voer_scan_uit,
+    zoek_pdfs,
+)
+from .verwerking import OCR_PROFIELEN, STANDAARD_OCR_PROFIEL, laad_prijzenboek
+
+
+def _voortgang(afgerond, totaal, tekst):
+    print(f"[{afgerond}/{totaal}] {tekst}", file=sys.stderr, flush=True)
+
+
+def cmd_scan(args) -> int:
+    if not os.path.isdir(args.folder):
+        print(f"Map bestaat niet: {args.folder}", file=sys.stderr)
+        return 2
+    with open(args.prijzenboek, "rb") as fh:
+        prijzenboek = laad_prijzenboek(fh.read())
+    print(f"Prijzenboek versie {prijzenboek.versie} ({len(prijzenboek)} taakcodes)", file=sys.stderr)
+
+    cache = None if args.geen_cache else ExtractieCache(args.db, max_bytes=args.cache_mb * 1024 * 1024)
+    paths = zoek_pdfs(args.folder)
+    fouten = []
+    metingen = []
+    all_rows = voer_scan_uit(
+        paths,
+        prijzenboek,
+        args.db,
+        controleer_ingestie=not args.alles,
+        workers=args.workers,
+        bij_voortgang=None if args.stil else _voortgang,
+        bij_fout=lambda path, fout: fouten.append((path, fout)),
+        metingen=metingen,
+        aggregeer_per_taakcode=True,
+        TOLERANTIE=args.tolerantie,
+        use_fuzzy=False,
+        fuzzy_threshold=100,
+        cache=cache,
+        ocr_profiel=args.ocr_profiel,
+    )
+    for path, fout in fouten:
+        print(f"Fout bij verwerken van {os.path.basename(path)}: {fout}", file=sys.stderr)
+    metingen_df = maak_metingen_df(metingen)
+    for bestand, aantal in overgeslagen_paginas(metingen_df):
+        print(f"Overgeslagen pagina's in {bestand}: {aantal} (leeg of zonder taakcodes)", file=sys.stderr)
+
+    if not all_rows:
+        print("Geen nieuwe resultaten.", file=sys.stderr)
+        return 1 if fouten else 0
+
+    resultaat_df = maak_resultaat_df(all_rows)
+    factuur_summary = maak_factuur_summary(resultaat_df, args.tolerantie)
+    if not args.stil:
+        stappen = metingen_df.filter(like="(s)").sum().round(2)
+        print("Tijd per stap (s): " + ", ".join(f"{k[:-4]} {v}" for k, v in stappen.items() if v), file=sys.stderr)
+    if args.excel:
+        schrijf_excel(args.excel, all_rows, factuur_summary, metingen_df)
+        print(f"Excel geschreven: {args.excel}", file=sys.stderr)
+    if not args.geen_historie:
+        run_id = save_run_and_results(args.db, args.label, all_rows, metingen_df)
+        print(f"Run opgeslagen in historie (run_id={run_id}).", file=sys.stderr)
+    print(f"{len(factuur_summary)} facturen, {len(resultaat_df)} regels.")
+    return 1 if fouten else 0
+
+
+def cmd_planner(args) -> int:
+    if not os.path.isdir(args.folder):
+        print(f"Map bestaat niet: {args.folder}", file=sys.stderr)
+        return 2
+    with open(args.prijzenboek, "rb") as fh:
+        prijzenboek = laad_prijzenboek(fh.read())
+    cache = None if args.geen_cache else ExtractieCache(args.db, max_bytes=args.cache_mb * 1024 * 1024)
+
+    planner = ScanPlanner(args.db)
+    planner.configureer(
+        map_bron(args.folder),
+        prijzenboek,
+        interval=args.interval * 60,
+        label=args.label,
+        workers=args.workers,
+        aggregeer_per_taakcode=True,
+        TOLERANTIE=args.tolerantie,
+        use_fuzzy=False,
+        fuzzy_threshold=100,
+        cache=cache,
+        ocr_profiel=args.ocr_profiel,
+    )
+    print(f"Planner gestart: {args.folder} elke {args.interval} min (Ctrl+C om te stoppen).", file=sys.stderr)
+    planner.draai()
+    return 0
+
+
+def cmd_export(args) -> int:
+    init_db(args.db).close()
+    if args.run == "laatste":
+        run = laatste_run(args.db)
+        if run is None:
+            print("Geen bewaarde runs in de historie.", file=sys.stderr)
+            return 1
+        run_id = run[0]
+    else:
+        run_id = int(args.run)
+    formaat = args.formaat or os.path.splitext(args.uitvoer)[1].lstrip(".").lower()
+    if formaat not in EXPORT_FORMATEN:
+        print(f"Onbekend exportformaat '{formaat}'; gebruik --formaat ({', '.join(EXPORT_FORMATEN)}).", file=sys.stderr)
+        return 2
+    exporteer_run(args.db, run_id, args.uitvoer, formaat, args.tolerantie)
+    print(f"Run {run_id} geëxporteerd naar {args.uitvoer} ({formaat}).", file=sys.stderr)
+    return 0
+
+
+def bouw_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="factuurtool", description="Factuurcontrole zonder Streamlit-UI.")
+    sub = parser.add_subparsers(dest="commando", required=True)
+
+    scan = sub.add_parser("scan", help="Verwerk alle PDF's in een map en sla de run op.")
+    scan.add_argument("--folder", required=True, help="Map met facturen (*.pdf, recursief).")
+    scan.add_argument("--prijzenboek", required=True, help="Prijzenboek (.xlsx).")
+    scan.add_argument("--db", default="factuurtool_history.db", help="SQLite historie-database.")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Aantal parallelle processen.")
+    scan.add_argument("--tolerantie", type=float, default=0.05, help="Toegestane afwijking in euro.")
+    scan.add_argument("--label", default=None, help="Run label in de historie.")
+    scan.add_argument("--excel", default=None, help="Schrijf resultaten ook naar dit .xlsx-bestand.")
+    scan.add_argument("--alles", action="store_true", help="Ook reeds verwerkte bestanden opnieuw verwerken.")
+    scan.add_argument("--geen-historie", action="store_true", help="Run niet opslaan in de historie.")
+    scan.add_argument("--geen-cache", action="store_true", help="Extractiecache niet gebruiken.")
+    scan.add_argument("--cache-mb", type=int, default=STANDAARD_MAX_BYTES // (1024 * 1024), help="Max. grootte extractiecache (MB).")
+    scan.add_argument("--ocr-profiel", default=STANDAARD_OCR_PROFIEL, choices=list(OCR_PROFIELEN), help="OCR-profiel voor gescande pagina's.")
+    scan.add_argument("--stil", action="store_true", help="Geen voortgang tonen.")
+    scan.set_defaults(func=cmd_scan)
+
+    planner = sub.add_parser("planner", help="Scan een map periodiek en sla elke run op (blijft draaien).")
+    planner.add_argument("--folder", required=True, help="Map met facturen (*.pdf, recursief).")
+    planner.add_argument("--prijzenboek", required=True, help="Prijzenboek (.xlsx).")
+    planner.add_argument("--db", default="factuurtool_history.db", help="SQLite historie-database.")
+    planner.add_argument("--interval", type=float, default=30, help="Minuten tussen twee scans.")
+    planner.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Aantal parallelle processen.")
+    planner.add_argument("--tolerantie", type=float, default=0.05, help="Toegestane afwijking in euro.")
+    planner.add_argument("--label", default=None, help="Run label in de historie.")
+    planner.add_argument("--geen-cache", action="store_true", help="Extractiecache niet gebruiken.")
+    planner.add_argument("--ocr-profiel", default=STANDAARD_OCR_PROFIEL, choices=list(OCR_PROFIELEN), help="OCR-profiel voor gescande pagina's.")
+    planner.add_argument("--cache-mb", type=int, default=STANDAARD_MAX_BYTES // (1024 * 1024), help="Max. grootte extractiecache (MB).")
+    planner.set_defaults(func=cmd_planner)
+
+    export = sub.add_parser("export", help="Exporteer een run uit de historie naar Excel, CSV of Parquet.")
+    export.add_argument("--db", default="factuurtool_history.db", help="SQLite historie-database.")
+    export.add_argument("--run", default="laatste", help="Run-id, of 'laatste' voor de meest recente bewaarde run.")
+    export.add_argument("--uitvoer", required=True, help="Doelbestand (.xlsx, .csv of .parquet).")
+    export.add_argument("--formaat", default=None, choices=EXPORT_FORMATEN, help="Formaat (standaard afgeleid van de extensie).")
+    export.add_argument("--tolerantie", type=float, default=None, help="Status opnieuw bepalen bij deze afwijking in euro.")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = bouw_parser().parse_args(argv)
+    return args.func(args)
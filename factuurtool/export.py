@@ -0,0 +1,151 @@
+# Export van resultaten naar Excel, CSV of Parquet. Rijen gaan in blokken van de bron (een run in
+# de historie-database of een DataFrame) direct naar het bestand: xlsxwriter in constant_memory-
+# modus schrijft elke rij meteen weg in plaats van het hele celmodel vast te houden, en een run
+# uit de historie wordt zonder tussenliggend DataFrame geëxporteerd.
+
+import csv
+import io
+import math
+from collections import namedtuple
+
+import xlsxwriter
+
+from .historie import (
+    FACTUUR_OVERZICHT_KOLOMMEN,
+    NUMERIEKE_KOLOMMEN,
+    RESULT_KOLOMMEN,
+    iter_run_resultaten,
+    lees_run_metingen,
+    run_factuur_overzicht,
+)
+
+# ==== Optionele Parquet-ondersteuning ====
+PARQUET_BESCHIKBAAR = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_BESCHIKBAAR = True
+except Exception:
+    PARQUET_BESCHIKBAAR = False
+
+EXPORT_FORMATEN = ("xlsx", "csv", "parquet")
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+BLOKGROOTTE = 5000
+
+# Eén werkblad: naam, kolomkoppen en een iterable van rijen (tuples)
+Blad = namedtuple("Blad", ["naam", "kolommen", "rijen"])
+
+
+def beschikbare_formaten():
+    return tuple(f for f in EXPORT_FORMATEN if f != "parquet" or PARQUET_BESCHIKBAAR)
+
+
+def _waarde(v):
+    """Celwaarde voor export: NaN/NA wordt leeg, numpy-scalars worden Python-waarden."""
+    if v is None:
+        return None
+    if hasattr(v, "item"):
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if v.__class__.__name__ in ("NAType", "NaTType"):
+        return None
+    return v
+
+
+def blad_uit_df(naam: str, df):
+    """Werkblad uit een DataFrame; rijen worden pas bij het schrijven doorlopen."""
+    return Blad(naam, [str(k) for k in df.columns], df.itertuples(index=False, name=None))
+
+
+def schrijf_xlsx(doel, bladen):
+    """Schrijf werkbladen rij voor rij naar een xlsx (pad of binaire buffer) in constant_memory-modus."""
+    workbook = xlsxwriter.Workbook(doel, {"constant_memory": True})
+    try:
+        kop = workbook.add_format({"bold": True})
+        for blad in bladen:
+            worksheet = workbook.add_worksheet(blad.naam)
+            worksheet.write_row(0, 0, blad.kolommen, kop)
+            for r, rij in enumerate(blad.rijen, start=1):
+                worksheet.write_row(r, 0, [_waarde(v) for v in rij])
+    finally:
+        workbook.close()
+
+
+def schrijf_csv(doel, blad):
+    """Schrijf één werkblad als CSV (UTF-8 met BOM, zodat Excel de tekens goed leest)."""
+    if isinstance(doel, str):
+        with open(doel, "w", encoding="utf-8-sig", newline="") as fh:
+            _schrijf_csv_rijen(fh, blad)
+        return
+    tekst = io.TextIOWrapper(doel, encoding="utf-8-sig", newline="")
+    try:
+        _schrijf_csv_rijen(tekst, blad)
+        tekst.flush()
+    finally:
+        tekst.detach()  # de buffer van de aanroeper niet sluiten
+
+
+def _schrijf_csv_rijen(fh, blad):
+    writer = csv.writer(fh)
+    writer.writerow(blad.kolommen)
+    for rij in blad.rijen:
+        writer.writerow(["" if w is None else w for w in map(_waarde, rij)])
+
+
+def schrijf_parquet(doel, blad, numerieke_kolommen=NUMERIEKE_KOLOMMEN):
+    """Schrijf één werkblad als Parquet, per blok van BLOKGROOTTE rijen een row group."""
+    if not PARQUET_BESCHIKBAAR:
+        raise RuntimeError("Parquet-export vereist de python-lib 'pyarrow'.")
+    schema = pa.schema([(k, pa.float64() if k in numerieke_kolommen else pa.string()) for k in blad.kolommen])
+    with pq.ParquetWriter(doel, schema) as writer:
+        blok = []
+        for rij in blad.rijen:
+            blok.append(rij)
+            if len(blok) >= BLOKGROOTTE:
+                writer.write_table(_parquet_blok(blok, schema))
+                blok = []
+        if blok:
+            writer.write_table(_parquet_blok(blok, schema))
+
+
+def _parquet_blok(blok, schema):
+    kolommen = []
+    for i, veld in enumerate(schema):
+        waarden = [_waarde(rij[i]) for rij in blok]
+        if veld.type == pa.string():
+            waarden = [None if w is None else str(w) for w in waarden]
+        kolommen.append(pa.array(waarden, type=veld.type))
+    return pa.Table.from_arrays(kolommen, schema=schema)
+
+
+def schrijf_export(doel, bladen, formaat: str = "xlsx"):
+    """Schrijf bladen naar `doel` (pad of binaire buffer); CSV en Parquet bevatten alleen het eerste blad."""
+    if formaat == "xlsx":
+        schrijf_xlsx(doel, bladen)
+    elif formaat == "csv":
+        schrijf_csv(doel, bladen[0])
+    elif formaat == "parquet":
+        schrijf_parquet(doel, bladen[0])
+    else:
+        raise ValueError(f"Onbekend exportformaat: {formaat!r} (kies uit {', '.join(EXPORT_FORMATEN)})")
+
+
+def exporteer_run(db_path: str, run_id: int, doel, formaat: str = "xlsx", tolerantie: float = None):
+    """Exporteer een run uit de historie direct vanuit SQLite, zonder DataFrame van de resultaten.
+
+    Met een tolerantie worden Status en het factuuroverzicht bij die tolerantie bepaald, anders
+    geldt de opgeslagen status (en de standaardtolerantie van 0,05 voor het overzicht).
+    """
+    bladen = [Blad("Resultaten", list(RESULT_KOLOMMEN), iter_run_resultaten(db_path, run_id, tolerantie, BLOKGROOTTE))]
+    if formaat == "xlsx":
+        overzicht = run_factuur_overzicht(db_path, run_id, 0.05 if tolerantie is None else tolerantie)
+        bladen.append(Blad("Factuur overzicht", FACTUUR_OVERZICHT_KOLOMMEN, overzicht))
+        metingen_df = lees_run_metingen(db_path, run_id)
+        if not metingen_df.empty:
+            bladen.append(blad_uit_df("Metingen", metingen_df))
+    schrijf_export(doel, bladen, formaat)
@@ -0,0 +1,676 @@
+# SQLite-historie: runs, resultaten en de registratie van reeds verwerkte bestanden.
+
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .resultaten import STATUS_AFWIJKING, STATUS_BINNEN_MARGE, ResultaatBouwer
+from .uploads import PdfInGeheugen
+
+# ========== HULP: DB (ook voor double-processing voorkomen) ==========
+
+# Kolommen van het resultaat-DataFrame -> kolommen van de results-tabel
+DB_KOLOMMEN = {
+    "Bestandsnaam": "bestandsnaam",
+    "Factuurnummer": "factuurnummer",
+    "Taakcode_gevonden": "taakcode_gevonden",
+    "Taakcode": "taakcode_gematcht",
+    "Fuzzy_score": "fuzzy_score",
+    "Aantal (geschat)": "aantal_geschat",
+    "Omschrijving": "omschrijving",
+    "Totaalprijs boek": "totaalprijs_boek",
+    "Verwacht bedrag": "verwacht_bedrag",
+    "Prijs op factuur (som)": "prijs_op_factuur",
+    "Afwijking": "afwijking",
+    "Status": "status",
+    "Regels": "regels",
+    "Verwerkingsmethode": "verwerkingsmethode",
+}
+RESULT_KOLOMMEN = list(DB_KOLOMMEN)
+# Metingen per factuur (zie scan.METING_KOLOMMEN) -> kolommen van de factuur_metingen-tabel
+METING_DB_KOLOMMEN = {
+    "Bestandsnaam": "bestandsnaam",
+    "Pagina's": "paginas",
+    "OCR": "ocr",
+    "OCR-pagina's": "ocr_paginas",
+    "Overgeslagen pagina's": "overgeslagen_paginas",
+    "OCR-profiel": "ocr_profiel",
+    "Cache-hit": "cache_hit",
+    "Vingerafdruk (s)": "t_vingerafdruk",
+    "Cache (s)": "t_cache",
+    "Tekstextractie (s)": "t_tekst",
+    "OCR (s)": "t_ocr",
+    "Codedetectie (s)": "t_codes",
+    "Matching (s)": "t_matching",
+    "Opslag (s)": "t_opslag",
+    "Totaal (s)": "t_totaal",
+}
+NUMERIEKE_METING_KOLOMMEN = {k for k in METING_DB_KOLOMMEN if k.endswith("(s)")} | {"Pagina's", "OCR-pagina's", "Overgeslagen pagina's"}
+
+NUMERIEKE_KOLOMMEN = {"Fuzzy_score", "Aantal (geschat)", "Totaalprijs boek", "Verwacht bedrag", "Prijs op factuur (som)", "Afwijking"}
+
+
+def _pragmas(con: sqlite3.Connection):
+    # Per verbinding. NORMAL is veilig in WAL-modus en scheelt een fsync per transactie.
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=MEMORY")
+    con.execute("PRAGMA cache_size=-16000")
+
+
+def verbind(db_path: str) -> sqlite3.Connection:
+    """Verbinding met een historie-database die al met init_db is aangemaakt.
+
+    Zonder DDL, migraties of journal_mode: bedoeld voor lezers (grid, dashboard) en kleine
+    bewerkingen die vaak gebeuren. init_db draait één keer bij het opstarten.
+    """
+    con = sqlite3.connect(db_path, timeout=30)
+    _pragmas(con)
+    return con
+
+
+def init_db(db_path: str):
+    con = sqlite3.connect(db_path, timeout=30)
+    # WAL (blijft in het databasebestand staan): lezers (dashboard) blokkeren schrijvers (scan) niet
+    con.execute("PRAGMA journal_mode=WAL")
+    _pragmas(con)
+    cur = con.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            label TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            bestandsnaam TEXT,
+            taakcode_gevonden TEXT,
+            taakcode_gematcht TEXT,
+            fuzzy_score REAL,
+            aantal_geschat REAL,
+            omschrijving TEXT,
+            totaalprijs_boek REAL,
+            verwacht_bedrag REAL,
+            prijs_op_factuur REAL,
+            afwijking REAL,
+            status TEXT,
+            regels TEXT,
+            verwerkingsmethode TEXT,
+            FOREIGN KEY(run_id) REFERENCES runs(id)
+        )
+        """
+    )
+    # runs van scanjobs zonder 'automatisch opslaan' staan er tijdelijk in met bewaren = 0
+    if "bewaren" not in {r[1] for r in cur.execute("PRAGMA table_info(runs)")}:
+        cur.execute("ALTER TABLE runs ADD COLUMN bewaren INTEGER NOT NULL DEFAULT 1")
+    if "factuurnummer" not in {r[1] for r in cur.execute("PRAGMA table_info(results)")}:
+        cur.execute("ALTER TABLE results ADD COLUMN factuurnummer TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_results_run_id ON results(run_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_results_status ON results(status)")
+    # Tellers per run, bijgewerkt bij elk wegschrijven van resultaten: het dashboard hoeft zo
+    # niet meer over de hele results-tabel te aggregeren.
+    nieuw = cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'run_samenvatting'").fetchone() is None
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_samenvatting (
+            run_id INTEGER PRIMARY KEY,
+            regels INTEGER NOT NULL DEFAULT 0,
+            afwijkingen INTEGER NOT NULL DEFAULT 0,
+            binnen_marge INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(run_id) REFERENCES runs(id)
+        )
+        """
+    )
+    if nieuw:  # bestaande historie eenmalig samenvatten
+        cur.execute(
+            """
+            INSERT INTO run_samenvatting (run_id, regels, afwijkingen, binnen_marge)
+            SELECT run_id, COUNT(*),
+                   SUM(CASE WHEN status = ? THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN status = ? THEN 1 ELSE 0 END)
+            FROM results GROUP BY run_id
+            """,
+            (STATUS_AFWIJKING, STATUS_BINNEN_MARGE),
+        )
+    # duur per verwerkingsstap per factuur, om trage leveranciers en regressies te vinden
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS factuur_metingen (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            bestandsnaam TEXT,
+            paginas INTEGER,
+            ocr INTEGER,
+            ocr_paginas INTEGER,
+            overgeslagen_paginas INTEGER,
+            ocr_profiel TEXT,
+            cache_hit INTEGER,
+            t_vingerafdruk REAL,
+            t_cache REAL,
+            t_tekst REAL,
+            t_ocr REAL,
+            t_codes REAL,
+            t_matching REAL,
+            t_opslag REAL,
+            t_totaal REAL,
+            FOREIGN KEY(run_id) REFERENCES runs(id)
+        )
+        """
+    )
+    kolommen = {r[1] for r in cur.execute("PRAGMA table_info(factuur_metingen)")}
+    for kolom, soort in (("ocr_paginas", "INTEGER"), ("overgeslagen_paginas", "INTEGER"), ("ocr_profiel", "TEXT")):
+        if kolom not in kolommen:
+            cur.execute(f"ALTER TABLE factuur_metingen ADD COLUMN {kolom} {soort}")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_factuur_metingen_run_id ON factuur_metingen(run_id)")
+    # onthoud reeds verwerkte bestanden (hash of bestandsnaam + modified time)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE,
+            mtime REAL
+        )
+        """
+    )
+    # Vingerafdruk van de inhoud (grootte + hash) en optioneel de bron-id (SharePoint UniqueId/ETag);
+    # oudere databases krijgen deze kolommen erbij.
+    kolommen = {r[1] for r in cur.execute("PRAGMA table_info(ingested_files)")}
+    if "fingerprint" not in kolommen:
+        cur.execute("ALTER TABLE ingested_files ADD COLUMN fingerprint TEXT")
+    if "bron_id" not in kolommen:
+        cur.execute("ALTER TABLE ingested_files ADD COLUMN bron_id TEXT")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ingested_fingerprint ON ingested_files(fingerprint)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ingested_bron_id ON ingested_files(bron_id)")
+    # voorkomt dat twee planners (tabbladen/processen) tegelijk dezelfde scan draaien
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scan_lock (
+            naam TEXT PRIMARY KEY,
+            eigenaar TEXT NOT NULL,
+            verloopt REAL NOT NULL
+        )
+        """
+    )
+    con.commit()
+    return con
+
+
+def vingerafdruk_bestand(path: str, blokgrootte: int = 1024 * 1024) -> str:
+    """Vingerafdruk van de bestandsinhoud: '<grootte>:<blake2b-128>'."""
+    h = hashlib.blake2b(digest_size=16)
+    grootte = 0
+    with open(path, "rb") as fh:
+        for blok in iter(lambda: fh.read(blokgrootte), b""):
+            grootte += len(blok)
+            h.update(blok)
+    return f"{grootte}:{h.hexdigest()}"
+
+
+class IngestieRegister:
+    """Registratie van reeds verwerkte bestanden voor de duur van één scan.
+
+    Een bestand geldt als verwerkt als de vingerafdruk van de inhoud (of de bron-id, bijv.
+    SharePoint UniqueId + ETag) al bekend is, ongeacht pad of bron. Gebruikt één
+    SQLite-verbinding: bij het openen worden alle registraties in één query ingeladen,
+    controles lopen daarna in het geheugen. Nieuwe registraties worden gebundeld
+    weggeschreven (elke `flush_elke` bestanden en bij afsluiten).
+    """
+
+    def __init__(self, db_path: str, flush_elke: int = 50):
+        self.flush_elke = max(1, int(flush_elke))
+        self._con = init_db(db_path)
+        self._per_pad = {}
+        self._vingerafdrukken = set()
+        self._bron_ids = set()
+        for path, mtime, vingerafdruk, bron_id in self._con.execute("SELECT path, mtime, fingerprint, bron_id FROM ingested_files"):
+            self._per_pad[path] = (mtime, vingerafdruk)
+            if vingerafdruk:
+                self._vingerafdrukken.add(vingerafdruk)
+            if bron_id:
+                self._bron_ids.add(bron_id)
+        self._nieuw = []
+
+    def vingerafdruk(self, path: str, mtime: float = None) -> str:
+        """Vingerafdruk van een bestand; hergebruikt de opgeslagen waarde als pad en mtime gelijk zijn."""
+        if isinstance(path, PdfInGeheugen):
+            return path.vingerafdruk
+        if mtime is None:
+            mtime = os.path.getmtime(path)
+        bekend = self._per_pad.get(path)
+        ongewijzigd = bekend is not None and abs(bekend[0] - mtime) < 1e-6
+        if ongewijzigd and bekend[1]:
+            return bekend[1]
+        vingerafdruk = vingerafdruk_bestand(path)
+        if ongewijzigd:
+            # registratie van vóór de vingerafdrukken: bestand was al verwerkt, alsnog vastleggen
+            self.markeer(path, vingerafdruk, mtime)
+        return vingerafdruk
+
+    def is_verwerkt(self, vingerafdruk: str = None, bron_id: str = None) -> bool:
+        return (vingerafdruk is not None and vingerafdruk in self._vingerafdrukken) or (
+            bron_id is not None and bron_id in self._bron_ids
+        )
+
+    def markeer(self, path: str, vingerafdruk: str, mtime: float, bron_id: str = None):
+        path = str(path)  # PdfInGeheugen: geregistreerd onder de bestandsnaam
+        self._per_pad[path] = (mtime, vingerafdruk)
+        if vingerafdruk:
+            self._vingerafdrukken.add(vingerafdruk)
+        if bron_id:
+            self._bron_ids.add(bron_id)
+        self._nieuw.append((path, mtime, vingerafdruk, bron_id))
+        if len(self._nieuw) >= self.flush_elke:
+            self.flush()
+
+    def flush(self):
+        if not self._nieuw:
+            return
+        with self._con:
+            # OR REPLACE: een bekende inhoud op een nieuw pad (bijv. tijdelijke download) vervangt de oude regel
+            self._con.executemany(
+                "INSERT OR REPLACE INTO ingested_files(path, mtime, fingerprint, bron_id) VALUES(?, ?, ?, ?)",
+                self._nieuw,
+            )
+        self._nieuw = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _kolom_waarden(df: pd.DataFrame, kolom: str, numeriek=NUMERIEKE_KOLOMMEN) -> list:
+    """Kolom als lijst met Python-waarden; NaN/NA wordt None (NULL in SQLite)."""
+    if kolom not in df.columns:
+        return [None] * len(df)
+    serie = df[kolom]
+    if kolom in numeriek:
+        serie = pd.to_numeric(serie, errors="coerce").astype(float)
+    serie = serie.astype(object)
+    return serie.where(serie.notna(), None).tolist()
+
+
+_INSERT_RESULTS = f"""
+    INSERT INTO results (run_id, {", ".join(DB_KOLOMMEN.values())})
+    VALUES (?, {", ".join("?" for _ in DB_KOLOMMEN)})
+"""
+
+
+def maak_run(con: sqlite3.Connection, run_label: str, bewaren: bool = True) -> int:
+    """Nieuwe run; de aanroeper bepaalt de transactie."""
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = con.execute("INSERT INTO runs (ts, label, bewaren) VALUES (?, ?, ?)", (ts, run_label or None, int(bool(bewaren))))
+    return cur.lastrowid
+
+
+def voeg_resultaten_toe(con: sqlite3.Connection, run_id: int, df):
+    """Resultaatregels (ResultaatBouwer of DataFrame met RESULT_KOLOMMEN) toevoegen aan een bestaande run."""
+    if isinstance(df, ResultaatBouwer):
+        # Rechtstreeks uit de kolommen van de bouwer, zonder DataFrame
+        con.executemany(_INSERT_RESULTS, df.db_rijen(run_id, RESULT_KOLOMMEN))
+        tellers = (len(df), df.tel_status(STATUS_AFWIJKING), df.tel_status(STATUS_BINNEN_MARGE))
+    else:
+        # Kolommen vooraf in één keer converteren i.p.v. per rij/cel via iterrows + pd.isna
+        kolommen = [_kolom_waarden(df, k) for k in RESULT_KOLOMMEN]
+        con.executemany(_INSERT_RESULTS, ((run_id, *waarden) for waarden in zip(*kolommen)))
+        status = df["Status"] if "Status" in df.columns else pd.Series(dtype=object)
+        tellers = (len(df), int((status == STATUS_AFWIJKING).sum()), int((status == STATUS_BINNEN_MARGE).sum()))
+    con.execute(
+        """
+        INSERT INTO run_samenvatting (run_id, regels, afwijkingen, binnen_marge) VALUES (?, ?, ?, ?)
+        ON CONFLICT(run_id) DO UPDATE SET
+            regels = regels + excluded.regels,
+            afwijkingen = afwijkingen + excluded.afwijkingen,
+            binnen_marge = binnen_marge + excluded.binnen_marge
+        """,
+        (run_id, *tellers),
+    )
+
+
+def _herclassificeer(con: sqlite3.Connection, ids, tolerantie: float):
+    """Status van de opgegeven regels opnieuw bepalen (alleen regels met een berekende afwijking)."""
+    con.executemany(
+        "UPDATE results SET status = CASE WHEN afwijking <= ? THEN ? ELSE ? END WHERE id = ? AND afwijking IS NOT NULL",
+        ((tolerantie, STATUS_BINNEN_MARGE, STATUS_AFWIJKING, i) for i in ids),
+    )
+
+
+def _tel_run(con: sqlite3.Connection, run_id: int):
+    """Tellers van één run in run_samenvatting opnieuw tellen uit de results-tabel."""
+    con.execute(
+        """
+        INSERT OR REPLACE INTO run_samenvatting (run_id, regels, afwijkingen, binnen_marge)
+        SELECT ?, COUNT(*),
+               COALESCE(SUM(CASE WHEN status = ? THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN status = ? THEN 1 ELSE 0 END), 0)
+        FROM results WHERE run_id = ?
+        """,
+        (run_id, STATUS_AFWIJKING, STATUS_BINNEN_MARGE, run_id),
+    )
+
+
+def pas_wijzigingen_toe(db_path: str, run_id: int, ids, wijzigingen: dict, tolerantie: float):
+    """Bewerkingen uit een resultatengrid (st.data_editor) in de historie vastleggen.
+
+    ids zijn de result-id's van de getoonde rijen (in grid-volgorde); wijzigingen heeft de vorm van
+    de data_editor-state: edited_rows {positie: {kolom: waarde}}, added_rows [{kolom: waarde}] en
+    deleted_rows [positie]. Alleen de bewerkte en toegevoegde regels krijgen een status bij
+    `tolerantie`; de overige regels van de run houden hun opgeslagen status. Daarna worden de
+    tellers van de run bijgewerkt.
+    """
+    con = verbind(db_path)
+    try:
+        with con:
+            bewerkt = []
+            for positie, kolommen in (wijzigingen.get("edited_rows") or {}).items():
+                velden = {DB_KOLOMMEN[k]: v for k, v in kolommen.items() if k in DB_KOLOMMEN and k != "Status"}
+                if velden:
+                    bewerkt.append(int(ids[int(positie)]))
+                    con.execute(
+                        f"UPDATE results SET {', '.join(f'{k} = ?' for k in velden)} WHERE id = ? AND run_id = ?",
+                        (*velden.values(), bewerkt[-1], run_id),
+                    )
+            verwijderd = [int(ids[int(positie)]) for positie in wijzigingen.get("deleted_rows") or []]
+            con.executemany("DELETE FROM results WHERE id = ? AND run_id = ?", ((i, run_id) for i in verwijderd))
+            toegevoegd = [rij for rij in wijzigingen.get("added_rows") or [] if any(v is not None for v in rij.values())]
+            if toegevoegd:
+                hoogste_id = con.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()[0]
+                voeg_resultaten_toe(con, run_id, pd.DataFrame(toegevoegd))
+                bewerkt += [i for (i,) in con.execute("SELECT id FROM results WHERE run_id = ? AND id > ?", (run_id, hoogste_id))]
+            _herclassificeer(con, bewerkt, tolerantie)
+            _tel_run(con, run_id)
+    finally:
+        con.close()
+
+
+# ========== Resultatengrid (gepagineerd, gefilterd en gesorteerd in SQL) ==========
+
+# Kolommen waarop de grid sorteert -> SQL-kolom (status_actueel = status bij de huidige tolerantie)
+GRID_SORTERING = {
+    "Bestandsnaam": "bestandsnaam",
+    "Status": "status_actueel",
+    "Taakcode": "taakcode_gematcht",
+    "Afwijking": "afwijking",
+}
+# De grid toont alles behalve de lange Regels-tekst; die wordt per rij geladen (lees_regels)
+GRID_KOLOMMEN = [k for k in RESULT_KOLOMMEN if k != "Regels"]
+
+
+def _grid_query(kolommen: str, run_id: int, tolerantie: float, statussen=None, zonder_statussen=None,
+                bestandsnaam: str = None, taakcode: str = None):
+    # De status wordt in SQL bij de opgegeven tolerantie bepaald (zoals verwerking.classificeer_status),
+    # zodat filteren en sorteren op Status klopt zonder de run te herclassificeren.
+    sql = f"""
+        SELECT {kolommen} FROM (
+            SELECT *, CASE WHEN afwijking IS NULL THEN status WHEN afwijking <= ? THEN ? ELSE ? END AS status_actueel
+            FROM results WHERE run_id = ?
+        ) WHERE 1 = 1
+    """
+    params = [tolerantie, STATUS_BINNEN_MARGE, STATUS_AFWIJKING, run_id]
+    if statussen:
+        sql += f" AND status_actueel IN ({', '.join('?' for _ in statussen)})"
+        params += list(statussen)
+    if zonder_statussen:
+        sql += f" AND COALESCE(status_actueel, '') NOT IN ({', '.join('?' for _ in zonder_statussen)})"
+        params += list(zonder_statussen)
+    if bestandsnaam:
+        sql += " AND bestandsnaam LIKE ?"
+        params.append(f"%{bestandsnaam}%")
+    if taakcode:
+        sql += " AND (taakcode_gematcht LIKE ? OR taakcode_gevonden LIKE ?)"
+        params += [f"%{taakcode}%", f"%{taakcode}%"]
+    return sql, params
+
+
+def tel_resultaten(db_path: str, run_id: int, tolerantie: float, **filters) -> int:
+    """Aantal resultaatregels van een run dat aan de filters van lees_resultaten_pagina voldoet."""
+    sql, params = _grid_query("COUNT(*)", run_id, tolerantie, **filters)
+    con = verbind(db_path)
+    try:
+        return con.execute(sql, params).fetchone()[0]
+    finally:
+        con.close()
+
+
+def lees_resultaten_pagina(db_path: str, run_id: int, tolerantie: float, sorteer: str = "Bestandsnaam",
+                           aflopend: bool = False, limiet: int = 50, offset: int = 0, **filters) -> pd.DataFrame:
+    """Eén pagina resultaten van een run (GRID_KOLOMMEN, index = result-id).
+
+    Filters: statussen / zonder_statussen (lijst; regels zonder status vallen onder zonder_statussen),
+    bestandsnaam en taakcode (bevat). Status is de status bij `tolerantie`; sorteer is een sleutel uit GRID_SORTERING (lege waarden achteraan).
+    """
+    select = ", ".join(["id"] + [f'{"status_actueel" if k == "Status" else DB_KOLOMMEN[k]} AS "{k}"' for k in GRID_KOLOMMEN])
+    sql, params = _grid_query(select, run_id, tolerantie, **filters)
+    kolom = GRID_SORTERING[sorteer]
+    sql += f" ORDER BY {kolom} IS NULL, {kolom} {'DESC' if aflopend else 'ASC'}, id LIMIT ? OFFSET ?"
+    con = verbind(db_path)
+    try:
+        return pd.read_sql_query(sql, con, params=(*params, int(limiet), int(offset)), index_col="id")
+    finally:
+        con.close()
+
+
+def iter_run_resultaten(db_path: str, run_id: int, tolerantie: float = None, blokgrootte: int = 5000):
+    """Resultaatregels van een run als tuples (volgorde RESULT_KOLOMMEN), in blokken uit de database.
+
+    Bedoeld voor export zonder eerst een DataFrame op te bouwen. Met een tolerantie wordt Status
+    bij die tolerantie bepaald (zoals in de grid), anders de opgeslagen status.
+    """
+    if tolerantie is None:
+        select = ", ".join(DB_KOLOMMEN[k] for k in RESULT_KOLOMMEN)
+        sql, params = f"SELECT {select} FROM results WHERE run_id = ?", [run_id]
+    else:
+        select = ", ".join("status_actueel" if k == "Status" else DB_KOLOMMEN[k] for k in RESULT_KOLOMMEN)
+        sql, params = _grid_query(select, run_id, tolerantie)
+    con = verbind(db_path)
+    try:
+        cur = con.execute(sql + " ORDER BY id", params)
+        while True:
+            blok = cur.fetchmany(blokgrootte)
+            if not blok:
+                break
+            yield from blok
+    finally:
+        con.close()
+
+
+FACTUUR_OVERZICHT_KOLOMMEN = ["Bestandsnaam", "Totaal prijs op factuur", "Totaal verwacht bedrag", "Totaal afwijking", "Status factuur"]
+
+
+def run_factuur_overzicht(db_path: str, run_id: int, tolerantie: float) -> list:
+    """Factuuroverzicht van een run (zoals scan.maak_factuur_summary), geaggregeerd in SQL."""
+    con = verbind(db_path)
+    try:
+        totalen = con.execute(
+            """
+            SELECT bestandsnaam, TOTAL(prijs_op_factuur), TOTAL(verwacht_bedrag)
+            FROM results WHERE run_id = ? AND bestandsnaam IS NOT NULL
+            GROUP BY bestandsnaam ORDER BY bestandsnaam
+            """,
+            (run_id,),
+        ).fetchall()
+    finally:
+        con.close()
+    overzicht = []
+    for naam, prijs, verwacht in totalen:
+        afwijking = round(abs(prijs - verwacht), 2)
+        overzicht.append((naam, prijs, verwacht, afwijking, STATUS_BINNEN_MARGE if afwijking <= tolerantie else STATUS_AFWIJKING))
+    return overzicht
+
+
+def lees_regels(db_path: str, result_id: int) -> str:
+    """De volledige Regels-tekst van één resultaatregel."""
+    con = verbind(db_path)
+    try:
+        rij = con.execute("SELECT regels FROM results WHERE id = ?", (int(result_id),)).fetchone()
+    finally:
+        con.close()
+    return rij[0] if rij and rij[0] is not None else ""
+
+
+_INSERT_METINGEN = f"""
+    INSERT INTO factuur_metingen (run_id, {", ".join(METING_DB_KOLOMMEN.values())})
+    VALUES (?, {", ".join("?" for _ in METING_DB_KOLOMMEN)})
+"""
+
+
+def voeg_metingen_toe(con: sqlite3.Connection, run_id: int, metingen_df: pd.DataFrame):
+    """Metingen per factuur (DataFrame met de kolommen van METING_DB_KOLOMMEN) bij een run opslaan."""
+    kolommen = [_kolom_waarden(metingen_df, k, NUMERIEKE_METING_KOLOMMEN) for k in METING_DB_KOLOMMEN]
+    con.executemany(_INSERT_METINGEN, ((run_id, *waarden) for waarden in zip(*kolommen)))
+
+
+def save_run_and_results(db_path: str, run_label: str, df: pd.DataFrame, metingen_df: pd.DataFrame = None):
+    con = init_db(db_path)
+    try:
+        with con:  # één transactie voor run + alle resultaatregels
+            run_id = maak_run(con, run_label)
+            voeg_resultaten_toe(con, run_id, df)
+            if metingen_df is not None and not metingen_df.empty:
+                voeg_metingen_toe(con, run_id, metingen_df)
+    finally:
+        con.close()
+    return run_id
+
+
+def verwijder_run(con: sqlite3.Connection, run_id: int):
+    con.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+    con.execute("DELETE FROM run_samenvatting WHERE run_id = ?", (run_id,))
+    con.execute("DELETE FROM factuur_metingen WHERE run_id = ?", (run_id,))
+    con.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+
+def laatste_run(db_path: str, label: str = None):
+    """(run_id, ts, label) van de meest recente run (optioneel met dit label), of None."""
+    con = verbind(db_path)
+    try:
+        if label is None:
+            return con.execute("SELECT id, ts, label FROM runs WHERE bewaren = 1 ORDER BY id DESC LIMIT 1").fetchone()
+        return con.execute("SELECT id, ts, label FROM runs WHERE bewaren = 1 AND label = ? ORDER BY id DESC LIMIT 1", (label,)).fetchone()
+    finally:
+        con.close()
+
+
+def lees_runs(db_path: str, limiet: int = 25, offset: int = 0) -> pd.DataFrame:
+    """Eén pagina bewaarde runs (nieuwste eerst) met de tellers uit run_samenvatting."""
+    con = verbind(db_path)
+    try:
+        return pd.read_sql_query(
+            """
+            SELECT r.id AS run_id, r.ts, r.label,
+                   COALESCE(s.regels, 0) AS regels,
+                   COALESCE(s.afwijkingen, 0) AS afwijkingen,
+                   COALESCE(s.binnen_marge, 0) AS binnen_marge
+            FROM runs r
+            LEFT JOIN run_samenvatting s ON s.run_id = r.id
+            WHERE r.bewaren = 1
+            ORDER BY r.id DESC
+            LIMIT ? OFFSET ?
+            """,
+            con,
+            params=(int(limiet), int(offset)),
+        )
+    finally:
+        con.close()
+
+
+def historie_totalen(db_path: str) -> dict:
+    """Aantal bewaarde runs en totalen over alle runs (uit de samenvattingstabel)."""
+    con = verbind(db_path)
+    try:
+        runs, regels, afwijkingen = con.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(s.regels), 0), COALESCE(SUM(s.afwijkingen), 0)
+            FROM runs r
+            LEFT JOIN run_samenvatting s ON s.run_id = r.id
+            WHERE r.bewaren = 1
+            """
+        ).fetchone()
+    finally:
+        con.close()
+    return {"runs": int(runs), "regels": int(regels), "afwijkingen": int(afwijkingen)}
+
+
+def lees_run_resultaten(db_path: str, run_id: int) -> pd.DataFrame:
+    """Resultaten van één run terug als DataFrame met dezelfde kolommen als na een scan."""
+    select = ", ".join(f'{db} AS "{df}"' for df, db in DB_KOLOMMEN.items())
+    con = verbind(db_path)
+    try:
+        return pd.read_sql_query(f"SELECT {select} FROM results WHERE run_id = ? ORDER BY id", con, params=(run_id,))
+    finally:
+        con.close()
+
+
+def lees_run_metingen(db_path: str, run_id: int) -> pd.DataFrame:
+    """Metingen per factuur van één run, met dezelfde kolommen als na een scan."""
+    select = ", ".join(f'{db} AS "{df}"' for df, db in METING_DB_KOLOMMEN.items())
+    con = verbind(db_path)
+    try:
+        df = pd.read_sql_query(f"SELECT {select} FROM factuur_metingen WHERE run_id = ? ORDER BY id", con, params=(run_id,))
+    finally:
+        con.close()
+    for kolom in ("OCR", "Cache-hit"):
+        df[kolom] = df[kolom].map(lambda v: None if pd.isna(v) else bool(v))
+    return df
+
+
+class ScanLock:
+    """Lock in de historie-database tegen overlappende scans (ook over processen heen).
+
+    Een lock verloopt na `ttl` seconden, zodat een gecrasht proces de planner niet blijvend blokkeert.
+    """
+
+    def __init__(self, db_path: str, naam: str = "scan", ttl: float = 6 * 3600):
+        self.db_path = db_path
+        self.naam = naam
+        self.ttl = ttl
+        self.eigenaar = f"{os.getpid()}:{id(self)}"
+        self.verkregen = False
+
+    def acquire(self) -> bool:
+        con = init_db(self.db_path)
+        try:
+            nu = time.time()
+            with con:
+                con.execute("DELETE FROM scan_lock WHERE naam = ? AND verloopt < ?", (self.naam, nu))
+                try:
+                    con.execute("INSERT INTO scan_lock(naam, eigenaar, verloopt) VALUES (?, ?, ?)", (self.naam, self.eigenaar, nu + self.ttl))
+                    self.verkregen = True
+                except sqlite3.IntegrityError:
+                    self.verkregen = False
+        finally:
+            con.close()
+        return self.verkregen
+
+    def release(self):
+        if not self.verkregen:
+            return
+        con = init_db(self.db_path)
+        try:
+            with con:
+                con.execute("DELETE FROM scan_lock WHERE naam = ? AND eigenaar = ?", (self.naam, self.eigenaar))
+        finally:
+            con.close()
+        self.verkregen = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
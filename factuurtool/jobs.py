@@ -0,0 +1,229 @@
+# Scanjobs: een scan draait als achtergrondjob met een job-id, zodat de Streamlit-pagina niet
+# blokkeert en een rerun (klik, tolerantie aanpassen) het werk niet weggooit. De status per job en
+# per bestand staat in de historie-database; resultaten worden per bestand weggeschreven en zijn
+# dus al tijdens de scan te lezen.
+
+import os
+import sqlite3
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .historie import (
+    ScanLock,
+    init_db,
+    lees_run_metingen,
+    maak_run,
+    verbind,
+    verwijder_run,
+    voeg_metingen_toe,
+    voeg_resultaten_toe,
+)
+from .scan import maak_metingen_df, voer_scan_uit
+
+# Status van een job en van een bestand binnen een job
+WACHTRIJ = "wachtrij"
+BEZIG = "bezig"
+KLAAR = "klaar"
+MISLUKT = "mislukt"
+OVERGESLAGEN = "overgeslagen"
+FOUT = "fout"
+
+AFGEROND = (KLAAR, MISLUKT)
+
+# Niet-bewaarde runs worden pas opgeruimd als de job zo lang (s) afgerond is, zodat een andere
+# sessie die de resultaten nog bekijkt ze niet onder zich vandaan ziet verdwijnen.
+OPRUIMEN_NA = 24 * 3600
+
+
+def _init_tabellen(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            aangemaakt TEXT NOT NULL,
+            gestart TEXT,
+            beeindigd TEXT,
+            status TEXT NOT NULL,
+            label TEXT,
+            run_id INTEGER,
+            bewaren INTEGER NOT NULL DEFAULT 1,
+            fout TEXT
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_bestanden (
+            job_id TEXT NOT NULL,
+            volgnummer INTEGER NOT NULL,
+            pad TEXT NOT NULL,
+            status TEXT NOT NULL,
+            regels INTEGER NOT NULL DEFAULT 0,
+            fout TEXT,
+            PRIMARY KEY (job_id, volgnummer)
+        )
+        """
+    )
+
+
+class ScanJobs:
+    """Wachtrij van scanjobs die één voor één in een achtergrondthread draaien.
+
+    Een job krijgt bij het indienen een run in de historie (met `bewaren` = automatisch opslaan);
+    runs van niet-bewaarde jobs die langer dan `opruimen_na` seconden afgerond zijn, worden bij
+    het indienen van een nieuwe job opgeruimd. Jobs die nog liepen toen het proces stopte, worden
+    bij het starten als mislukt gemarkeerd.
+    """
+
+    def __init__(self, db_path: str, opruimen_na: float = OPRUIMEN_NA):
+        self.db_path = db_path
+        self.opruimen_na = opruimen_na
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scanjob")
+        con = init_db(db_path)
+        try:
+            with con:
+                _init_tabellen(con)
+                con.execute(
+                    "UPDATE jobs SET status = ?, fout = ?, beeindigd = COALESCE(beeindigd, ?) WHERE status IN (?, ?)",
+                    (MISLUKT, "Onderbroken: de server is herstart.", datetime.now().strftime("%Y-%m-%d %H:%M:%S"), WACHTRIJ, BEZIG),
+                )
+        finally:
+            con.close()
+
+    def _connect(self):
+        # Tabellen zijn in __init__ aangemaakt; status() wordt elke paar seconden aangeroepen
+        return verbind(self.db_path)
+
+    def dien_in(self, bron, prijzenboek, label: str = None, bewaren: bool = True, lock: bool = False, **scan_opties) -> str:
+        """Zet een scan in de wachtrij en geef direct het job-id terug.
+
+        bron() levert (paden, bron_ids) en wordt pas in de job aangeroepen (SharePoint-sync e.d.
+        blokkeert de pagina dus ook niet). Met lock=True neemt de job de ScanLock van de historie,
+        zodat hij niet tegelijk met de planner dezelfde bron scant. Overige opties gaan door naar
+        voer_scan_uit.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        grens = (datetime.now() - timedelta(seconds=self.opruimen_na)).strftime("%Y-%m-%d %H:%M:%S")
+        oud = "bewaren = 0 AND status IN (?, ?) AND beeindigd < ? AND run_id IS NOT NULL"
+        con = self._connect()
+        try:
+            with con:
+                for (run_id,) in con.execute(f"SELECT run_id FROM jobs WHERE {oud}", (*AFGEROND, grens)).fetchall():
+                    verwijder_run(con, run_id)
+                con.execute(f"UPDATE jobs SET run_id = NULL WHERE {oud}", (*AFGEROND, grens))
+                run_id = maak_run(con, label, bewaren=bewaren)
+                con.execute(
+                    "INSERT INTO jobs (id, aangemaakt, status, label, run_id, bewaren) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), WACHTRIJ, label or None, run_id, int(bool(bewaren))),
+                )
+        finally:
+            con.close()
+        self._pool.submit(self._draai, job_id, run_id, bron, prijzenboek, lock, scan_opties)
+        return job_id
+
+    def _draai(self, job_id, run_id, bron, prijzenboek, lock, scan_opties):
+        con = self._connect()
+        scan_lock = ScanLock(self.db_path) if lock else None
+        try:
+            with con:
+                con.execute("UPDATE jobs SET status = ?, gestart = ? WHERE id = ?", (BEZIG, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+            if scan_lock is not None and not scan_lock.acquire():
+                raise RuntimeError("Er loopt al een scan (planner of ander proces); probeer het zo opnieuw.")
+
+            paden, bron_ids = bron()
+            volgnummers = {pad: i for i, pad in enumerate(paden)}
+            with con:
+                con.executemany(
+                    "INSERT INTO job_bestanden (job_id, volgnummer, pad, status) VALUES (?, ?, ?, ?)",
+                    ((job_id, i, str(pad), WACHTRIJ) for i, pad in enumerate(paden)),
+                )
+            # Bestanden worden in bronvolgorde opgepakt; de eerstvolgende `workers` open bestanden
+            # zijn dus (vrijwel) precies de bestanden die nu verwerkt worden.
+            workers = max(1, int(scan_opties.get("workers", 1)))
+            open_paden = list(paden)
+
+            def markeer_bezig():
+                con.executemany(
+                    "UPDATE job_bestanden SET status = ? WHERE job_id = ? AND volgnummer = ? AND status = ?",
+                    ((BEZIG, job_id, volgnummers[p], WACHTRIJ) for p in open_paden[:workers]),
+                )
+
+            def bij_bestand(path, status, rows, fout, meting):
+                with con:  # resultaten, metingen en bestandsstatus samen per bestand vastleggen
+                    start = time.perf_counter()
+                    if rows:
+                        voeg_resultaten_toe(con, run_id, rows)
+                    if meting is not None:
+                        voeg_metingen_toe(con, run_id, maak_metingen_df([{**meting, "opslag": time.perf_counter() - start}]))
+                    con.execute(
+                        "UPDATE job_bestanden SET status = ?, regels = ?, fout = ? WHERE job_id = ? AND volgnummer = ?",
+                        (status, len(rows), fout, job_id, volgnummers[path]),
+                    )
+                    open_paden.remove(path)
+                    markeer_bezig()
+
+            with con:
+                markeer_bezig()
+            voer_scan_uit(paden, prijzenboek, self.db_path, bron_ids=bron_ids, bij_bestand=bij_bestand, **scan_opties)
+            with con:
+                con.execute("UPDATE jobs SET status = ?, beeindigd = ? WHERE id = ?", (KLAAR, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+        except Exception as e:
+            with con:
+                con.execute(
+                    "UPDATE jobs SET status = ?, beeindigd = ?, fout = ? WHERE id = ?",
+                    (MISLUKT, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), f"{e}", job_id),
+                )
+                con.execute(
+                    "UPDATE job_bestanden SET status = ? WHERE job_id = ? AND status IN (?, ?)",
+                    (FOUT, job_id, WACHTRIJ, BEZIG),
+                )
+            traceback.print_exc()
+        finally:
+            if scan_lock is not None:
+                scan_lock.release()
+            con.close()
+
+    def status(self, job_id: str) -> dict:
+        """Status van een job met tellingen per bestandsstatus, of None als het id onbekend is."""
+        con = self._connect()
+        try:
+            con.row_factory = sqlite3.Row
+            job = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            tellingen = dict(con.execute("SELECT status, COUNT(*) FROM job_bestanden WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+        finally:
+            con.close()
+        status = dict(job)
+        status["bestanden"] = sum(tellingen.values())
+        status["afgerond_bestanden"] = sum(tellingen.get(s, 0) for s in (KLAAR, OVERGESLAGEN, FOUT))
+        status["tellingen"] = tellingen
+        return status
+
+    def bestanden(self, job_id: str) -> pd.DataFrame:
+        con = self._connect()
+        try:
+            df = pd.read_sql_query(
+                "SELECT pad, status, regels, fout FROM job_bestanden WHERE job_id = ? ORDER BY volgnummer",
+                con,
+                params=(job_id,),
+            )
+        finally:
+            con.close()
+        df.insert(0, "Bestandsnaam", df.pop("pad").map(os.path.basename))
+        return df
+
+    def metingen(self, job_id: str) -> pd.DataFrame:
+        """Duur per stap per factuur tot nu toe."""
+        status = self.status(job_id)
+        if status is None or status["run_id"] is None:
+            return pd.DataFrame(columns=[])
+        return lees_run_metingen(self.db_path, status["run_id"])
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,178 @@
+# Achtergrondplanner: periodiek een map of SharePoint scannen los van de Streamlit-pagina.
+# De planner draait in een eigen thread, voorkomt overlappende runs (ook tussen processen, via
+# een lock in de historie-database) en schrijft resultaten direct naar de historie. De pagina
+# leest alleen nog de laatste run uit de database.
+
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from .historie import ScanLock, save_run_and_results
+from .scan import maak_metingen_df, voer_scan_uit, zoek_pdfs
+
+STANDAARD_LABEL = "Automatische scan"
+
+
+def map_bron(folder: str):
+    """Bron-functie voor de planner: alle PDF's in een lokale map (zonder bron-id's)."""
+    def bron():
+        return zoek_pdfs(folder), {}
+    return bron
+
+
+def sharepoint_bron(sync):
+    """Bron-functie voor de planner: synchroniseer SharePoint naar de spiegelmap (SharePointSync)."""
+    def bron():
+        paden, bron_ids = [], {}
+        for pad, bron_id, _gedownload in sync.sync():
+            paden.append(pad)
+            bron_ids[pad] = bron_id
+        if sync.laatste_fouten:
+            raise RuntimeError("SharePoint download mislukt: " + "; ".join(sync.laatste_fouten))
+        return paden, bron_ids
+    return bron
+
+
+class ScanPlanner:
+    """Voert elke `interval` seconden een scan uit in een daemon-thread.
+
+    `configureer` kan altijd opnieuw aangeroepen worden (bijv. als de instellingen in de app
+    wijzigen); de nieuwe instellingen gelden vanaf de volgende scan. Er loopt nooit meer dan één scan tegelijk:
+    binnen het proces via een threading.Lock, tussen processen via ScanLock in de database.
+    """
+
+    def __init__(self, history_db_path: str):
+        self.history_db_path = history_db_path
+        self._instellingen = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wek = threading.Event()
+        self._scan_lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        self._status = {
+            "bezig": False,
+            "laatste_start": None,
+            "laatste_einde": None,
+            "laatste_run_id": None,
+            "laatste_aantal_regels": 0,
+            "laatste_fout": None,
+            "volgende_scan": None,
+        }
+
+    def configureer(self, bron, prijzenboek, interval: float, label: str = None, workers: int = 1, **opties):
+        """Stel bron (functie -> (paden, bron_ids)), prijzenboek en interval in seconden in.
+
+        Overige opties gaan door naar voer_scan_uit/process_pdf_path (TOLERANTIE, cache, ...).
+        """
+        self._instellingen = {
+            "bron": bron,
+            "prijzenboek": prijzenboek,
+            "interval": max(1.0, float(interval)),
+            "label": label or STANDAARD_LABEL,
+            "workers": int(workers),
+            "opties": opties,
+        }
+
+    @property
+    def actief(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._instellingen is None:
+            raise RuntimeError("Planner is nog niet geconfigureerd.")
+        if self.actief:
+            return
+        # Elke thread krijgt een eigen stop-event: een gestopte thread die nog een scan afrondt,
+        # mag niet weer meedraaien als de planner direct opnieuw gestart wordt. Het wek-signaal van
+        # stop() wordt gewist, anders volgt op de eerste scan direct een tweede.
+        self._stop = threading.Event()
+        self._wek.clear()
+        self._thread = threading.Thread(target=self._lus, args=(self._stop,), name="factuurtool-planner", daemon=True)
+        self._thread.start()
+
+    def draai(self):
+        """Draai de planner in de huidige thread, tot stop() of Ctrl+C (voor de CLI/een service)."""
+        if self._instellingen is None:
+            raise RuntimeError("Planner is nog niet geconfigureerd.")
+        self._stop = threading.Event()
+        try:
+            self._lus(self._stop)
+        except KeyboardInterrupt:
+            pass
+
+    def stop(self, wacht: bool = False):
+        self._stop.set()
+        self._wek.set()
+        if wacht and self._thread is not None:
+            self._thread.join()
+        self._thread = None
+        self._zet_status(volgende_scan=None)
+
+    def status(self) -> dict:
+        with self._status_lock:
+            status = dict(self._status)
+        status["actief"] = self.actief
+        return status
+
+    def _zet_status(self, **waarden):
+        with self._status_lock:
+            self._status.update(waarden)
+
+    def _lus(self, stop: threading.Event):
+        while not stop.is_set():
+            self.scan_eenmalig()
+            if stop.is_set():
+                break
+            interval = self._instellingen["interval"]
+            self._zet_status(volgende_scan=datetime.fromtimestamp(time.time() + interval))
+            self._wek.wait(interval)
+            self._wek.clear()
+
+    def scan_eenmalig(self):
+        """Voer één scan uit met de huidige instellingen; geeft de run_id of None terug.
+
+        Als er al een scan loopt (in dit proces of een ander), wordt deze beurt overgeslagen.
+        """
+        if not self._scan_lock.acquire(blocking=False):
+            return None
+        try:
+            with ScanLock(self.history_db_path) as verkregen:
+                if not verkregen:
+                    self._zet_status(laatste_fout="Overgeslagen: er loopt al een scan in een ander proces.")
+                    return None
+                return self._scan()
+        except Exception as e:
+            self._zet_status(bezig=False, laatste_einde=datetime.now(), laatste_fout=f"{e}\n{traceback.format_exc()}")
+            return None
+        finally:
+            self._scan_lock.release()
+
+    def _scan(self):
+        inst = self._instellingen
+        self._zet_status(bezig=True, laatste_start=datetime.now(), laatste_fout=None)
+        fouten = []
+        metingen = []
+        paden, bron_ids = inst["bron"]()
+        all_rows = voer_scan_uit(
+            paden,
+            inst["prijzenboek"],
+            self.history_db_path,
+            controleer_ingestie=True,
+            bron_ids=bron_ids,
+            workers=inst["workers"],
+            bij_fout=lambda path, fout: fouten.append(f"{path}: {fout}"),
+            metingen=metingen,
+            **inst["opties"],
+        )
+        run_id = None
+        if all_rows:
+            run_id = save_run_and_results(self.history_db_path, inst["label"], all_rows, maak_metingen_df(metingen))
+        self._zet_status(
+            bezig=False,
+            laatste_einde=datetime.now(),
+            laatste_run_id=run_id if run_id is not None else self._status["laatste_run_id"],
+            laatste_aantal_regels=len(all_rows),
+            laatste_fout="\n".join(fouten) or None,
+        )
+        return run_id
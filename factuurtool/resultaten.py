@@ -0,0 +1,237 @@
+# Kolomsgewijze opslag van resultaatregels. In plaats van één dict per regel (met telkens
+# dezelfde 14 sleutels, bestandsnaam, status en samengevoegde regeltekst) houdt ResultaatBouwer
+# per kolom een getypeerde array bij: bedragen als float64, bestandsnaam, factuurnummer, status
+# en verwerkingsmethode als categoriecodes, en de factuurregels als verwijzing naar één lijst
+# unieke regelteksten. Klein om te picklen (workers -> hoofdproces) en direct om te zetten naar
+# pandas, SQLite of een export.
+
+from array import array
+from itertools import islice, repeat
+
+import numpy as np
+import pandas as pd
+
+KOLOMMEN = [
+    "Bestandsnaam",
+    "Factuurnummer",
+    "Taakcode_gevonden",
+    "Taakcode",
+    "Fuzzy_score",
+    "Aantal (geschat)",
+    "Omschrijving",
+    "Totaalprijs boek",
+    "Verwacht bedrag",
+    "Prijs op factuur (som)",
+    "Afwijking",
+    "Status",
+    "Regels",
+    "Verwerkingsmethode",
+]
+CATEGORIE_KOLOMMEN = ("Bestandsnaam", "Factuurnummer", "Status", "Verwerkingsmethode")
+GETAL_KOLOMMEN = ("Fuzzy_score", "Aantal (geschat)", "Totaalprijs boek", "Verwacht bedrag", "Prijs op factuur (som)", "Afwijking")
+TEKST_KOLOMMEN = ("Taakcode_gevonden", "Taakcode", "Omschrijving")
+
+STATUS_BINNEN_MARGE = "✅ Binnen marge"
+STATUS_AFWIJKING = "❌ Afwijking"
+STATUS_BEDRAG_NIET_GEVONDEN = "⚠️ Bedrag niet gevonden"
+STATUS_ONBEKENDE_TAAKCODE = "⚠️ Onbekende taakcode"
+# Vaste categorieën voor Status, zodat herclassificeren in een DataFrame geen nieuwe categorie nodig heeft
+STATUSSEN = (STATUS_BINNEN_MARGE, STATUS_AFWIJKING, STATUS_BEDRAG_NIET_GEVONDEN, STATUS_ONBEKENDE_TAAKCODE)
+
+REGEL_SCHEIDING = " | "
+_NAN = float("nan")
+
+
+class _Categorie:
+    """Waarden als int32-codes met een lijst categorieën (None heeft code -1)."""
+
+    def __init__(self, categorieen=()):
+        self.categorieen = list(categorieen)
+        self._codes_per_waarde = {w: i for i, w in enumerate(self.categorieen)}
+        self.codes = array("i")
+
+    def code(self, waarde) -> int:
+        if waarde is None:
+            return -1
+        code = self._codes_per_waarde.get(waarde)
+        if code is None:
+            code = self._codes_per_waarde[waarde] = len(self.categorieen)
+            self.categorieen.append(waarde)
+        return code
+
+    def voeg_samen(self, andere: "_Categorie"):
+        omzetting = [self.code(w) for w in andere.categorieen]
+        if omzetting == list(range(len(omzetting))):  # zelfde categorieën (vaak bij Status en methode)
+            self.codes.extend(andere.codes)
+        else:
+            self.codes.extend(array("i", (omzetting[c] if c >= 0 else -1 for c in andere.codes)))
+
+    def naar_pandas(self) -> pd.Categorical:
+        return pd.Categorical.from_codes(self.codes, categories=self.categorieen)
+
+
+def _uit_bytes(typecode: str, data: bytes) -> array:
+    waarden = array(typecode)
+    waarden.frombytes(data)
+    return waarden
+
+
+def _getal(v):
+    return _NAN if v is None else v
+
+
+def _of_none(v):
+    return None if v != v else v  # NaN -> None
+
+
+class ResultaatBouwer:
+    """Resultaatregels van één of meer facturen, kolomsgewijs opgebouwd.
+
+    Per factuur eerst begin_bestand() met de geëxtraheerde regels, daarna voeg_toe() per
+    resultaatregel met de regelnummers (posities in die regels) waarop hij gebaseerd is.
+    Bouwers van losse facturen worden met voeg_samen() samengevoegd. Itereren geeft dicts
+    (zoals vroeger per regel), naar_df() een DataFrame en db_rijen() tuples voor SQLite.
+    """
+
+    def __init__(self):
+        self._categorie = {k: _Categorie(STATUSSEN if k == "Status" else ()) for k in CATEGORIE_KOLOMMEN}
+        self._getallen = {k: array("d") for k in GETAL_KOLOMMEN}
+        self._teksten = {k: [] for k in TEKST_KOLOMMEN}
+        # Regels: per resultaatregel een reeks indexen in self.regelteksten (grenzen in _regel_grens)
+        self.regelteksten = []
+        self._regel_idx = array("i")
+        self._regel_grens = array("i", [0])
+        self._bestand = None
+
+    def __len__(self):
+        return len(self._regel_grens) - 1
+
+    def __getstate__(self):
+        # Compact voor de overdracht worker -> hoofdproces: arrays als ruwe bytes, Status zonder de
+        # vaste categorieën, en niet de opzoektabellen of de geëxtraheerde regels van de laatste factuur.
+        categorieen = []
+        for kolom, c in self._categorie.items():
+            waarden = c.categorieen[len(STATUSSEN):] if kolom == "Status" else c.categorieen
+            categorieen.append((waarden, c.codes.tobytes()))
+        return (
+            categorieen,
+            [self._getallen[k].tobytes() for k in GETAL_KOLOMMEN],
+            [self._teksten[k] for k in TEKST_KOLOMMEN],
+            self.regelteksten,
+            self._regel_idx.tobytes(),
+            self._regel_grens.tobytes(),
+        )
+
+    def __setstate__(self, state):
+        categorieen, getallen, teksten, self.regelteksten, regel_idx, regel_grens = state
+        self._categorie = {}
+        for kolom, (waarden, codes) in zip(CATEGORIE_KOLOMMEN, categorieen):
+            categorie = self._categorie[kolom] = _Categorie((*STATUSSEN, *waarden) if kolom == "Status" else waarden)
+            categorie.codes.frombytes(codes)
+        self._getallen = {k: _uit_bytes("d", b) for k, b in zip(GETAL_KOLOMMEN, getallen)}
+        self._teksten = dict(zip(TEKST_KOLOMMEN, teksten))
+        self._regel_idx = _uit_bytes("i", regel_idx)
+        self._regel_grens = _uit_bytes("i", regel_grens)
+        self._bestand = None
+
+    def begin_bestand(self, bestandsnaam: str, factuurnummer: str, verwerkingsmethode: str, regels):
+        """Volgende voeg_toe()-aanroepen horen bij deze factuur; `regels` zijn de geëxtraheerde regels."""
+        self._bestand = (
+            self._categorie["Bestandsnaam"].code(bestandsnaam),
+            self._categorie["Factuurnummer"].code(factuurnummer),
+            self._categorie["Verwerkingsmethode"].code(verwerkingsmethode),
+            regels,
+            {},  # regelnummer in deze factuur -> index in self.regelteksten
+        )
+
+    def voeg_toe(self, taakcode_gevonden, taakcode, fuzzy_score, aantal, omschrijving, totaalprijs_boek,
+                 verwacht, prijs_op_factuur, afwijking, status: str, regelnummers):
+        bestand, factuurnummer, methode, regels, uniek = self._bestand
+        self._categorie["Bestandsnaam"].codes.append(bestand)
+        self._categorie["Factuurnummer"].codes.append(factuurnummer)
+        self._categorie["Verwerkingsmethode"].codes.append(methode)
+        self._categorie["Status"].codes.append(self._categorie["Status"].code(status))
+        for kolom, waarde in zip(GETAL_KOLOMMEN, (fuzzy_score, aantal, totaalprijs_boek, verwacht, prijs_op_factuur, afwijking)):
+            self._getallen[kolom].append(_getal(waarde))
+        for kolom, waarde in zip(TEKST_KOLOMMEN, (taakcode_gevonden, taakcode, omschrijving)):
+            self._teksten[kolom].append(waarde)
+        for nr in regelnummers:
+            idx = uniek.get(nr)
+            if idx is None:
+                idx = uniek[nr] = len(self.regelteksten)
+                self.regelteksten.append(regels[nr])
+            self._regel_idx.append(idx)
+        self._regel_grens.append(len(self._regel_idx))
+
+    def voeg_samen(self, andere: "ResultaatBouwer"):
+        """Voeg de regels van een andere bouwer achteraan toe."""
+        for kolom, categorie in self._categorie.items():
+            categorie.voeg_samen(andere._categorie[kolom])
+        for kolom, waarden in self._getallen.items():
+            waarden.extend(andere._getallen[kolom])
+        for kolom, waarden in self._teksten.items():
+            waarden.extend(andere._teksten[kolom])
+        verschuiving = len(self.regelteksten)
+        self.regelteksten.extend(andere.regelteksten)
+        self._regel_idx.extend(array("i", (i + verschuiving for i in andere._regel_idx)))
+        basis = self._regel_grens[-1]
+        self._regel_grens.extend(array("i", (g + basis for g in andere._regel_grens[1:])))
+
+    def regels(self, i: int) -> str:
+        """Samengevoegde regeltekst van resultaatregel i (pas bij opvragen opgebouwd)."""
+        return REGEL_SCHEIDING.join(self.regelteksten[j] for j in self._regel_idx[self._regel_grens[i]:self._regel_grens[i + 1]])
+
+    def _alle_regels(self):
+        teksten, idx, grens = self.regelteksten, self._regel_idx, self._regel_grens
+        for begin, eind in zip(grens, islice(grens, 1, None)):
+            if eind - begin == 1:  # meestal één regel: de tekst zelf, zonder join
+                yield teksten[idx[begin]]
+            else:
+                yield REGEL_SCHEIDING.join([teksten[j] for j in idx[begin:eind]])
+
+    def _kolom(self, kolom: str):
+        """Waarden van één kolom als iterable van Python-waarden (None voor ontbrekend)."""
+        if kolom in self._categorie:
+            categorie = self._categorie[kolom]
+            return (categorie.categorieen[c] if c >= 0 else None for c in categorie.codes)
+        if kolom in self._getallen:
+            return map(_of_none, self._getallen[kolom])
+        if kolom == "Regels":
+            return self._alle_regels()
+        return iter(self._teksten[kolom])
+
+    def rijen(self, kolommen=KOLOMMEN):
+        """Regels als tuples in de volgorde van `kolommen` (standaard KOLOMMEN)."""
+        return zip(*(self._kolom(k) for k in kolommen))
+
+    def __iter__(self):
+        return (dict(zip(KOLOMMEN, rij)) for rij in self.rijen())
+
+    def db_rijen(self, run_id: int, kolommen=KOLOMMEN):
+        """(run_id, *waarden) per regel, klaar voor executemany."""
+        return zip(repeat(run_id), *(self._kolom(k) for k in kolommen))
+
+    def tel_status(self, status: str) -> int:
+        categorie = self._categorie["Status"]
+        code = categorie._codes_per_waarde.get(status)
+        return 0 if code is None else categorie.codes.count(code)
+
+    def naar_df(self) -> pd.DataFrame:
+        """DataFrame met float64-kolommen voor bedragen en categorische kolommen voor de herhaalde teksten."""
+        data = {}
+        for kolom in KOLOMMEN:
+            if kolom in self._categorie:
+                data[kolom] = self._categorie[kolom].naar_pandas()
+            elif kolom in self._getallen:
+                data[kolom] = np.frombuffer(self._getallen[kolom], dtype=np.float64)
+            else:
+                data[kolom] = list(self._kolom(kolom))
+        return pd.DataFrame(data, columns=KOLOMMEN)
+
+
+def voeg_samen(bouwers) -> ResultaatBouwer:
+    """Eén bouwer met de regels van alle bouwers, in volgorde."""
+    alle = ResultaatBouwer()
+    for bouwer in bouwers:
+        alle.voeg_samen(bouwer)
+    return alle
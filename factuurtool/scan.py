@@ -0,0 +1,211 @@
+# Scan-orkestratie buiten Streamlit: bestanden selecteren (reeds verwerkt overslaan), parallel
+# verwerken en resultaten omzetten naar DataFrames. Gebruikt door de app en de CLI.
+
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .export import Blad, blad_uit_df, schrijf_xlsx
+from .historie import IngestieRegister
+from .resultaten import KOLOMMEN, ResultaatBouwer
+from .uploads import bestandsnaam
+from .verwerking import verwerk_pdfs_parallel
+
+# Meetwaarden per factuur (sleutels uit process_pdf_path/voer_scan_uit) -> kolommen in de UI/historie
+METING_KOLOMMEN = {
+    "bestand": "Bestandsnaam",
+    "paginas": "Pagina's",
+    "ocr_gebruikt": "OCR",
+    "ocr_paginas": "OCR-pagina's",
+    "overgeslagen_paginas": "Overgeslagen pagina's",
+    "ocr_profiel": "OCR-profiel",
+    "cache_hit": "Cache-hit",
+    "vingerafdruk": "Vingerafdruk (s)",
+    "cache": "Cache (s)",
+    "tekst": "Tekstextractie (s)",
+    "ocr": "OCR (s)",
+    "codes": "Codedetectie (s)",
+    "matching": "Matching (s)",
+    "opslag": "Opslag (s)",
+    "totaal": "Totaal (s)",
+}
+
+NUMERIEKE_RESULTAAT_KOLOMMEN = ["Totaalprijs boek", "Verwacht bedrag", "Prijs op factuur (som)", "Afwijking", "Aantal (geschat)", "Fuzzy_score"]
+
+
+def zoek_pdfs(folder: str):
+    """Alle *.pdf onder een map (recursief, gesorteerd); lege lijst als de map niet bestaat."""
+    p = Path(folder)
+    if not p.exists():
+        return []
+    return sorted([str(x) for x in p.glob("**/*.pdf")])
+
+
+def voer_scan_uit(
+    paths,
+    prijzenboek,
+    history_db_path: str,
+    controleer_ingestie: bool = True,
+    bron_ids: dict = None,
+    workers: int = 1,
+    bij_voortgang=None,
+    bij_fout=None,
+    bij_bestand=None,
+    metingen: list = None,
+    **opties,
+):
+    """Verwerk een lijst PDF-paden en geef alle resultaatregels terug (ResultaatBouwer, in bronvolgorde).
+
+    Met controleer_ingestie worden reeds verwerkte bestanden (op inhoud of bron-id) overgeslagen
+    en nieuw verwerkte bestanden geregistreerd. bij_voortgang(afgerond, totaal, tekst) en
+    bij_fout(path, melding) zijn optionele callbacks; opties gaan door naar process_pdf_path.
+    bij_bestand(path, status, rows, fout, meting) meldt per bestand 'overgeslagen', 'klaar' of
+    'fout', in bronvolgorde, zodat resultaten al tijdens de scan weggeschreven kunnen worden.
+    Met een lijst `metingen` komt daarin per verwerkt bestand een dict met de duur per stap,
+    het aantal pagina's en de OCR-/cachevlag (sleutels als in METING_KOLOMMEN).
+    """
+    bron_ids = bron_ids or {}
+    total = len(paths)
+    all_rows = ResultaatBouwer()
+
+    def voortgang(afgerond, tekst):
+        if bij_voortgang is not None:
+            bij_voortgang(afgerond, total, tekst)
+
+    # Reeds verwerkte bestanden één keer inladen; nieuwe registraties gaan gebundeld naar de DB
+    with IngestieRegister(history_db_path) as register:
+        # Eerst bepalen welke bestanden verwerkt moeten worden (double-processing voorkomen)
+        # Herkenning gaat op inhoud (vingerafdruk) of SharePoint-id, niet op pad: tijdelijke
+        # downloads en verplaatste bestanden worden zo ook als reeds verwerkt herkend.
+        taken = []
+        ingestie = {}
+        vingerafdruk_duur = {}
+        gezien = set()
+        for idx, path in enumerate(paths):
+            if controleer_ingestie:
+                start = time.perf_counter()
+                try:
+                    mtime = os.path.getmtime(path)
+                except Exception:
+                    mtime = float(datetime.now().timestamp())
+                bron_id = bron_ids.get(path)
+                vingerafdruk = None
+                if not register.is_verwerkt(bron_id=bron_id):
+                    try:
+                        vingerafdruk = register.vingerafdruk(path, mtime)
+                    except Exception:
+                        vingerafdruk = None
+                vingerafdruk_duur[idx] = time.perf_counter() - start
+                if register.is_verwerkt(vingerafdruk, bron_id) or (vingerafdruk and vingerafdruk in gezien):
+                    voortgang(idx + 1, f"Overgeslagen (reeds verwerkt): {bestandsnaam(path)}")
+                    if bij_bestand is not None:
+                        bij_bestand(path, "overgeslagen", [], None, None)
+                    continue
+                if vingerafdruk:
+                    gezien.add(vingerafdruk)
+                ingestie[idx] = (vingerafdruk, mtime, bron_id)
+            # De vingerafdruk gaat mee naar de worker als basis van de cachesleutel (één hash per bestand)
+            taken.append((idx, path, ingestie.get(idx, (None,))[0]))
+
+        # Resultaten komen binnen in volgorde van afronden; we leggen ze vast in bronvolgorde
+        # zodat de resultaattabel en de 'reeds verwerkt'-registratie deterministisch blijven.
+        klaar = {}
+        volgende = 0
+        afgerond = total - len(taken)
+        # Cache-hits en -misses (ook uit de workers, via de metingen) tellen en na de scan in één keer bijschrijven
+        cache_tellers = [0, 0]
+        for idx, path, rows, fout, meting in verwerk_pdfs_parallel(taken, prijzenboek, workers=workers, **opties):
+            afgerond += 1
+            if meting.get("cache_hit") is not None:
+                cache_tellers[0 if meting["cache_hit"] else 1] += 1
+            if fout is not None and bij_fout is not None:
+                bij_fout(path, fout)
+            meting = {"bestand": bestandsnaam(path), "vingerafdruk": vingerafdruk_duur.get(idx), **meting}
+            klaar[idx] = (path, rows, fout, meting)
+            while volgende < len(taken) and taken[volgende][0] in klaar:
+                k_idx = taken[volgende][0]
+                k_path, k_rows, k_fout, k_meting = klaar.pop(k_idx)
+                volgende += 1
+                if k_fout is not None:
+                    if bij_bestand is not None:
+                        bij_bestand(k_path, "fout", [], k_fout, k_meting)
+                    continue
+                if metingen is not None:
+                    metingen.append(k_meting)
+                all_rows.voeg_samen(k_rows)
+                if k_idx in ingestie:
+                    try:
+                        register.markeer(k_path, *ingestie[k_idx])
+                    except Exception:
+                        pass
+                if bij_bestand is not None:
+                    bij_bestand(k_path, "klaar", k_rows, None, k_meting)
+            voortgang(afgerond, f"Verwerkt: {bestandsnaam(path)}")
+
+    if opties.get("cache") is not None:
+        try:
+            opties["cache"].tel(*cache_tellers)
+        except Exception:
+            pass
+    return all_rows
+
+
+def maak_resultaat_df(all_rows) -> pd.DataFrame:
+    """Resultaatregels (ResultaatBouwer of lijst dicts) als DataFrame."""
+    if isinstance(all_rows, ResultaatBouwer):
+        return all_rows.naar_df()
+    resultaat_df = pd.DataFrame(all_rows)
+    # Normaliseer numerieke kolommen naar float voor Pandas/Excel
+    for _col in NUMERIEKE_RESULTAAT_KOLOMMEN:
+        if _col in resultaat_df.columns:
+            resultaat_df[_col] = pd.to_numeric(resultaat_df[_col], errors="coerce")
+    return resultaat_df
+
+
+def maak_metingen_df(metingen) -> pd.DataFrame:
+    """Meetwaarden per factuur als DataFrame met de kolommen uit METING_KOLOMMEN."""
+    df = pd.DataFrame(list(metingen), columns=list(METING_KOLOMMEN))
+    return df.rename(columns=METING_KOLOMMEN)
+
+
+def overgeslagen_paginas(metingen_df: pd.DataFrame) -> list:
+    """(bestandsnaam, aantal) voor elke factuur met overgeslagen pagina's (leeg of zonder taakcodes)."""
+    kolom = METING_KOLOMMEN["overgeslagen_paginas"]
+    if metingen_df is None or kolom not in metingen_df.columns:
+        return []
+    aantallen = pd.to_numeric(metingen_df[kolom], errors="coerce").fillna(0).astype(int)
+    return [(b, a) for b, a in zip(metingen_df[METING_KOLOMMEN["bestand"]], aantallen) if a > 0]
+
+
+def maak_factuur_summary(resultaat_df: pd.DataFrame, tolerantie: float) -> pd.DataFrame:
+    """Factuuroverzicht: totaal per factuur en afwijking ten opzichte van verwacht."""
+    factuur_summary = resultaat_df.groupby("Bestandsnaam", observed=True).agg({
+        "Prijs op factuur (som)": "sum",
+        "Verwacht bedrag": "sum",
+    }).reset_index().rename(columns={
+        "Prijs op factuur (som)": "Totaal prijs op factuur",
+        "Verwacht bedrag": "Totaal verwacht bedrag",
+    })
+    factuur_summary["Totaal afwijking"] = (pd.to_numeric(factuur_summary["Totaal prijs op factuur"], errors="coerce") - pd.to_numeric(factuur_summary["Totaal verwacht bedrag"], errors="coerce")).abs().round(2)
+    factuur_summary["Status factuur"] = factuur_summary["Totaal afwijking"].apply(
+        lambda diff: "✅ Binnen marge" if pd.notna(diff) and diff <= tolerantie else "❌ Afwijking"
+    )
+    return factuur_summary
+
+
+def schrijf_excel(pad_of_buffer, resultaat_df: pd.DataFrame, factuur_summary: pd.DataFrame, metingen_df: pd.DataFrame = None):
+    """Excel met Resultaten, Factuur overzicht en (indien aanwezig) Metingen, rij voor rij gestreamd.
+
+    resultaat_df mag ook een ResultaatBouwer zijn; de regels gaan dan zonder DataFrame naar het bestand.
+    """
+    if isinstance(resultaat_df, ResultaatBouwer):
+        resultaten = Blad("Resultaten", list(KOLOMMEN), resultaat_df.rijen())
+    else:
+        resultaten = blad_uit_df("Resultaten", resultaat_df)
+    bladen = [resultaten, blad_uit_df("Factuur overzicht", factuur_summary)]
+    if metingen_df is not None and not metingen_df.empty:
+        bladen.append(blad_uit_df("Metingen", metingen_df))
+    schrijf_xlsx(pad_of_buffer, bladen)
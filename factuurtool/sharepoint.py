@@ -0,0 +1,197 @@
+# SharePoint-synchronisatie: houd een lokale spiegelmap bij en download alleen nieuwe of
+# gewijzigde PDF's (op basis van UniqueId + ETag), gelijktijdig met een begrensde thread-pool.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# ==== Optionele SharePoint client ====
+SHAREPOINT_BESCHIKBAAR = False
+try:
+    from office365.sharepoint.client_context import ClientContext
+    from office365.runtime.auth.user_credential import UserCredential
+    SHAREPOINT_BESCHIKBAAR = True
+except Exception:
+    SHAREPOINT_BESCHIKBAAR = False
+
+SharePointItem = namedtuple("SharePointItem", ["naam", "url", "unique_id", "etag", "gewijzigd"])
+
+MANIFEST_NAAM = ".sharepoint_manifest.json"
+
+
+class Office365Bron:
+    """Een SharePoint-map via de office365 ClientContext.
+
+    De geauthenticeerde context wordt één keer opgebouwd en over scans hergebruikt. Downloads
+    lopen in threads; elke thread krijgt één eigen context (ClientContext is niet thread-safe).
+    """
+
+    def __init__(self, site_url: str, username: str, password: str, library: str = "Gedeelde documenten", folder_path: str = ""):
+        if not SHAREPOINT_BESCHIKBAAR:
+            raise RuntimeError("SharePoint client niet beschikbaar. Installeer 'Office365-REST-Python-Client' (package: office365-sharepoint).")
+        self.site_url = site_url
+        self._credentials = (username, password)
+        self.map_url = f"/sites/{site_url.split('/sites/')[-1]}/{library}/{folder_path}"
+        self._lokaal = threading.local()
+
+    def _context(self):
+        ctx = getattr(self._lokaal, "ctx", None)
+        if ctx is None:
+            ctx = ClientContext(self.site_url).with_credentials(UserCredential(*self._credentials))
+            self._lokaal.ctx = ctx
+        return ctx
+
+    def lijst(self):
+        folder = self._context().web.get_folder_by_server_relative_url(self.map_url)
+        files = folder.files.get().execute_query()
+        items = []
+        for f in files:
+            naam = str(f.properties.get('Name', ''))
+            items.append(SharePointItem(
+                naam=naam,
+                url=f.serverRelativeUrl,
+                unique_id=str(f.properties.get('UniqueId') or f.serverRelativeUrl),
+                etag=str(f.properties.get('ETag') or f.properties.get('TimeLastModified') or ''),
+                gewijzigd=str(f.properties.get('TimeLastModified') or ''),
+            ))
+        return items
+
+    def download(self, item: SharePointItem, fh):
+        self._context().web.get_file_by_server_relative_url(item.url).download(fh).execute_query()
+
+
+class MapBron:
+    """Lokale stand-in voor een SharePoint-map (tests en demo's zonder Microsoft 365).
+
+    Gedraagt zich als Office365Bron: het relatieve pad is de UniqueId, mtime + grootte de ETag.
+    """
+
+    def __init__(self, map_pad: str):
+        self.map_pad = map_pad
+
+    def lijst(self):
+        items = []
+        for naam in sorted(os.listdir(self.map_pad)):
+            pad = os.path.join(self.map_pad, naam)
+            if not os.path.isfile(pad):
+                continue
+            st = os.stat(pad)
+            items.append(SharePointItem(
+                naam=naam,
+                url=pad,
+                unique_id=naam,
+                etag=f"{st.st_mtime_ns}-{st.st_size}",
+                gewijzigd=str(st.st_mtime),
+            ))
+        return items
+
+    def download(self, item: SharePointItem, fh):
+        with open(item.url, "rb") as bron:
+            shutil.copyfileobj(bron, fh)
+
+
+def standaard_spiegelmap(*sleutel) -> str:
+    """Vaste spiegelmap per SharePoint-locatie onder de tijdelijke map van het systeem."""
+    h = hashlib.sha256("|".join(str(s) for s in sleutel).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), "factuurtool_sharepoint", h)
+
+
+class SharePointSync:
+    """Synchroniseer PDF's uit een bron (Office365Bron of MapBron) naar een lokale spiegelmap.
+
+    Een manifest in de spiegelmap onthoudt per UniqueId de ETag van de gedownloade versie;
+    alleen nieuwe of gewijzigde items worden (gelijktijdig, max `max_workers`) gedownload.
+    Items die uit de bron verdwenen zijn, worden ook uit de spiegelmap verwijderd.
+    """
+
+    def __init__(self, bron, spiegelmap: str, max_workers: int = 4):
+        self.bron = bron
+        self.spiegelmap = spiegelmap
+        self.max_workers = max(1, int(max_workers))
+        self._pool = None
+        self._lock = threading.Lock()
+        self.laatste_fouten = []
+        os.makedirs(spiegelmap, exist_ok=True)
+
+    @property
+    def _manifest_pad(self):
+        return os.path.join(self.spiegelmap, MANIFEST_NAAM)
+
+    def _lees_manifest(self) -> dict:
+        try:
+            with open(self._manifest_pad, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _schrijf_manifest(self, manifest: dict):
+        tmp = self._manifest_pad + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp, self._manifest_pad)
+
+    def _lokaal_pad(self, item: SharePointItem) -> str:
+        naam = os.path.basename(item.naam) or hashlib.sha256(item.unique_id.encode("utf-8")).hexdigest()[:16] + ".pdf"
+        return os.path.join(self.spiegelmap, naam)
+
+    def _download(self, item: SharePointItem) -> str:
+        pad = self._lokaal_pad(item)
+        tmp = pad + ".part"
+        with open(tmp, "wb") as fh:
+            self.bron.download(item, fh)
+        os.replace(tmp, pad)
+        return pad
+
+    def sync(self):
+        """Werk de spiegelmap bij; geeft [(lokaal_pad, bron_id, gedownload)] in bronvolgorde.
+
+        Mislukte downloads worden overgeslagen en staan daarna in `laatste_fouten`.
+        """
+        with self._lock:
+            items = [i for i in self.bron.lijst() if i.naam.lower().endswith(".pdf")]
+            manifest = self._lees_manifest()
+            fouten = []
+
+            nieuw = []
+            for item in items:
+                bekend = manifest.get(item.unique_id)
+                if not bekend or bekend.get("etag") != item.etag or not os.path.exists(bekend.get("pad", "")):
+                    nieuw.append(item)
+
+            if nieuw:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sharepoint")
+                for item, fut in [(i, self._pool.submit(self._download, i)) for i in nieuw]:
+                    try:
+                        manifest[item.unique_id] = {"etag": item.etag, "pad": fut.result(), "naam": item.naam}
+                    except Exception as e:
+                        fouten.append(f"{item.naam}: {e}")
+                        manifest.pop(item.unique_id, None)
+
+            # verdwenen items opruimen
+            actueel = {i.unique_id for i in items}
+            for unique_id in [u for u in manifest if u not in actueel]:
+                try:
+                    os.remove(manifest[unique_id]["pad"])
+                except OSError:
+                    pass
+                del manifest[unique_id]
+            self._schrijf_manifest(manifest)
+            self.laatste_fouten = fouten
+
+            gedownload = {i.unique_id for i in nieuw}
+            return [
+                (manifest[i.unique_id]["pad"], f"sp:{i.unique_id}:{i.etag}", i.unique_id in gedownload)
+                for i in items
+                if i.unique_id in manifest
+            ]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,89 @@
+# Geüploade PDF's in het geheugen. Een upload wordt niet meer naar de gedeelde tempmap
+# geschreven (extra kopie, en twee sessies met dezelfde bestandsnaam overschreven elkaar), maar
+# als PdfInGeheugen door de scan gegeven: pdfplumber leest uit een BytesIO over dezelfde bytes,
+# de vingerafdruk (ook de basis van de cachesleutel) wordt over de bytes berekend. Alleen poppler (OCR) heeft echt
+# een pad nodig; daarvoor wordt per document één tijdelijk bestand in een eigen map gemaakt.
+
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+
+
+class PdfInGeheugen:
+    """Een PDF als bytes (bijv. een Streamlit-upload), bruikbaar op de plek van een pad in de scan.
+
+    Wordt als geheel gepickled naar worker-processen; str() geeft de bestandsnaam.
+    """
+
+    def __init__(self, naam: str, data: bytes):
+        self.naam = os.path.basename(naam or "") or "upload.pdf"
+        self.data = data
+        self._vingerafdruk = None
+
+    def __str__(self):
+        return self.naam
+
+    def __repr__(self):
+        return f"PdfInGeheugen({self.naam!r}, {len(self.data)} bytes)"
+
+    def stream(self) -> BytesIO:
+        # BytesIO over onveranderlijke bytes deelt de buffer (geen kopie zolang er niet geschreven wordt)
+        return BytesIO(self.data)
+
+    @property
+    def vingerafdruk(self) -> str:
+        """Vingerafdruk van de inhoud, in hetzelfde formaat als historie.vingerafdruk_bestand."""
+        if self._vingerafdruk is None:
+            self._vingerafdruk = f"{len(self.data)}:{hashlib.blake2b(memoryview(self.data), digest_size=16).hexdigest()}"
+        return self._vingerafdruk
+
+
+def bestandsnaam(bron) -> str:
+    """Bestandsnaam van een pad of een PdfInGeheugen."""
+    return bron.naam if isinstance(bron, PdfInGeheugen) else os.path.basename(bron)
+
+
+def open_bron(bron):
+    """Argument voor pdfplumber.open: het pad, of een stream over de bytes in het geheugen."""
+    return bron.stream() if isinstance(bron, PdfInGeheugen) else bron
+
+
+@contextmanager
+def als_pad(bron):
+    """Pad voor tools die een bestand nodig hebben (poppler); voor PDF's in het geheugen tijdelijk.
+
+    Het tijdelijke bestand staat in een eigen map per aanroep, zodat gelijke bestandsnamen uit
+    verschillende sessies elkaar niet raken, en wordt daarna direct verwijderd.
+    """
+    if not isinstance(bron, PdfInGeheugen):
+        yield bron
+        return
+    map_pad = tempfile.mkdtemp(prefix="factuurtool-")
+    try:
+        pad = os.path.join(map_pad, bron.naam)
+        with open(pad, "wb") as fh:
+            fh.write(bron.data)
+        yield pad
+    finally:
+        shutil.rmtree(map_pad, ignore_errors=True)
+
+
+def uploads_in_geheugen(bestanden):
+    """PdfInGeheugen per upload, zonder dubbele inhoud; geeft (pdfs, namen van overgeslagen dubbelen).
+
+    Van bestanden met dezelfde inhoud (vingerafdruk) wordt alleen de eerste verwerkt.
+    """
+    pdfs, dubbel, gezien = [], [], set()
+    for f in bestanden or []:
+        # getvalue() van een upload (BytesIO) geeft de bestaande bytes terug, zonder kopie
+        data = f.getvalue() if hasattr(f, "getvalue") else f.read()
+        pdf = PdfInGeheugen(getattr(f, "name", None), data)
+        if pdf.vingerafdruk in gezien:
+            dubbel.append(pdf.naam)
+            continue
+        gezien.add(pdf.vingerafdruk)
+        pdfs.append(pdf)
+    return pdfs, dubbel
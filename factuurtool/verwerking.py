@@ -0,0 +1,1031 @@
+# Verwerkingslogica van de factuurcontrole (PDF/OCR-extractie, parsing en matching).
+# Staat los van Streamlit zodat de functies ook in worker-processen geïmporteerd kunnen worden.
+
+import hashlib
+import os
+import re
+import shutil
+import time
+from collections import deque, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from itertools import count
+from operator import itemgetter
+
+import pandas as pd
+import pdfplumber
+from pdfplumber.utils import cluster_objects
+from pdf2image import convert_from_path, pdfinfo_from_path
+import pytesseract
+
+from .resultaten import (
+    STATUS_AFWIJKING,
+    STATUS_BEDRAG_NIET_GEVONDEN,
+    STATUS_BINNEN_MARGE,
+    STATUS_ONBEKENDE_TAAKCODE,
+    ResultaatBouwer,
+)
+from .uploads import als_pad, bestandsnaam, open_bron
+
+def clean_ocr_noise(s: str) -> str:
+    if not s:
+        return s
+    s = s.replace("m?", "m2").replace("M?", "m2").replace("m^2", "m2").replace("m°", "m2")
+    s = s.replace("O,", "0,").replace("O.", "0.")
+    return s
+
+
+_RAPIDFUZZ_OK = False  # Fuzzy matching uitgeschakeld in deze versie
+
+# === INSTELLINGEN ===
+# (Aangepast voor Sem) – maak paden OS-agnostisch en veilig
+TESSERACT_PATH = r"C:\Users\Sem Kosse\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
+POPLER_PATH = r"C:\poppler\poppler-24.08.0\Library\bin"  # Windows-poppler pad, val terug naar None als niet aanwezig
+
+# Kies tesseract bin: op Windows het vaste pad als het bestaat; anders via PATH als beschikbaar
+if os.name == "nt" and os.path.exists(TESSERACT_PATH):
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+else:
+    auto_tesseract = shutil.which("tesseract")
+    if auto_tesseract:
+        pytesseract.pytesseract.tesseract_cmd = auto_tesseract
+
+# Alleen een poppler_path meegeven als het pad bestaat (voorkomt fouten op Linux/macOS)
+if not (os.name == "nt" and os.path.isdir(POPLER_PATH)):
+    POPLER_PATH = None
+
+
+def extract_factuurnummer(tekst: str, filename: str = "") -> str:
+    if not tekst:
+        tekst = ""
+    patterns = [
+        r"factuurnummer\s*[:#]?\s*([A-Z0-9\-/]{5,})",
+        r"factuur\s*nr\.?\s*[:#]?\s*([A-Z0-9\-/]{5,})",
+        r"factuurnr\.?\s*[:#]?\s*([A-Z0-9\-/]{5,})",
+        r"invoice\s*(?:no|nr|number)\s*[:#]?\s*([A-Z0-9\-/]{5,})",
+        r"kenmerk\s*[:#]?\s*([A-Z0-9\-/]{5,})",
+    ]
+    low = (tekst or "").lower()
+    for pat in patterns:
+        m = re.search(pat, low, flags=re.IGNORECASE)
+        if m:
+            return m.group(1).strip().rstrip('.')
+    base = (filename or "").split('/')[-1]
+    m = re.search(r"(\d{6,})", base)
+    return m.group(1) if m else base
+# ========== OCR & PARSING HELPERS ==========
+
+# Instellingen die de uitkomst van de extractie bepalen; onderdeel van de cachesleutel.
+# Verhoog EXTRACTIE_VERSIE als de extractielogica verandert, zodat oude cache-items vervallen.
+EXTRACTIE_VERSIE = 4
+# Routering per pagina: een pagina met minstens zoveel tekens (geen witruimte) in de tekstlaag
+# wordt via pdfplumber gelezen, anders via OCR.
+TEKSTLAAG_MIN_TEKENS = 20
+# Woorden waarvan de bovenkant minder dan dit (pt) verschilt, horen bij dezelfde regel
+TEKST_Y_TOLERANTIE = 3
+# tesseract-opties voor de OCR-probe (zie probe_dpi in de OCR-profielen): alleen cijfers
+OCR_PROBE_CONFIG = "--psm 6 -c tessedit_char_whitelist=0123456789.-"
+
+# OCR-profielen: resolutie, voorbewerking en tesseract-opties per pagina.
+#   dpi        renderresolutie
+#   grijs      in grijswaarden renderen (kleiner, sneller)
+#   drempel    binariseren: pixels lichter dan deze grijswaarde worden wit, de rest zwart (None = niet)
+#   regio      bijsnijden tot (links, boven, rechts, onder) als fractie van de pagina, bijv. tot het
+#              regelgebied van een leverancier met een vaste lay-out (None = hele pagina)
+#   config     tesseract-opties, bijv. "-c tessedit_char_whitelist=..." voor alleen cijfers/bedragen
+#   probe_dpi  eerst een snelle OCR-probe op deze lage resolutie (alleen cijfers); een pagina zonder
+#              cijferreeks die op een taakcode lijkt wordt overgeslagen (None = geen probe). Pagina's
+#              mét codes worden zo twee keer geOCR'd: alleen zinvol bij scans met veel pagina's zonder
+#              regels (voorwaarden, bijlagen). Niet gevalideerd op de voorbeeldfacturen, dus opt-in
+#              via het profiel "snel-met-probe".
+# Zie benchmarks/bench_ocr.py voor doorvoer vs. nauwkeurigheid per profiel.
+
+# Tekens in taakcodes, omschrijvingen, aantallen en bedragen (whitelist voor het profiel "regelgebied")
+OCR_REGEL_TEKENS = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    ",.-/%:()&+€éëÉ"
+)
+OcrProfiel = namedtuple("OcrProfiel", ["dpi", "grijs", "drempel", "regio", "config", "probe_dpi"], defaults=(None,))
+OCR_PROFIELEN = {
+    "snel": OcrProfiel(dpi=150, grijs=True, drempel=None, regio=None, config="--psm 6"),
+    "snel-met-probe": OcrProfiel(dpi=150, grijs=True, drempel=None, regio=None, config="--psm 6", probe_dpi=100),
+    "gebalanceerd": OcrProfiel(dpi=200, grijs=False, drempel=None, regio=None, config="--psm 6"),
+    "nauwkeurig": OcrProfiel(dpi=300, grijs=True, drempel=170, regio=None, config="--psm 6 -c preserve_interword_spaces=1"),
+    # KernBouw-lay-out, gemeten op de voorbeeldfacturen "Kernbouw *.pdf" (30 pagina's, zie
+    # benchmarks/bench_ocr.py --voorbeelden): het logo loopt tot 9% van de paginahoogte, op
+    # vervolgpagina's begint de eerste regel op 12%; regels lopen tot 91%, daaronder staat alleen
+    # "x van y" (97%); tekst tussen 9% en 93% van de breedte. Met deze regio: 610 tekstregels
+    # binnen, 0 doorgesneden, 54 buiten (logo's en paginanummers). De eerdere regio uit het
+    # synthetische corpus (bovenkant 13%) sneed op 14 vervolgpagina's de eerste regel door.
+    # Doorvoer en herkenning met tesseract zijn nog niet op de voorbeelden gemeten. Alleen tekens
+    # die in regels voorkomen. Niet voor Toekomstservice: daar lopen logo en vlakken tot in de regio.
+    "regelgebied": OcrProfiel(
+        dpi=200, grijs=True, drempel=None, regio=(0.05, 0.10, 0.95, 0.95),
+        config=f"--psm 6 -c tessedit_char_whitelist={OCR_REGEL_TEKENS}",
+    ),
+}
+STANDAARD_OCR_PROFIEL = "gebalanceerd"
+
+
+def kies_ocr_profiel(naam: str = None) -> OcrProfiel:
+    try:
+        return OCR_PROFIELEN[naam or STANDAARD_OCR_PROFIEL]
+    except KeyError:
+        raise ValueError(f"Onbekend OCR-profiel {naam!r}; kies uit {', '.join(OCR_PROFIELEN)}.") from None
+
+
+def extractie_instellingen(ocr_profiel_naam: str = None) -> str:
+    p = kies_ocr_profiel(ocr_profiel_naam)
+    return (
+        f"v{EXTRACTIE_VERSIE}|dpi={p.dpi}|fmt=png|grijs={p.grijs}|drempel={p.drempel}|regio={p.regio}|{p.config}"
+        f"|tekstlaag={TEKSTLAAG_MIN_TEKENS}|probe={p.probe_dpi}"
+    )
+
+
+# OCR verwerkt pagina's streaming: hoogstens zoveel gerenderde pagina's tegelijk in het geheugen.
+OCR_MAX_IN_FLIGHT = max(1, min(4, os.cpu_count() or 1))
+
+
+def ocr_threads_per_worker(workers: int) -> int:
+    """OCR-threads per worker-proces: samen niet meer tesseract-processen dan er CPU's zijn."""
+    return max(1, min(OCR_MAX_IN_FLIGHT, (os.cpu_count() or 1) // max(1, int(workers))))
+
+
+def _ocr_afbeelding(image, config: str):
+    try:
+        return pytesseract.image_to_string(image, config=config)
+    finally:
+        # afbeelding direct vrijgeven zodra de tekst eruit is
+        image.close()
+
+
+def _voorbewerk(image, profiel: OcrProfiel):
+    """Bijsnijden en binariseren volgens het profiel; de originele afbeelding wordt vrijgegeven."""
+    if profiel.regio:
+        breedte, hoogte = image.size
+        links, boven, rechts, onder = profiel.regio
+        bijgesneden = image.crop((int(links * breedte), int(boven * hoogte), int(rechts * breedte), int(onder * hoogte)))
+        image.close()
+        image = bijgesneden
+    if profiel.drempel is not None:
+        drempel = profiel.drempel
+        grijs = image if image.mode == "L" else image.convert("L")
+        zwartwit = grijs.point(lambda v: 255 if v > drempel else 0)
+        if grijs is not image:
+            grijs.close()
+        image.close()
+        image = zwartwit
+    return image
+
+
+def _probe_vindt_codes(cijfers: str) -> bool:
+    # Zonder letters lopen aantal, code en bedragen op een regel in elkaar over ("100 2120093001
+    # 2360"), dus naast detecteer_codes ook per los woord kijken of het een taakcode kan zijn.
+    return bool(detecteer_codes(cijfers)) or any(
+        CODE_MIN_LEN <= len(normalize_code(woord)) <= CODE_MAX_LEN for woord in cijfers.split()
+    )
+
+
+def _ocr_pagina(pdf_path, paginanr: int, kwargs: dict, profiel: OcrProfiel):
+    """Render en OCR één pagina; None als de probe er geen taakcode-achtige cijfers op vindt."""
+    if profiel.probe_dpi:
+        probe = convert_from_path(pdf_path, dpi=profiel.probe_dpi, grayscale=True, first_page=paginanr, last_page=paginanr, **kwargs)
+        cijfers = "".join(_ocr_afbeelding(image, OCR_PROBE_CONFIG) for image in probe)
+        if not _probe_vindt_codes(cijfers):
+            return None
+    images = convert_from_path(
+        pdf_path, dpi=profiel.dpi, fmt="png", grayscale=profiel.grijs, first_page=paginanr, last_page=paginanr, **kwargs
+    )
+    return "".join(_ocr_afbeelding(_voorbewerk(image, profiel), profiel.config) for image in images)
+
+
+def ocr_paginas(pdf_path, poppler_path, max_in_flight: int = None, paginas=None, profiel: str = None):
+    """Render en OCR een PDF pagina voor pagina; levert de tekst per pagina in paginavolgorde.
+
+    profiel is de naam van een OCR-profiel (zie OCR_PROFIELEN, standaard STANDAARD_OCR_PROFIEL).
+    paginas beperkt de OCR tot die paginanummers (1-based, standaard alle pagina's). Heeft het
+    profiel een probe_dpi, dan leveren pagina's zonder taakcode-achtige cijferreeks None op.
+    Renderen en tesseract draaien in threads met een begrensde wachtrij (max_in_flight), zodat het
+    geheugen niet meegroeit met het aantal pagina's.
+    Standaard OCR_MAX_IN_FLIGHT; bij parallelle verwerking geeft de scan ocr_threads_per_worker mee.
+    """
+    max_in_flight = max(1, int(max_in_flight or OCR_MAX_IN_FLIGHT))
+    profiel = kies_ocr_profiel(profiel)
+    kwargs = {"poppler_path": poppler_path} if poppler_path else {}
+    if paginas is None:
+        paginas = range(1, int(pdfinfo_from_path(pdf_path, **kwargs).get("Pages", 0)) + 1)
+    lopend = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for paginanr in paginas:
+            lopend.append(pool.submit(_ocr_pagina, pdf_path, paginanr, kwargs, profiel))
+            while len(lopend) >= max_in_flight:
+                yield lopend.popleft().result()
+        while lopend:
+            yield lopend.popleft().result()
+
+
+# === Extractie-engine voor bedragen en aantallen ===
+# Alle patronen worden één keer bij het importeren gecompileerd. scan_regel tokeniseert een regel
+# één keer (bedragen + aantal-kandidaten) en onthoudt het resultaat, zodat choose_line_amount,
+# extract_bedragen en pick_qty dezelfde regel niet twee of drie keer opnieuw doorzoeken.
+
+_BEDRAG_UNITS = r"(?:m2|m³|m3|\bm\b|meter|stu?k?s?|st\b|wk\b|uur\b|hrs?\b|kg\b|l\b|liter\b)"
+_RX_BEDRAG = re.compile(
+    rf"(?P<euro>(?:€|eur)\s*)?(?P<num>-?\d{{1,3}}(?:[.\s]\d{{3}})*(?:[.,]\d{{2}})|-?\d+(?:[.,]\d{{2}}))(?!\d)(?P<unit>\s*(?:{_BEDRAG_UNITS}))?",
+    re.IGNORECASE,
+)
+
+# Let op: GEEN 'u' single-letter unit i.v.m. woorden als 'factuur'; losse 'm' wel (bijv. '12,00 m').
+# Naast m, m2, m3, stuk, st, stu etc. ook:
+#  - m1  : strekkende meter
+#  - pst : per stuk
+#  - post: forfaitaire post
+#  - wk  : week
+#  - ruimte: per ruimte (vertrek)
+# Opmerking: \b achter de unit zorgt dat het einde van het woord bereikt is, waardoor bv. 'st' in 'stof' niet matcht.
+_AANTAL_UNITS = r"(?:m1\b|m2|m\^?2|m3|m\^?3|m²|m³|meter\b|m\b|stuk\b|stuks\b|stk\b|st\b|stu\b|pst\b|post\b|pcs\b|pce\b|set\b|uur\b|hrs\b|hr\b|kg\b|l\b|liter\b|wk\b|week\b|ruimte\b)"
+_RX_AANTAL = [
+    # 1) '3 x 50,00' -> 3
+    re.compile(r"(\d+(?:[.,]\d{1,2})?)\s*(?:x|×)\s*\d+(?:[.,]\d{1,2})?", re.IGNORECASE),
+    # 2) 'aantal: 3' / 'qty 2'
+    re.compile(r"(?:aantal|qty|quantiteit)\s*[:=]?\s*(\d+(?:[.,]\d{1,2})?)", re.IGNORECASE),
+    # 3) '3 st' / '2,5 m2'
+    re.compile(rf"(\d+(?:[.,]\d{{1,2}})?)\s*{_AANTAL_UNITS}", re.IGNORECASE),
+    # 4) 'st 3'
+    re.compile(rf"\b{_AANTAL_UNITS}\s*(\d+(?:[.,]\d{{1,2}})?)", re.IGNORECASE),
+    # 5) 'x 3'
+    re.compile(r"(?:x|×)\s*(\d+(?:[.,]\d{1,2})?)", re.IGNORECASE),
+]
+_RX_NIET_CIJFER = re.compile(r"\D")
+
+RegelScan = namedtuple("RegelScan", ["bedragen", "aantallen"])
+
+
+def _parse_bedrag(raw: str):
+    raw = raw.replace('\xa0', ' ').replace(' ', '')
+    if ',' in raw and '.' in raw:
+        if raw.rfind(',') > raw.rfind('.'):
+            raw = raw.replace('.', '').replace(',', '.')
+        else:
+            raw = raw.replace(',', '')
+    else:
+        raw = raw.replace(',', '.')
+    return float(raw)
+
+
+@lru_cache(maxsize=8192)
+def scan_regel(tekstregel: str) -> RegelScan:
+    """Tokeniseer een regel één keer.
+
+    bedragen: tuple van (waarde, has_euro, has_unit) per bedrag-match.
+    aantallen: tuple van aantal-kandidaten o.b.v. expliciete cues (units/x/aantal), per patroon
+    in volgorde van voorkomen.
+    """
+    if not tekstregel:
+        return RegelScan((), ())
+
+    bedragen = []
+    for m in _RX_BEDRAG.finditer(clean_ocr_noise(tekstregel)):
+        try:
+            val = _parse_bedrag(m.group('num'))
+        except Exception:
+            continue
+        if abs(val) <= 250000:
+            bedragen.append((round(val, 2), bool(m.group('euro')), bool((m.group('unit') or '').strip())))
+
+    low = tekstregel.lower()
+    aantallen = []
+    for rx in _RX_AANTAL:
+        for m in rx.finditer(low):
+            try:
+                q = float(m.group(1).replace(",", "."))
+            except Exception:
+                continue
+            if 0 < q <= 100000:
+                aantallen.append(q)
+    return RegelScan(tuple(bedragen), tuple(aantallen))
+
+
+def extract_bedragen_with_flags(tekstregel):
+    """Like extract_bedragen maar geeft (waarde, has_euro, has_unit) per match terug.
+    Wordt gebruikt om kleine waarden zonder € weg te filteren (zoals '1,00 stu').
+    """
+    return list(scan_regel(tekstregel).bedragen)
+
+
+def extract_bedragen(tekstregel):
+    """
+    Haal geldbedragen uit een regel. Voorkeur voor waarden met '€' of 'eur'.
+    Getallen die op hoeveelheden lijken (unit er direct achter) of heel klein zijn (≤5) zonder €
+    worden genegeerd, ook als elders in de regel wel een € staat.
+    """
+    res = []
+    for val, has_euro, has_unit in scan_regel(tekstregel).bedragen:
+        if has_unit and not has_euro:
+            continue
+        if (val <= 5.0) and not has_euro:
+            continue
+        res.append(val)
+    return res
+
+
+def _taakcode_norm(taakcode):
+    if not taakcode:
+        return None
+    return _RX_NIET_CIJFER.sub("", str(taakcode)).lstrip("0") or None
+
+
+def extract_aantal_beter(tekstregel: str, taakcode: str = None) -> float:
+    """
+    Extraheer een realistische hoeveelheid uit een regel.
+    - Alleen bij expliciete cues: 'x', 'aantal/qty', of VEILIGE units (geen 'u'/'m' enkel-letter).
+    - Negeert waarden die identiek zijn aan de (genormaliseerde) taakcode.
+    """
+    s = (tekstregel or "").lower()
+    taak_norm = _taakcode_norm(taakcode)
+
+    for rx in _RX_AANTAL:
+        m = rx.search(s)
+        if not m:
+            continue
+        # pak eerste numerieke groep
+        for g in m.groups():
+            if not g:
+                continue
+            try:
+                q = float(g.replace(",", "."))
+            except Exception:
+                continue
+            # filter absurde aantallen
+            if q <= 0 or q > 100000:
+                continue
+            # voorkom dat de taakcode als aantal wordt gezien
+            if taak_norm and _RX_NIET_CIJFER.sub("", str(int(q))) == taak_norm:
+                continue
+            return q
+
+    # Geen duidelijke aanwijzing gevonden -> 1.0 (conservatief)
+    return 1.0
+
+
+def extract_qty_candidates(tekstregel: str):
+    """Geef mogelijke aantallen terug o.b.v. expliciete cues (units/x/aantal)."""
+    return list(scan_regel(tekstregel).aantallen)
+
+def pick_qty(tekstregel: str, unit_price: float, bedragen_on_line, taakcode: str = None):
+    """Kies het meest waarschijnlijke aantal:
+    1) Neem een cue-based kandidaat die NIET gelijk is aan de taakcode.
+    2) Als meerdere: kies die waarbij q*unit_price het dichtst bij een bedrag op de regel ligt.
+    3) Als geen cues: als er een bedrag is en unit_price > 0, gebruik ratio (bedrag/unit_price).
+    4) Anders 1.0.
+    """
+    cands = extract_qty_candidates(tekstregel)
+    # Filter taakcode
+    taak_norm = _taakcode_norm(taakcode)
+
+    def same_as_task(q):
+        return taak_norm and _RX_NIET_CIJFER.sub("", str(int(round(q)))) == taak_norm
+
+    cands = [q for q in cands if not same_as_task(q)]
+
+    # 2) Score t.o.v. bedragen
+    if cands and bedragen_on_line:
+        best = None
+        best_err = None
+        for q in cands:
+            for b in bedragen_on_line:
+                # b kan float/Decimal; cast naar float
+                try:
+                    bf = float(b)
+                except Exception:
+                    continue
+                expected = q * float(unit_price or 0)
+                err = abs(bf - expected)
+                if (best is None) or (err < best_err):
+                    best, best_err = q, err
+        if best is not None:
+            return best
+
+    # 3) Geen cues → ratio uit bedrag (pak laatste bedrag op de regel)
+    if not cands and bedragen_on_line and unit_price and unit_price > 0:
+        try:
+            bf = float(bedragen_on_line[-1])
+            q = bf / float(unit_price)
+            if 0 < q <= 100000:
+                # Rond op 2 decimalen voor nette weergave
+                return round(q, 2)
+        except Exception:
+            pass
+
+    # 4) fallback
+    return 1.0
+
+
+
+
+def select_regel_bedrag(tekstregel: str, bedragen, expected_total=None):
+    if not bedragen:
+        return None
+    if expected_total is not None:
+        best = None
+        best_err = None
+        for b in bedragen:
+            try:
+                bf = float(b)
+            except Exception:
+                continue
+            err = abs(bf - float(expected_total))
+            if (best is None) or (err < best_err):
+                best, best_err = b, err
+        return best
+    try:
+        last = bedragen[-1]
+        if abs(float(last)) <= 250000:
+            return last
+    except Exception:
+        pass
+    vals = []
+    for b in bedragen:
+        try:
+            bf = float(b)
+            if abs(bf) <= 250000:
+                vals.append(b)
+        except Exception:
+            continue
+    return max(vals) if vals else None
+
+def choose_line_amount(regel: str, unit_price: float, max_rel_err: float = 0.08, max_abs_err: float = 2.0):
+    """Kies (qty, bedrag) per regel die consistent zijn: bedrag ≈ qty * unit_price.
+    Vermijd dat aantallen (bijv. '1,00 stu') als bedrag worden gezien.
+    """
+    if not regel or not unit_price:
+        return None, None, None
+    triples, qtys = scan_regel(regel)
+    if not triples:
+        return None, None, None
+    # Filter: houd bedragen met € altijd; zonder € alleen als >= min_amount
+    min_amount = max(3.0, 0.35 * float(unit_price))
+    bedragen = [v for (v,e,u) in triples if (e or v >= min_amount) and not (u and not e)]
+    if not bedragen:
+        return None, None, None
+    best = (None, None, None)
+    # 1) Eerst met expliciete aantallen
+    for q in qtys:
+        expected = q * float(unit_price)
+        for b in bedragen:
+            err = abs(b - expected)
+            rel = err / max(1.0, abs(expected))
+            if err <= max_abs_err or rel <= max_rel_err:
+                if best[2] is None or err < best[2]:
+                    best = (round(q, 2), b, err)
+    if best[0] is not None:
+        return best
+    # 2) Anders: infereren uit bedrag zelf
+    for b in bedragen:
+        q_inf = b / float(unit_price)
+        if q_inf <= 0:
+            continue
+        err = abs(b - q_inf * float(unit_price))
+        rel = err / max(1.0, abs(b))
+        if err <= max_abs_err or rel <= max_rel_err:
+            if best[2] is None or err < best[2]:
+                best = (round(q_inf, 2), b, err)
+    return best
+# === Fuzzy matching helpers ===
+
+def normalize_code(s: str) -> str:
+    return re.sub(r"\D", "", str(s)).lstrip("0")
+
+PrijsInfo = namedtuple("PrijsInfo", ["prijs", "omschrijving"])
+
+
+class PrijsIndex(Mapping):
+    """Onveranderlijke index van genormaliseerde taakcode naar PrijsInfo(prijs, omschrijving).
+
+    prijs is de som van "Koopprijs (ex BTW)" over alle regels met die code (bijv. arbeid +
+    materiaal), omschrijving de unieke omschrijvingen samengevoegd met ", ".
+    """
+
+    __slots__ = ("_codes", "versie", "_code_lijst")
+
+    def __init__(self, codes, versie: str = None):
+        self._codes = dict(codes)
+        self.versie = versie
+        self._code_lijst = None
+
+    def __getitem__(self, code):
+        return self._codes[code]
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def codes(self) -> tuple:
+        """Alle codes als tuple, kandidaten voor fuzzy matching (één keer per index opgebouwd)."""
+        if self._code_lijst is None:
+            self._code_lijst = tuple(self._codes)
+        return self._code_lijst
+
+
+def build_prijzenboek_lookup(prijzenboek: pd.DataFrame, versie: str = None) -> PrijsIndex:
+    codes_norm = prijzenboek["Taakcode"].astype(str).map(normalize_code)
+    prijzen = prijzenboek["Koopprijs (ex BTW)"].groupby(codes_norm, sort=False).sum()
+    omschrijvingen = prijzenboek["Omschrijving"].astype(str).groupby(codes_norm, sort=False).unique()
+    return PrijsIndex((
+        (code, PrijsInfo(float(prijzen[code]), ", ".join(omschrijvingen[code])))
+        for code in prijzen.index
+    ), versie=versie)
+
+
+def prijzenboek_versie(data: bytes) -> str:
+    """Versie van een prijzenboek: verkorte SHA-256 van de werkmapbytes."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def laad_prijzenboek(data: bytes, versie: str = None) -> PrijsIndex:
+    """Lees een prijzenboek (xlsx-bytes) in en bouw de index, gelabeld met de inhoudsversie."""
+    return build_prijzenboek_lookup(pd.read_excel(BytesIO(data)), versie=versie or prijzenboek_versie(data))
+
+def fuzzy_match_code(found_code: str, prijs_codes: list, threshold: int = 92):
+    if not _RAPIDFUZZ_OK or not prijs_codes:
+        return (found_code if found_code in prijs_codes else None, None)
+    res = process.extractOne(
+        found_code,
+        prijs_codes,
+        scorer=fuzz.ratio,
+        score_cutoff=threshold,
+    )
+    if res:
+        best_code, score, _ = res
+        return best_code, score
+    return None, None
+
+# === Regel-index (taakcode -> regels) ===
+# Taakcodes die we herkennen zijn 6 t/m 10 cijfers lang (zie de codedetectie in process_pdf_path).
+CODE_MIN_LEN = 6
+CODE_MAX_LEN = 10
+
+
+_RX_CODE_KANDIDAAT = re.compile(r"[0-9][0-9\s\-\.]{4,}[0-9]")
+
+
+def detecteer_codes(tekst: str):
+    """Mogelijke taakcodes in een tekst: genormaliseerde cijferreeksen van 6 t/m 10 cijfers (gesorteerd, uniek)."""
+    codes = (normalize_code(c) for c in _RX_CODE_KANDIDAAT.findall(tekst))
+    return sorted({c for c in codes if CODE_MIN_LEN <= len(c) <= CODE_MAX_LEN})
+
+
+class RegelIndex:
+    """Inverted index van cijferreeksen naar regelnummers.
+
+    Elke regel wordt één keer genormaliseerd (alleen cijfers); daarna worden alle deelreeksen
+    van CODE_MIN_LEN t/m CODE_MAX_LEN cijfers geïndexeerd. Een opzoeking per taakcode is dan
+    een dict-lookup i.p.v. een regex over alle regels.
+    """
+
+    def __init__(self, regels):
+        self.regels = list(regels)
+        self.cijfers = [re.sub(r"\D", "", r) for r in self.regels]
+        self._index = {}
+        for i, c in enumerate(self.cijfers):
+            n = len(c)
+            for lengte in range(CODE_MIN_LEN, min(CODE_MAX_LEN, n) + 1):
+                for start in range(n - lengte + 1):
+                    treffers = self._index.setdefault(c[start:start + lengte], [])
+                    # regels worden op volgorde toegevoegd: alleen de laatste hoeft gecontroleerd
+                    if not treffers or treffers[-1] != i:
+                        treffers.append(i)
+
+    def regelnummers(self, code: str):
+        """Regelnummers (oplopend) waarin de code als aaneengesloten cijferreeks voorkomt."""
+        if CODE_MIN_LEN <= len(code) <= CODE_MAX_LEN and code.isdigit():
+            return self._index.get(code, [])
+        # Buiten het geïndexeerde bereik: val terug op een scan over de genormaliseerde regels
+        return [i for i, (r, c) in enumerate(zip(self.regels, self.cijfers)) if code in c or code in r]
+
+    def relevante_regels(self, code: str):
+        return [self.regels[i] for i in self.regelnummers(code)]
+
+# ========== Verwerken ==========
+
+# Stappen waarvan process_pdf_path de duur (seconden) in `metingen` bijhoudt
+METING_STAPPEN = ("cache", "tekst", "ocr", "codes", "matching")
+
+
+@contextmanager
+def _stopwatch(metingen, stap: str):
+    """Tel de duur van het blok op bij metingen[stap] (doet niets als metingen None is)."""
+    if metingen is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metingen[stap] = metingen.get(stap, 0.0) + time.perf_counter() - start
+
+
+def _woorden_naar_regels(woorden):
+    """Groepeer woorden tot regels zoals extract_text dat doet: clusteren op 'top', dan op x0."""
+    return [
+        " ".join(w["text"] for w in sorted(regel, key=itemgetter("x0")))
+        for regel in cluster_objects(woorden, itemgetter("top"), TEKST_Y_TOLERANTIE)
+    ]
+
+
+def _in_bbox(x, y, bbox) -> bool:
+    x0, top, x1, bottom = bbox
+    return x0 <= x < x1 and top <= y < bottom
+
+
+def _zoek_cel(x, y, rijen):
+    """(tabel, rij, cel) waarin het punt valt, of None als het in geen enkele cel valt."""
+    for t, (bbox, tabelrijen) in enumerate(rijen):
+        if not _in_bbox(x, y, bbox):
+            continue
+        # Niet stoppen bij de eerste rij waarvan de bbox het punt bevat: een verticaal
+        # samengevoegde cel maakt die bbox hoger dan de rij zelf.
+        for r, rij in enumerate(tabelrijen):
+            if not _in_bbox(x, y, rij.bbox):
+                continue
+            for c, cel in enumerate(rij.cells):
+                if cel is not None and _in_bbox(x, y, cel):
+                    return t, r, c
+    return None
+
+
+def _tabelregels(tabellen, woorden):
+    """Verdeel woorden over de cellen van de gevonden tabellen.
+
+    Geeft (tabelregels, losse_woorden) terug: per tabelrij één regel (celteksten samengevoegd,
+    zoals extract_tables), en de woorden die in geen enkele cel vallen. Dat zijn de woorden buiten
+    de tabellen, maar ook woorden binnen een tabel tussen rijen of in een gat zonder cel; die
+    gaan zo niet verloren.
+    """
+    # Table.rows wordt bij elke aanroep opnieuw berekend: één keer ophalen
+    rijen = [(tabel.bbox, tabel.rows) for tabel in tabellen]
+    cellen = [[[[] for _ in rij.cells] for rij in tabelrijen] for _, tabelrijen in rijen]
+    los = []
+    for w in woorden:
+        plek = _zoek_cel((w["x0"] + w["x1"]) / 2, (w["top"] + w["bottom"]) / 2, rijen)
+        if plek is None:
+            los.append(w)
+        else:
+            t, r, c = plek
+            cellen[t][r][c].append(w)
+    regels = []
+    for tabel in cellen:
+        for rij in tabel:
+            teksten = ["\n".join(_woorden_naar_regels(cel)) for cel in rij if cel]
+            if teksten:
+                regels.append(" ".join(teksten))
+    return regels, los
+
+
+def _pagina_tekstregels(page):
+    """Regels van één pdfplumber-pagina, of None als de pagina geen bruikbare tekstlaag heeft.
+
+    De woorden worden één keer geëxtraheerd; tabelrijen en tekstregels worden daaruit afgeleid.
+    Woorden binnen een tabel komen alleen in de tabelrij terecht (niet nog eens als tekstregel),
+    zodat een factuurregel niet dubbel meetelt. Tabellen worden alleen gezocht als de pagina
+    taakcode-achtige cijfers bevat; een lege pagina levert een lege lijst op.
+    """
+    try:
+        woorden = page.extract_words()
+    except Exception:
+        woorden = []
+    if sum(len(w["text"]) for w in woorden) < TEKSTLAAG_MIN_TEKENS:
+        return None if (page.images or page.curves or page.rects or page.lines or page.chars) else []
+    regels = _woorden_naar_regels(woorden)
+    if not detecteer_codes("\n".join(regels)):
+        return regels
+    try:
+        tabellen = page.find_tables()
+    except Exception:
+        tabellen = []
+    if not tabellen:
+        return regels
+    tabelregels, los = _tabelregels(tabellen, woorden)
+    return tabelregels + _woorden_naar_regels(los)
+
+
+def extraheer_regels_en_codes(path: str, metingen: dict = None, ocr_profiel: str = None, ocr_max_in_flight: int = None):
+    """Lees regels uit de PDF en detecteer taakcodes, met routering per pagina.
+
+    Pagina's met een tekstlaag gaan via pdfplumber (tabellen + tekst), pagina's zonder via OCR;
+    lege pagina's en, bij een profiel met probe_dpi, scanpagina's zonder taakcode-achtige cijfers
+    (voorwaarden e.d.) worden overgeslagen; ocr_profiel kiest het OCR-profiel (zie OCR_PROFIELEN). Geeft (regels_gevonden, gevonden_codes, verwerkingsmethode) terug. Met een
+    metingen-dict worden de duur per stap, het aantal (OCR-/overgeslagen) pagina's en of er OCR
+    nodig was daarin bijgehouden. ocr_max_in_flight begrenst het aantal OCR-threads (zie ocr_paginas).
+    """
+    regels_per_pagina = {}
+    ocr_nodig = []
+    overgeslagen = 0
+    try:
+        with _stopwatch(metingen, "tekst"), pdfplumber.open(open_bron(path)) as pdf:
+            if metingen is not None:
+                metingen["paginas"] = len(pdf.pages)
+            for paginanr, page in enumerate(pdf.pages, start=1):
+                regels = _pagina_tekstregels(page)
+                if regels is None:
+                    ocr_nodig.append(paginanr)
+                elif regels:
+                    regels_per_pagina[paginanr] = regels
+                else:
+                    overgeslagen += 1
+    except Exception:
+        # PDF niet te lezen met pdfplumber: alle pagina's via OCR
+        regels_per_pagina, ocr_nodig, overgeslagen = {}, None, 0
+
+    tekst_paginas = len(regels_per_pagina)
+    geocrd = 0
+    if ocr_nodig is None or ocr_nodig:
+        # poppler heeft een pad nodig: bij een PDF in het geheugen hier pas een tijdelijk bestand
+        with _stopwatch(metingen, "ocr"), als_pad(path) as pdf_pad:
+            teksten = ocr_paginas(pdf_pad, POPLER_PATH, ocr_max_in_flight, paginas=ocr_nodig, profiel=ocr_profiel)
+            for paginanr, tekst in zip(ocr_nodig or count(1), teksten):
+                if tekst is None:
+                    overgeslagen += 1
+                else:
+                    geocrd += 1
+                    regels_per_pagina[paginanr] = tekst.splitlines()
+
+    regels_gevonden = [r for paginanr in sorted(regels_per_pagina) for r in regels_per_pagina[paginanr]]
+    with _stopwatch(metingen, "codes"):
+        gevonden_codes = detecteer_codes("\n".join(regels_gevonden))
+
+    gebruikte_ocr = ocr_nodig is None or bool(ocr_nodig)
+    if metingen is not None:
+        metingen["ocr_gebruikt"] = gebruikte_ocr
+        metingen["ocr_paginas"] = geocrd
+        metingen["overgeslagen_paginas"] = overgeslagen
+    if not gebruikte_ocr:
+        methode = "PDF-tabel"
+    elif tekst_paginas:
+        methode = "PDF-tabel + OCR"
+    else:
+        methode = "OCR"
+    return regels_gevonden, gevonden_codes, methode
+
+
+def process_pdf_path(path: str, prijzenboek: PrijsIndex, aggregeer_per_taakcode=True, TOLERANTIE=0.05, use_fuzzy=True, fuzzy_threshold=92, cache=None, metingen: dict = None,
+                     ocr_profiel: str = None, vingerafdruk: str = None, ocr_max_in_flight: int = None):
+    """Verwerk één PDF tot resultaatregels (een ResultaatBouwer; itereren geeft één dict per regel).
+
+    ocr_profiel is de naam van het OCR-profiel voor pagina's zonder tekstlaag (zie OCR_PROFIELEN).
+    vingerafdruk is de al berekende vingerafdruk van de inhoud (zie historie.vingerafdruk_bestand);
+    die wordt dan voor de cachesleutel gebruikt in plaats van het bestand opnieuw te hashen.
+    ocr_max_in_flight is het aantal OCR-threads voor deze PDF (standaard OCR_MAX_IN_FLIGHT).
+    Met een metingen-dict komen daarin de duur per stap (METING_STAPPEN, in seconden), 'paginas',
+    'ocr_paginas' en 'overgeslagen_paginas' (None bij een cache-hit), 'ocr_gebruikt', 'ocr_profiel'
+    (alleen als er OCR gebruikt is) en 'cache_hit' te staan.
+    """
+    ocr_profiel = ocr_profiel or STANDAARD_OCR_PROFIEL
+    # Extractie is het dure deel (pdfplumber/OCR); met een cache wordt die per PDF-inhoud hergebruikt
+    extractie = None
+    sleutel = None
+    if metingen is not None:
+        for sleutel_meting in ("paginas", "ocr_paginas", "overgeslagen_paginas"):
+            metingen.setdefault(sleutel_meting, None)
+    if cache is not None:
+        with _stopwatch(metingen, "cache"):
+            try:
+                sleutel = cache.sleutel_voor_pad(path, extractie_instellingen(ocr_profiel), vingerafdruk)
+                extractie = cache.get(sleutel)
+            except Exception:
+                sleutel = None
+    if metingen is not None:
+        metingen["cache_hit"] = extractie is not None
+    if extractie is None:
+        extractie = extraheer_regels_en_codes(path, metingen, ocr_profiel, ocr_max_in_flight)
+        if sleutel is not None:
+            with _stopwatch(metingen, "cache"):
+                try:
+                    cache.put(sleutel, *extractie)
+                except Exception:
+                    pass
+    regels_gevonden, gevonden_codes, verwerkingsmethode = extractie
+    if metingen is not None:
+        metingen["ocr_gebruikt"] = "OCR" in verwerkingsmethode
+        metingen["ocr_profiel"] = ocr_profiel if metingen["ocr_gebruikt"] else None
+
+    with _stopwatch(metingen, "matching"):
+        return _match_regels(path, prijzenboek, regels_gevonden, gevonden_codes, verwerkingsmethode,
+                             aggregeer_per_taakcode, TOLERANTIE, use_fuzzy, fuzzy_threshold)
+
+
+def classificeer_status(afwijking: float, tolerantie: float) -> str:
+    """Status van een regel met een berekende afwijking; de enige stap die van de tolerantie afhangt."""
+    return STATUS_BINNEN_MARGE if afwijking <= tolerantie else STATUS_AFWIJKING
+
+
+def match_codes(gevonden_codes, prijzenboek: PrijsIndex, use_fuzzy=False, fuzzy_threshold=92):
+    """Koppel gevonden codes aan het prijzenboek; geeft (code_map, score_map) per gevonden code.
+
+    Exacte codes zijn een opzoeking in de index. Fuzzy matching (alleen als rapidfuzz beschikbaar
+    is) vergelijkt met de kandidatenlijst die de index één keer opbouwt.
+    """
+    code_map = {}
+    score_map = {}
+    use_fuzzy = use_fuzzy and _RAPIDFUZZ_OK
+    for fc in gevonden_codes:
+        fc_norm = normalize_code(fc)
+        if fc_norm in prijzenboek:
+            code_map[fc] = fc_norm
+            score_map[fc] = 100.0
+        elif use_fuzzy:
+            best, score = fuzzy_match_code(fc_norm, prijzenboek.codes(), threshold=fuzzy_threshold)
+            if best:
+                code_map[fc] = best
+                score_map[fc] = float(score)
+    return code_map, score_map
+
+
+def _match_regels(path, prijzenboek, regels_gevonden, gevonden_codes, verwerkingsmethode,
+                  aggregeer_per_taakcode, TOLERANTIE, use_fuzzy, fuzzy_threshold):
+
+    # Bouw alle_teksten en bepaal factuurnummer op basis van de inhoud
+    alle_teksten = "\n".join(regels_gevonden)
+    factuurnummer = extract_factuurnummer(alle_teksten, bestandsnaam(path))
+
+
+    code_map, score_map = match_codes(gevonden_codes, prijzenboek, use_fuzzy, fuzzy_threshold)
+
+    # Regels één keer normaliseren en indexeren; alle opzoekingen per code lezen uit de index
+    regel_index = RegelIndex(regels_gevonden)
+
+    rows = ResultaatBouwer()
+    rows.begin_bestand(bestandsnaam(path), factuurnummer, verwerkingsmethode, regel_index.regels)
+    for found_code, matched_code in code_map.items():
+        regelnummers = regel_index.regelnummers(found_code)
+        gecombineerde_prijs, omschrijving = prijzenboek[matched_code]
+
+        if aggregeer_per_taakcode:
+            totaal_factuur = 0.0
+            aantal_geschat = 0.0
+            for nr in regelnummers:
+                regel = regel_index.regels[nr]
+                q_sel, b_sel, err = choose_line_amount(regel, gecombineerde_prijs)
+                if q_sel is not None and b_sel is not None:
+                    try:
+                        aantal_geschat += q_sel
+                    except Exception:
+                        pass
+                    try:
+                        totaal_factuur += float(b_sel)
+                    except Exception:
+                        pass
+                else:
+                    bedragen = extract_bedragen(regel)
+                    q_line = pick_qty(regel, gecombineerde_prijs, bedragen, matched_code)
+                    aantal_geschat += q_line
+                    exp_line = (q_line or 1.0) * (gecombineerde_prijs or 0.0)
+                    b_line = select_regel_bedrag(regel, bedragen, expected_total=exp_line)
+                    if b_line is not None:
+                        try:
+                            totaal_factuur += float(b_line)
+                        except Exception:
+                            pass
+
+            verwacht = round(gecombineerde_prijs * (aantal_geschat or 1.0), 2)
+            if totaal_factuur:
+                afwijking_val = round(abs(totaal_factuur - verwacht), 2)
+                status = classificeer_status(afwijking_val, TOLERANTIE)
+            else:
+                afwijking_val = None
+                status = STATUS_BEDRAG_NIET_GEVONDEN
+
+            rows.voeg_toe(
+                found_code, matched_code, score_map.get(found_code), aantal_geschat, omschrijving, gecombineerde_prijs,
+                verwacht, round(totaal_factuur, 2) if totaal_factuur else None, afwijking_val, status, regelnummers,
+            )
+        else:
+            for nr in regelnummers:
+                regel = regel_index.regels[nr]
+                q_sel, b_sel, err = choose_line_amount(regel, gecombineerde_prijs)
+                if q_sel is not None and b_sel is not None:
+                    aantal_geschat = q_sel
+                    regel_som = b_sel
+                else:
+                    bedragen = extract_bedragen(regel)
+                    aantal_geschat = pick_qty(regel, gecombineerde_prijs, bedragen, matched_code)
+                    expected_line = (aantal_geschat or 1.0) * (gecombineerde_prijs or 0.0)
+                    regel_som = select_regel_bedrag(regel, bedragen, expected_total=expected_line) or 0.0
+                verwacht = round(gecombineerde_prijs * (aantal_geschat or 1.0), 2)
+                afwijking_val = round(abs(regel_som - verwacht), 2) if regel_som else None
+                status = classificeer_status(afwijking_val, TOLERANTIE) if afwijking_val is not None else STATUS_BEDRAG_NIET_GEVONDEN
+                rows.voeg_toe(
+                    found_code, matched_code, score_map.get(found_code), aantal_geschat, omschrijving, gecombineerde_prijs,
+                    verwacht, round(regel_som, 2) if regel_som else None, afwijking_val, status, (nr,),
+                )
+    # === Verwerk eventuele codes die niet zijn gematcht in het prijzenboek ===
+    unmatched_codes = [fc for fc in gevonden_codes if fc not in code_map]
+    if unmatched_codes:
+        # definieer trefwoorden waarop we regels met niet-relevante informatie willen filteren
+        skip_keywords = [
+            # Administratieve of betalingsgerelateerde termen die duiden op non-productregels
+            "iban", "banknummer", "rabo", "rabobank", "rekening", "overmaken", "restant",
+            "datum", "factuurnummer", "factuurnr", "werkadres", "werkorder", "opdrachtnr", "opdracht", "uw nummer",
+            "bij betaling", "betalingskenmerk", "betaal", "betaaldatum", "uiterste",
+            "g-rekening", "loonkosten", "loonkostenbestanddeel", "loon",
+            # Totale en btw regels
+            "totaal", "subtotaal", "btw verlegd",
+        ]
+        for uc in unmatched_codes:
+            for nr in regel_index.regelnummers(uc):
+                regel = regel_index.regels[nr]
+                # filter regels met niet-relevante sleutelwoorden
+                if not regel:
+                    continue
+                low = regel.lower()
+                if any(kw in low for kw in skip_keywords):
+                    continue
+                bedragen = extract_bedragen(regel)
+                qty_candidates = extract_qty_candidates(regel)
+                try:
+                    aantal_unknown = float(qty_candidates[0]) if qty_candidates else 1.0
+                except Exception:
+                    aantal_unknown = 1.0
+                prijs_op_regel = select_regel_bedrag(regel, bedragen)
+                try:
+                    prijs_val = float(prijs_op_regel) if prijs_op_regel is not None else None
+                except Exception:
+                    prijs_val = None
+                if prijs_val is None and not qty_candidates:
+                    continue
+                rows.voeg_toe(uc, None, None, aantal_unknown, None, None, None, prijs_val, None, STATUS_ONBEKENDE_TAAKCODE, (nr,))
+    return rows
+
+
+# ========== PARALLELLE VERWERKING ==========
+# Elke worker krijgt het prijzenboek één keer mee via de initializer, zodat het niet per
+# bestand opnieuw gepickled hoeft te worden. Ook het aantal OCR-threads per worker gaat via de
+# initializer: elke worker draait zijn eigen OCR-threads, dus bij meer workers elk minder.
+# _worker_context wordt alleen in worker-processen gevuld: in het serverproces kunnen scans
+# (scanjob en planner) tegelijk lopen, die krijgen hun instellingen als argumenten mee.
+
+_worker_context = {}
+
+
+def _init_worker(prijzenboek, opties, ocr_max_in_flight: int = None):
+    _worker_context["prijzenboek"] = prijzenboek
+    _worker_context["opties"] = opties
+    _worker_context["ocr_max_in_flight"] = ocr_max_in_flight
+
+
+def _verwerk_taak(path, vingerafdruk=None, prijzenboek=None, opties=None, ocr_max_in_flight=None):
+    """Verwerk één PDF; fouten worden als tekst teruggegeven i.p.v. opgegooid.
+
+    Zonder prijzenboek (in een worker-proces) komen prijzenboek, opties en het aantal OCR-threads
+    uit de initializer (_init_worker).
+    """
+    if prijzenboek is None:
+        prijzenboek = _worker_context["prijzenboek"]
+        opties = _worker_context["opties"]
+        ocr_max_in_flight = _worker_context["ocr_max_in_flight"]
+    metingen = {}
+    start = time.perf_counter()
+    try:
+        rows = process_pdf_path(
+            path,
+            prijzenboek,
+            metingen=metingen,
+            vingerafdruk=vingerafdruk,
+            ocr_max_in_flight=ocr_max_in_flight,
+            **(opties or {}),
+        )
+        fout = None
+    except Exception as e:
+        rows, fout = ResultaatBouwer(), str(e)
+    metingen["totaal"] = time.perf_counter() - start
+    # Het pad gaat niet terug naar het hoofdproces (bij een PdfInGeheugen zou dat de hele PDF zijn)
+    return rows, fout, metingen
+
+
+def verwerk_pdfs_parallel(taken, prijzenboek, workers: int = 1, **opties):
+    """Verwerk (idx, path, vingerafdruk)-taken en geef (idx, path, rows, fout, metingen) terug zodra een bestand klaar is.
+
+    vingerafdruk mag ontbreken of None zijn (dan wordt hij voor de cachesleutel zelf berekend).
+    De volgorde van opleveren is de volgorde van afronden; de aanroeper sorteert zelf op idx.
+    Met workers <= 1 (of één taak) wordt alles in het huidige proces verwerkt.
+    """
+    taken = [(taak[0], taak[1], taak[2] if len(taak) > 2 else None) for taak in taken]
+    workers = max(1, min(int(workers or 1), len(taken)))
+    if workers == 1:
+        for idx, path, vingerafdruk in taken:
+            yield (idx, path, *_verwerk_taak(path, vingerafdruk, prijzenboek, opties, ocr_threads_per_worker(1)))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(prijzenboek, opties, ocr_threads_per_worker(workers)),
+    ) as pool:
+        futures = {pool.submit(_verwerk_taak, path, vingerafdruk): (idx, path) for idx, path, vingerafdruk in taken}
+        for fut in as_completed(futures):
+            yield (*futures[fut], *fut.result())
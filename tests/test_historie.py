@@ -0,0 +1,61 @@
+# Status in de historie: bij het lezen bepaald bij de gekozen tolerantie; de opgeslagen status van
+# een run verandert niet, alleen bewerkte en toegevoegde regels krijgen een nieuwe status.
+
+import pandas as pd
+
+from factuurtool.historie import (
+    lees_resultaten_pagina, lees_run_resultaten, lees_runs, pas_wijzigingen_toe, save_run_and_results, tel_resultaten,
+)
+from factuurtool.resultaten import STATUS_AFWIJKING, STATUS_BINNEN_MARGE
+
+
+def _run(db_path):
+    df = pd.DataFrame({
+        "Bestandsnaam": ["a.pdf", "a.pdf", "b.pdf"],
+        "Taakcode": ["1111111111", "2222222222", "3333333333"],
+        "Verwacht bedrag": [100.0, 50.0, 10.0],
+        "Prijs op factuur (som)": [100.08, 50.08, 10.0],
+        "Afwijking": [0.08, 0.08, 0.0],
+        "Status": [STATUS_AFWIJKING, STATUS_AFWIJKING, STATUS_BINNEN_MARGE],
+    })
+    return save_run_and_results(db_path, "test", df)
+
+
+def test_tolerantie_bij_lezen_laat_historie_ongemoeid(tmp_path):
+    db_path = str(tmp_path / "historie.db")
+    run_id = _run(db_path)
+    assert tel_resultaten(db_path, run_id, 0.05, statussen=[STATUS_BINNEN_MARGE]) == 1
+    assert tel_resultaten(db_path, run_id, 0.10, statussen=[STATUS_BINNEN_MARGE]) == 3
+    assert lees_run_resultaten(db_path, run_id)["Status"].tolist() == [STATUS_AFWIJKING, STATUS_AFWIJKING, STATUS_BINNEN_MARGE]
+
+
+def test_wijzigingen_herclassificeren_alleen_bewerkte_regels(tmp_path):
+    db_path = str(tmp_path / "historie.db")
+    run_id = _run(db_path)
+    ids = lees_resultaten_pagina(db_path, run_id, 0.05).index.tolist()  # result-id's in grid-volgorde
+    wijzigingen = {
+        "edited_rows": {0: {"Omschrijving": "gecontroleerd"}},
+        "added_rows": [{"Bestandsnaam": "c.pdf", "Taakcode": "4444444444", "Afwijking": 0.08}],
+        "deleted_rows": [2],
+    }
+    pas_wijzigingen_toe(db_path, run_id, ids, wijzigingen, 0.10)
+    status = lees_run_resultaten(db_path, run_id)["Status"].tolist()
+    assert status == [STATUS_BINNEN_MARGE, STATUS_AFWIJKING, STATUS_BINNEN_MARGE]
+    run = lees_runs(db_path).set_index("run_id").loc[run_id]
+    assert (run["regels"], run["afwijkingen"], run["binnen_marge"]) == (3, 1, 2)
+
+
+def test_toegevoegde_regel_zonder_afwijking_staat_bij_afwijkingen_en_overig(tmp_path):
+    # Zonder Afwijking krijgt een toegevoegde regel geen status (NULL); die hoort in de tab
+    # "Afwijkingen & Overig", niet in geen van beide tabs.
+    db_path = str(tmp_path / "historie.db")
+    run_id = _run(db_path)
+    ids = lees_resultaten_pagina(db_path, run_id, 0.05).index.tolist()
+    pas_wijzigingen_toe(db_path, run_id, ids, {"added_rows": [{"Bestandsnaam": "c.pdf", "Taakcode": "4444444444"}]}, 0.05)
+    binnen = lees_resultaten_pagina(db_path, run_id, 0.05, statussen=[STATUS_BINNEN_MARGE])
+    overig = lees_resultaten_pagina(db_path, run_id, 0.05, zonder_statussen=[STATUS_BINNEN_MARGE])
+    assert binnen["Bestandsnaam"].tolist() == ["b.pdf"]
+    assert overig["Bestandsnaam"].tolist() == ["a.pdf", "a.pdf", "c.pdf"]
+    assert overig["Status"].isna().tolist() == [False, False, True]
+    assert tel_resultaten(db_path, run_id, 0.05, zonder_statussen=[STATUS_BINNEN_MARGE]) == 3
+    assert len(binnen) + len(overig) == tel_resultaten(db_path, run_id, 0.05)
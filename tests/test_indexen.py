@@ -0,0 +1,115 @@
+# Opzoekingen via RegelIndex (taakcode -> regels) en PrijsIndex (taakcode -> prijs) tegen de oude
+# scans over alle regels en over het prijzenboek-DataFrame.
+
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from benchmarks.corpus import STANDAARD_PRIJZENBOEK, _euro, _laad_prijzen, maak_regels
+from factuurtool import verwerking
+from factuurtool.verwerking import PrijsIndex, RegelIndex, build_prijzenboek_lookup, detecteer_codes, match_codes, normalize_code
+
+
+def oud_relevante_regels(regels, code):
+    return [r for r in regels if re.sub(r"\D", "", r).find(code) != -1 or code in r]
+
+
+def _factuurregels():
+    rnd = random.Random(5)
+    regels = [
+        "Factuurnummer: 2025000042  Werkorder: 042534-0197",
+        "IBAN NL03 RABO 0190 1071 97  KvK 28.100.062",
+        "2120-093-001 Kitvoeg (code met scheidingstekens)",
+        "",
+    ]
+    for r in maak_regels(_laad_prijzen(STANDAARD_PRIJZENBOEK), rnd, 40):
+        regels.append(f"{_euro(r.aantal)} {r.eenheid} {r.code} {r.omschrijving} € {_euro(r.prijs)} {_euro(r.bedrag)} {r.btw}")
+    return regels
+
+
+REGELS = _factuurregels()
+CODES = detecteer_codes("\n".join(REGELS)) + [
+    "9999999999",  # komt niet voor
+    "2120093001",  # alleen met scheidingstekens
+    "042534",      # deel van een langere cijferreeks
+    "12345678901",  # langer dan CODE_MAX_LEN: terugval op een scan
+    "0190",        # korter dan CODE_MIN_LEN: terugval op een scan
+    "",
+]
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_regelindex_gelijk_aan_oude_scan(code):
+    index = RegelIndex(REGELS)
+    assert index.relevante_regels(code) == oud_relevante_regels(REGELS, code)
+
+
+def test_regelindex_ontbrekende_code_en_lege_factuur():
+    assert RegelIndex(REGELS).regelnummers("9999999999") == []
+    assert RegelIndex([]).relevante_regels("2120093001") == []
+
+
+def test_regel_een_keer_per_code():
+    # Een code die twee keer op dezelfde regel staat, levert die regel één keer op
+    regels = ["2120093001 en nogmaals 2120093001", "andere regel"]
+    assert RegelIndex(regels).regelnummers("2120093001") == [0]
+
+
+# ---------- PrijsIndex ----------
+
+PRIJZENBOEK_DF = pd.read_excel(STANDAARD_PRIJZENBOEK)
+PRIJZENBOEK_DF["Taakcode_norm"] = PRIJZENBOEK_DF["Taakcode"].astype(str).apply(normalize_code)
+
+
+def oude_prijs(prijzenboek: pd.DataFrame, code: str):
+    # Zoals process_pdf_path vroeger per code: booleaans filter over het hele prijzenboek
+    prijsregels = prijzenboek[prijzenboek["Taakcode_norm"] == code]
+    return prijsregels["Koopprijs (ex BTW)"].sum(), ", ".join(prijsregels["Omschrijving"].astype(str).unique())
+
+
+def test_prijsindex_gelijk_aan_dataframe_filter():
+    index = build_prijzenboek_lookup(PRIJZENBOEK_DF)
+    codes = PRIJZENBOEK_DF["Taakcode_norm"].unique()
+    assert len(index) == len(codes)
+    for code in codes:
+        prijs, omschrijving = index[code]
+        oud_prijs, oude_omschrijving = oude_prijs(PRIJZENBOEK_DF, code)
+        assert prijs == pytest.approx(oud_prijs) and omschrijving == oude_omschrijving
+
+
+def test_prijsindex_ontbrekende_code():
+    index = build_prijzenboek_lookup(PRIJZENBOEK_DF)
+    assert "9999999999" not in index and index.get("9999999999") is None
+    assert oude_prijs(PRIJZENBOEK_DF, "9999999999") == (0, "")  # vroeger: lege selectie
+
+
+def test_match_codes_zonder_rapidfuzz_slaat_fuzzy_over(monkeypatch):
+    index = PrijsIndex({"2120093001": (23.6, "Kitvoeg")})
+
+    def geen_fuzzy(*args, **kwargs):
+        raise AssertionError("fuzzy matching zonder rapidfuzz")
+
+    monkeypatch.setattr(verwerking, "_RAPIDFUZZ_OK", False)
+    monkeypatch.setattr(verwerking, "fuzzy_match_code", geen_fuzzy)
+    code_map, score_map = match_codes(["2120-093-001", "2120093002", "9999999999"], index, use_fuzzy=True)
+    assert code_map == {"2120-093-001": "2120093001"} and score_map == {"2120-093-001": 100.0}
+
+
+def test_fuzzy_kandidaten_een_keer_per_index(monkeypatch):
+    index = PrijsIndex({"2120093001": (23.6, "Kitvoeg"), "3724011308": (955.04, "Tegelwerk")})
+    gezien = []
+
+    def nep_fuzzy(code, kandidaten, threshold):
+        gezien.append(kandidaten)
+        return (kandidaten[0], 95.0) if code.startswith("21") else (None, None)
+
+    monkeypatch.setattr(verwerking, "_RAPIDFUZZ_OK", True)
+    monkeypatch.setattr(verwerking, "fuzzy_match_code", nep_fuzzy)
+    for _ in range(3):  # drie facturen in dezelfde scan
+        code_map, score_map = match_codes(["2120093002", "5555555555"], index, use_fuzzy=True)
+        assert code_map == {"2120093002": "2120093001"} and score_map == {"2120093002": 95.0}
+    # Steeds dezelfde kandidatenlijst, niet per code of per factuur opnieuw opgebouwd
+    assert len(gezien) == 6 and all(k is gezien[0] for k in gezien)
+    assert sorted(gezien[0]) == sorted(index)
@@ -0,0 +1,89 @@
+# OCR-profielen zonder tesseract: voorbewerking (bijsnijden), de regio van "regelgebied" op de
+# voorbeeldfacturen, de cachesleutel per profiel en de opt-in OCR-probe (renderen en tesseract nagebootst).
+
+import glob
+import os
+
+import pandas as pd
+import pytest
+from PIL import Image
+
+from benchmarks.bench_ocr import VOORBEELDEN_MAP, meet_regio
+from factuurtool import verwerking
+from factuurtool.scan import maak_metingen_df, overgeslagen_paginas
+from factuurtool.verwerking import OCR_PROFIELEN, STANDAARD_OCR_PROFIEL, _voorbewerk, extractie_instellingen, ocr_paginas
+
+
+def test_regelgebied_snijdt_bij_tot_regio():
+    profiel = OCR_PROFIELEN["regelgebied"]
+    image = Image.new("L", (1000, 2000), 255)
+    bijgesneden = _voorbewerk(image, profiel)
+    links, boven, rechts, onder = profiel.regio
+    assert bijgesneden.size == (int(rechts * 1000) - int(links * 1000), int(onder * 2000) - int(boven * 2000))
+
+
+def test_regelgebied_snijdt_geen_regels_door_op_voorbeeldfacturen():
+    paden = sorted(glob.glob(os.path.join(VOORBEELDEN_MAP, "Kernbouw*.pdf")))
+    if not paden:
+        pytest.skip("geen KernBouw-voorbeeldfacturen")
+    telling = meet_regio(paden, OCR_PROFIELEN["regelgebied"].regio)
+    assert telling["doorgesneden_op"] == []
+    assert telling["binnen"] > telling["buiten"]
+
+
+def test_cachesleutel_verschilt_per_profiel():
+    assert len({extractie_instellingen(naam) for naam in OCR_PROFIELEN}) == len(OCR_PROFIELEN)
+
+
+# ---------- OCR-probe (opt-in via probe_dpi) ----------
+
+def _nep_ocr(monkeypatch, probe_tekst):
+    renders = []
+
+    def nep_convert(pdf_path, dpi, **kwargs):
+        renders.append(dpi)
+        return [Image.new("L", (10, 10), 255)]
+
+    def nep_tesseract(image, config):
+        image.close()
+        return probe_tekst if "whitelist=0123456789" in config else "volledige tekst"
+
+    monkeypatch.setattr(verwerking, "convert_from_path", nep_convert)
+    monkeypatch.setattr(verwerking, "_ocr_afbeelding", nep_tesseract)
+    return renders
+
+
+def test_probe_alleen_in_opt_in_profiel():
+    assert [naam for naam, p in OCR_PROFIELEN.items() if p.probe_dpi] == ["snel-met-probe"]
+    assert OCR_PROFIELEN[STANDAARD_OCR_PROFIEL].probe_dpi is None
+    assert extractie_instellingen("snel") != extractie_instellingen("snel-met-probe")
+
+
+def test_zonder_probe_een_render_per_pagina(monkeypatch):
+    renders = _nep_ocr(monkeypatch, "")
+    teksten = list(ocr_paginas("scan.pdf", None, paginas=[1, 2], profiel="snel"))
+    assert teksten == ["volledige tekst", "volledige tekst"]
+    assert renders == [150, 150]
+
+
+def test_probe_slaat_pagina_zonder_codes_over(monkeypatch):
+    renders = _nep_ocr(monkeypatch, "12 350\n2025 30\n")
+    assert list(ocr_paginas("scan.pdf", None, paginas=[1], profiel="snel-met-probe")) == [None]
+    assert renders == [100]
+
+
+def test_probe_pagina_met_codes_twee_keer_geocrd(monkeypatch):
+    # Alleen cijfers: aantal, code en bedragen van een regel lopen in elkaar over
+    renders = _nep_ocr(monkeypatch, "100 2120093001 2360 2360\n")
+    assert list(ocr_paginas("scan.pdf", None, paginas=[1], profiel="snel-met-probe")) == ["volledige tekst"]
+    assert renders == [100, 150]
+
+
+def test_overgeslagen_paginas_per_factuur():
+    metingen_df = maak_metingen_df([
+        {"bestand": "a.pdf", "overgeslagen_paginas": 2},
+        {"bestand": "b.pdf", "overgeslagen_paginas": 0},
+        {"bestand": "c.pdf", "overgeslagen_paginas": None},  # cache-hit
+    ])
+    assert overgeslagen_paginas(metingen_df) == [("a.pdf", 2)]
+    assert overgeslagen_paginas(pd.DataFrame()) == []
@@ -0,0 +1,33 @@
+# ScanPlanner: stoppen (tijdens een scan) en opnieuw starten geeft één scan, niet twee direct na elkaar.
+
+import threading
+import time
+
+from factuurtool.planner import ScanPlanner
+
+
+def test_herstart_na_stop_tijdens_scan_scant_een_keer(tmp_path, monkeypatch):
+    planner = ScanPlanner(str(tmp_path / "historie.db"))
+    planner.configureer(lambda: ([], {}), None, interval=60)
+    scans = []
+    bezig, klaar = threading.Event(), threading.Event()
+
+    def nep_scan():
+        scans.append(time.monotonic())
+        bezig.set()
+        klaar.wait(5)
+
+    monkeypatch.setattr(planner, "scan_eenmalig", nep_scan)
+    planner.start()
+    assert bezig.wait(5)
+    thread = planner._thread
+    planner.stop()  # tijdens de scan
+    klaar.set()
+    thread.join(5)
+
+    bezig.clear()
+    planner.start()
+    assert bezig.wait(5)
+    time.sleep(0.3)  # een nog gewekte lus zou hier al een tweede scan starten
+    planner.stop(wacht=True)
+    assert len(scans) == 2
@@ -0,0 +1,154 @@
+# Gecompileerde extractie-engine (scan_regel, met lru_cache) tegen de oude parsers, die per aanroep
+# hun patronen opnieuw opbouwden en dezelfde regel twee of drie keer doorzochten.
+
+import random
+import re
+
+import pytest
+
+from benchmarks.corpus import STANDAARD_PRIJZENBOEK, _euro, _laad_prijzen, maak_regels
+from factuurtool.verwerking import (
+    choose_line_amount,
+    clean_ocr_noise,
+    extract_aantal_beter,
+    extract_bedragen,
+    extract_bedragen_with_flags,
+    extract_qty_candidates,
+    scan_regel,
+)
+
+_OUDE_UNITS = r"(?:m1\b|m2|m\^?2|m3|m\^?3|m²|m³|meter\b|m\b|stuk\b|stuks\b|stk\b|st\b|stu\b|pst\b|post\b|pcs\b|pce\b|set\b|uur\b|hrs\b|hr\b|kg\b|l\b|liter\b|wk\b|week\b|ruimte\b)"
+_OUDE_AANTAL_PATRONEN = [
+    r"(\d+(?:[.,]\d{1,2})?)\s*(?:x|×)\s*\d+(?:[.,]\d{1,2})?",
+    r"(?:aantal|qty|quantiteit)\s*[:=]?\s*(\d+(?:[.,]\d{1,2})?)",
+    rf"(\d+(?:[.,]\d{{1,2}})?)\s*{_OUDE_UNITS}",
+    rf"\b{_OUDE_UNITS}\s*(\d+(?:[.,]\d{{1,2}})?)",
+    r"(?:x|×)\s*(\d+(?:[.,]\d{1,2})?)",
+]
+
+
+def oud_extract_bedragen_with_flags(tekstregel):
+    out = []
+    if not tekstregel:
+        return out
+    s = clean_ocr_noise(tekstregel)
+    unit_pat = r"(?:m2|m³|m3|\bm\b|meter|stu?k?s?|st\b|wk\b|uur\b|hrs?\b|kg\b|l\b|liter\b)"
+    rx = re.compile(rf"(?P<euro>(?:€|eur)\s*)?(?P<num>-?\d{{1,3}}(?:[.\s]\d{{3}})*(?:[.,]\d{{2}})|-?\d+(?:[.,]\d{{2}}))(?!\d)(?P<unit>\s*(?:{unit_pat}))?", re.IGNORECASE)
+    for m in rx.finditer(s):
+        euro = bool(m.group('euro'))
+        unit = bool((m.group('unit') or '').strip())
+        raw = m.group('num').replace('\xa0', ' ').replace(' ', '')
+        if ',' in raw and '.' in raw:
+            if raw.rfind(',') > raw.rfind('.'):
+                raw = raw.replace('.', '').replace(',', '.')
+            else:
+                raw = raw.replace(',', '')
+        else:
+            raw = raw.replace(',', '.')
+        try:
+            val = float(raw)
+        except Exception:
+            continue
+        if abs(val) <= 250000:
+            out.append((round(val, 2), euro, unit))
+    return out
+
+
+def oud_extract_qty_candidates(tekstregel):
+    if not tekstregel:
+        return []
+    s = tekstregel.lower()
+    cands = [m.group(1) for pat in _OUDE_AANTAL_PATRONEN for m in re.finditer(pat, s, flags=re.IGNORECASE)]
+    out = []
+    for g in cands:
+        try:
+            q = float(g.replace(",", "."))
+            if 0 < q <= 100000:
+                out.append(q)
+        except Exception:
+            pass
+    return out
+
+
+def oud_extract_aantal_beter(tekstregel, taakcode=None):
+    s = (tekstregel or "").lower()
+    taak_norm = None
+    if taakcode:
+        taak_norm = re.sub(r"\D", "", str(taakcode)).lstrip("0") or None
+    for pat in _OUDE_AANTAL_PATRONEN:
+        m = re.search(pat, s, flags=re.IGNORECASE)
+        if not m:
+            continue
+        for g in m.groups():
+            if not g:
+                continue
+            try:
+                q = float(g.replace(",", "."))
+            except Exception:
+                continue
+            if q <= 0 or q > 100000:
+                continue
+            if taak_norm and re.sub(r"\D", "", str(int(q))) == taak_norm:
+                continue
+            return q
+    return 1.0
+
+
+RANDGEVALLEN = [
+    "",
+    "Totaal EUR 1.234,56",
+    "3 x 50,00 Schilderwerk € 150,00",
+    "aantal: 2,5 m2 à 12,40 = 31,00",
+    "qty 4 pcs 9,95 39,80",
+    "st 3 deur afhangen 4212006002 € 87,50",
+    "1,00 stu 2120093001 Kitvoeg 23,60 €",
+    "12,00 m plint 1.791,80",
+    "O,50 uur m? stucwerk € 1 234,00",
+    "week 2 huur steiger -45,00",
+    "1,234.56 USD 1.234,56",
+    "999999,00 te groot 250000,00",
+    "Betaling binnen 30 dagen na factuurdatum.",
+]
+
+
+def _corpus_regels():
+    rnd = random.Random(3)
+    regels = []
+    for r in maak_regels(_laad_prijzen(STANDAARD_PRIJZENBOEK), rnd, 60):
+        # zoals in de tekst-PDF (tabelrij) en in het afschrift (vrije tekst)
+        regels.append(f"{_euro(r.aantal)} {r.eenheid} {r.code} {r.omschrijving} {r.btw} {_euro(r.prijs)} € {_euro(r.bedrag)} €")
+        regels.append(f"{_euro(r.aantal)} {r.eenheid} {r.code} {r.omschrijving} € {_euro(r.prijs)} {_euro(r.bedrag)} {r.btw}")
+    return regels
+
+
+REGELS = RANDGEVALLEN + _corpus_regels()
+
+
+@pytest.mark.parametrize("regel", REGELS)
+def test_scan_regel_gelijk_aan_oude_parsers(regel):
+    assert extract_bedragen_with_flags(regel) == oud_extract_bedragen_with_flags(regel)
+    assert extract_qty_candidates(regel) == oud_extract_qty_candidates(regel)
+    for taakcode in (None, "4212006002", "3"):
+        assert extract_aantal_beter(regel, taakcode) == oud_extract_aantal_beter(regel, taakcode)
+
+
+def test_cache_hit_geeft_zelfde_uitkomst_als_miss():
+    scan_regel.cache_clear()
+    resultaten = [(extract_bedragen(r), extract_qty_candidates(r)) for r in REGELS]
+    missers = scan_regel.cache_info().misses
+    assert missers == len(set(REGELS))
+    # Tweede ronde volledig uit de cache, met dezelfde uitkomsten
+    assert [(extract_bedragen(r), extract_qty_candidates(r)) for r in REGELS] == resultaten
+    assert scan_regel.cache_info().misses == missers
+    assert scan_regel.cache_info().hits >= len(REGELS)
+
+
+def test_aanpassen_van_uitkomst_raakt_cache_niet():
+    regel = "3 x 50,00 Schilderwerk € 150,00"
+    bedragen = extract_bedragen_with_flags(regel)
+    aantallen = extract_qty_candidates(regel)
+    bedragen.clear()
+    aantallen.append(99.0)
+    assert extract_bedragen_with_flags(regel) == oud_extract_bedragen_with_flags(regel)
+    assert extract_qty_candidates(regel) == oud_extract_qty_candidates(regel)
+    assert choose_line_amount(regel, 50.0)[:2] == (3.0, 150.0)
@@ -0,0 +1,101 @@
+# Kolomsgewijze ResultaatBouwer tegen de oude weergave (één dict per regel, pd.DataFrame(rows)):
+# samenvoegen, pickle (worker -> hoofdproces) en het lege resultaat.
+
+import pickle
+
+import pandas as pd
+
+from factuurtool.resultaten import (
+    KOLOMMEN,
+    REGEL_SCHEIDING,
+    STATUS_AFWIJKING,
+    STATUS_BINNEN_MARGE,
+    STATUS_ONBEKENDE_TAAKCODE,
+    ResultaatBouwer,
+    voeg_samen,
+)
+from factuurtool.scan import maak_resultaat_df
+
+REGELS_A = ["1,00 st 2120093001 Kitvoeg € 23,60 23,60 H", "Totaal EUR 23,60"]
+REGELS_B = ["2,00 m2 3724011308 Tegelwerk € 955,04 1.910,08 H", "5,00 st 9999999999 Onbekend 12,50"]
+
+# (bestand, factuurnummer, methode, regels, [(taakcode_gevonden, taakcode, score, aantal, omschrijving,
+#  boekprijs, verwacht, op factuur, afwijking, status, regelnummers)])
+FACTUREN = [
+    ("a.pdf", "2025000001", "PDF-tabel", REGELS_A, [
+        ("2120093001", "2120093001", 100.0, 1.0, "Kitvoeg", 23.6, 23.6, 23.6, 0.0, STATUS_BINNEN_MARGE, (0,)),
+        ("2120093001", "2120093001", 100.0, None, "Kitvoeg", 23.6, None, None, None, "eigen status", (0, 1)),
+    ]),
+    ("b.pdf", "2025000002", "OCR", REGELS_B, [
+        ("3724011308", "3724011308", 100.0, 2.0, "Tegelwerk", 955.04, 1910.08, 1910.08, 0.0, STATUS_BINNEN_MARGE, (0,)),
+        ("9999999999", None, None, 5.0, None, None, None, 12.5, None, STATUS_ONBEKENDE_TAAKCODE, (1,)),
+    ]),
+    ("c.pdf", None, "PDF-tabel + OCR", REGELS_A, [
+        ("2120093001", "2120093001", 100.0, 1.0, "Kitvoeg", 23.6, 23.6, 30.0, 6.4, STATUS_AFWIJKING, (1, 0)),
+    ]),
+]
+
+
+def _bouwer(factuur):
+    naam, factuurnummer, methode, regels, resultaten = factuur
+    bouwer = ResultaatBouwer()
+    bouwer.begin_bestand(naam, factuurnummer, methode, regels)
+    for r in resultaten:
+        bouwer.voeg_toe(*r)
+    return bouwer
+
+
+def _oude_rijen(facturen):
+    # Zoals process_pdf_path vroeger: een dict per regel, Regels als samengevoegde tekst
+    rijen = []
+    for naam, factuurnummer, methode, regels, resultaten in facturen:
+        for (gevonden, code, score, aantal, omschrijving, boek, verwacht, op_factuur, afwijking, status, nrs) in resultaten:
+            rijen.append(dict(zip(KOLOMMEN, (
+                naam, factuurnummer, gevonden, code, score, aantal, omschrijving, boek, verwacht, op_factuur,
+                afwijking, status, REGEL_SCHEIDING.join(regels[nr] for nr in nrs), methode,
+            ))))
+    return rijen
+
+
+def _zelfde_df(nieuw: pd.DataFrame, oud: pd.DataFrame):
+    # Categorische kolommen vergelijken op waarde, niet op dtype
+    nieuw = nieuw.astype({k: object for k in nieuw.columns if isinstance(nieuw[k].dtype, pd.CategoricalDtype)})
+    nieuw = nieuw.astype(object).where(nieuw.notna(), None)
+    oud = oud[KOLOMMEN].astype(object).where(oud[KOLOMMEN].notna(), None)
+    assert nieuw.to_dict("records") == oud.to_dict("records")
+
+
+def test_itereren_en_dataframe_gelijk_aan_dicts():
+    bouwer = _bouwer(FACTUREN[0])
+    assert list(bouwer) == _oude_rijen(FACTUREN[:1])
+    _zelfde_df(maak_resultaat_df(bouwer), maak_resultaat_df(_oude_rijen(FACTUREN[:1])))
+
+
+def test_samenvoegen_met_andere_categorieen():
+    alle = voeg_samen(_bouwer(f) for f in FACTUREN)
+    oud = _oude_rijen(FACTUREN)
+    assert len(alle) == len(oud)
+    assert list(alle) == oud
+    assert [alle.regels(i) for i in range(len(alle))] == [r["Regels"] for r in oud]
+    assert alle.tel_status(STATUS_BINNEN_MARGE) == 2 and alle.tel_status("eigen status") == 1
+    _zelfde_df(alle.naar_df(), maak_resultaat_df(oud))
+
+
+def test_pickle_behoudt_regels_en_status():
+    bouwer = _bouwer(FACTUREN[0])
+    kopie = pickle.loads(pickle.dumps(bouwer))
+    assert list(kopie) == list(bouwer)
+    # Ook na het picklen samen te voegen, met een eigen status die niet bij de vaste categorieën hoort
+    kopie.voeg_samen(pickle.loads(pickle.dumps(_bouwer(FACTUREN[1]))))
+    assert list(kopie) == _oude_rijen(FACTUREN[:2])
+    assert kopie.tel_status("eigen status") == 1
+
+
+def test_leeg_resultaat():
+    leeg = ResultaatBouwer()
+    df = leeg.naar_df()
+    assert df.empty and list(df.columns) == KOLOMMEN
+    assert maak_resultaat_df([]).empty  # oude weergave: ook leeg (zonder kolommen)
+    assert list(pickle.loads(pickle.dumps(leeg))) == []
+    assert list(voeg_samen([leeg, _bouwer(FACTUREN[2]), ResultaatBouwer()])) == _oude_rijen(FACTUREN[2:])
+    assert leeg.tel_status(STATUS_AFWIJKING) == 0
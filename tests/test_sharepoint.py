@@ -0,0 +1,102 @@
+# Incrementele SharePoint-sync tegen een lokale nepbron (MapBron): nieuwe, gewijzigde, verwijderde
+# en ongewijzigde bestanden.
+
+import json
+import os
+
+from factuurtool.sharepoint import MANIFEST_NAAM, MapBron, SharePointSync
+
+
+class TellendeMapBron(MapBron):
+    """MapBron die bijhoudt welke bestanden gedownload zijn en downloads kan laten mislukken."""
+
+    def __init__(self, map_pad: str):
+        super().__init__(map_pad)
+        self.downloads = []
+        self.mislukt = set()
+
+    def download(self, item, fh):
+        if item.naam in self.mislukt:
+            raise OSError("verbinding verbroken")
+        self.downloads.append(item.naam)
+        super().download(item, fh)
+
+
+def _schrijf(pad, inhoud: bytes, mtime_ns: int = None):
+    with open(pad, "wb") as fh:
+        fh.write(inhoud)
+    if mtime_ns is not None:
+        os.utime(pad, ns=(mtime_ns, mtime_ns))
+
+
+def _per_naam(resultaat):
+    return {os.path.basename(pad): (pad, bron_id, gedownload) for pad, bron_id, gedownload in resultaat}
+
+
+def _lees(pad) -> bytes:
+    with open(pad, "rb") as fh:
+        return fh.read()
+
+
+def test_sync_downloadt_alleen_nieuwe_en_gewijzigde_bestanden(tmp_path):
+    bron_map, spiegel = tmp_path / "bron", tmp_path / "spiegel"
+    bron_map.mkdir()
+    _schrijf(bron_map / "a.pdf", b"factuur a", 1_000_000_000_000_000_000)
+    _schrijf(bron_map / "b.pdf", b"factuur b", 1_000_000_000_000_000_000)
+    _schrijf(bron_map / "notities.txt", b"geen pdf")
+    bron = TellendeMapBron(str(bron_map))
+    sync = SharePointSync(bron, str(spiegel), max_workers=2)
+    try:
+        # Eerste sync: alle PDF's zijn nieuw
+        eerste = _per_naam(sync.sync())
+        assert set(eerste) == {"a.pdf", "b.pdf"}
+        assert all(gedownload for _, _, gedownload in eerste.values())
+        assert sorted(bron.downloads) == ["a.pdf", "b.pdf"]
+        assert _lees(eerste["a.pdf"][0]) == b"factuur a"
+        assert not (spiegel / "notities.txt").exists()
+
+        # Ongewijzigd: niets downloaden, zelfde paden en bron-id's
+        bron.downloads.clear()
+        tweede = _per_naam(sync.sync())
+        assert bron.downloads == []
+        assert {n: (p, i) for n, (p, i, _) in tweede.items()} == {n: (p, i) for n, (p, i, _) in eerste.items()}
+        assert not any(gedownload for _, _, gedownload in tweede.values())
+
+        # b gewijzigd, c nieuw, a verwijderd
+        _schrijf(bron_map / "b.pdf", b"factuur b, gecorrigeerd", 1_000_000_001_000_000_000)
+        _schrijf(bron_map / "c.pdf", b"factuur c")
+        os.remove(bron_map / "a.pdf")
+        derde = _per_naam(sync.sync())
+        assert sorted(bron.downloads) == ["b.pdf", "c.pdf"]
+        assert set(derde) == {"b.pdf", "c.pdf"}
+        assert derde["b.pdf"][2] and derde["c.pdf"][2]
+        assert derde["b.pdf"][1] != eerste["b.pdf"][1]  # nieuwe ETag -> nieuw bron-id
+        assert _lees(derde["b.pdf"][0]) == b"factuur b, gecorrigeerd"
+        assert not os.path.exists(eerste["a.pdf"][0])
+        with open(spiegel / MANIFEST_NAAM, encoding="utf-8") as fh:
+            assert set(json.load(fh)) == {"b.pdf", "c.pdf"}
+        assert sync.laatste_fouten == []
+    finally:
+        sync.close()
+
+
+def test_mislukte_download_wordt_gemeld_en_later_opnieuw_geprobeerd(tmp_path):
+    bron_map, spiegel = tmp_path / "bron", tmp_path / "spiegel"
+    bron_map.mkdir()
+    _schrijf(bron_map / "a.pdf", b"factuur a")
+    _schrijf(bron_map / "b.pdf", b"factuur b")
+    bron = TellendeMapBron(str(bron_map))
+    bron.mislukt.add("b.pdf")
+    sync = SharePointSync(bron, str(spiegel))
+    try:
+        assert set(_per_naam(sync.sync())) == {"a.pdf"}
+        assert len(sync.laatste_fouten) == 1 and sync.laatste_fouten[0].startswith("b.pdf")
+
+        bron.mislukt.clear()
+        bron.downloads.clear()
+        tweede = _per_naam(sync.sync())
+        assert bron.downloads == ["b.pdf"]
+        assert set(tweede) == {"a.pdf", "b.pdf"} and tweede["b.pdf"][2]
+        assert sync.laatste_fouten == []
+    finally:
+        sync.close()
@@ -0,0 +1,113 @@
+# Verdeling van woorden over tabelcellen (_tabelregels) en de regels van een tekst-PDF met tabel:
+# elke factuurregel precies één keer (niet als tabelrij én als tekstregel), en geen woorden kwijt.
+
+import random
+from collections import namedtuple
+
+import pytest
+
+from benchmarks.corpus import STANDAARD_PRIJZENBOEK, _laad_prijzen, maak_regels, schrijf_tekst_pdf, tekst_paginas
+from factuurtool.resultaten import STATUS_ONBEKENDE_TAAKCODE
+from factuurtool.verwerking import _tabelregels, extraheer_regels_en_codes, laad_prijzenboek, process_pdf_path
+
+# Zelfde attributen als pdfplumber's Table en Row
+Tabel = namedtuple("Tabel", ["bbox", "rows"])
+Rij = namedtuple("Rij", ["bbox", "cells"])
+
+
+def _woord(tekst, x0, top, breedte=20, hoogte=8):
+    return {"text": tekst, "x0": x0, "x1": x0 + breedte, "top": top, "bottom": top + hoogte}
+
+
+def _teksten(woorden):
+    return [w["text"] for w in woorden]
+
+
+# Tabel van 0-300 x 100-200 met twee kolommen; tussen de rijen (120-140) ligt een strook zonder cellen
+TABEL = Tabel((0, 100, 300, 200), [
+    Rij((0, 100, 300, 120), [(0, 100, 100, 120), (100, 100, 300, 120)]),
+    Rij((0, 140, 300, 160), [(0, 140, 100, 160), None]),  # tweede kolom zonder cel (samengevoegd/leeg)
+])
+
+
+def test_woorden_in_cellen_geven_een_regel_per_rij():
+    woorden = [_woord("1234567890", 5, 105), _woord("Schilderwerk", 110, 105), _woord("10,00", 200, 105), _woord("2,00", 5, 145)]
+    regels, los = _tabelregels([TABEL], woorden)
+    assert regels == ["1234567890 Schilderwerk 10,00", "2,00"]
+    assert los == []
+
+
+def test_woorden_buiten_tabel_zijn_los():
+    regels, los = _tabelregels([TABEL], [_woord("Totaalbedrag", 10, 220)])
+    assert regels == []
+    assert _teksten(los) == ["Totaalbedrag"]
+
+
+def test_woord_tussen_rijen_gaat_niet_verloren():
+    # Binnen de tabel, maar in de strook tussen twee rijen: hoort bij de losse woorden
+    regels, los = _tabelregels([TABEL], [_woord("1234", 5, 105), _woord("tussenregel", 5, 126)])
+    assert regels == ["1234"]
+    assert _teksten(los) == ["tussenregel"]
+
+
+def test_woord_in_rij_zonder_cel_gaat_niet_verloren():
+    regels, los = _tabelregels([TABEL], [_woord("2,00", 5, 145), _woord("opmerking", 150, 145)])
+    assert regels == ["2,00"]
+    assert _teksten(los) == ["opmerking"]
+
+
+def test_verticaal_samengevoegde_cel():
+    # De samengevoegde cel maakt de bbox van rij 1 even hoog als twee rijen; een woord in de
+    # tweede kolom van rij 2 valt in die bbox, maar hoort in de cel van rij 2.
+    tabel = Tabel((0, 100, 300, 140), [
+        Rij((0, 100, 300, 140), [(0, 100, 100, 140), (100, 100, 300, 120)]),
+        Rij((100, 120, 300, 140), [None, (100, 120, 300, 140)]),
+    ])
+    woorden = [_woord("samen", 5, 115), _woord("boven", 150, 105), _woord("onder", 150, 125)]
+    regels, los = _tabelregels([tabel], woorden)
+    assert regels == ["samen boven", "onder"]
+    assert los == []
+
+
+# ---------- Tekst-PDF met tabel (synthetisch corpus, vaste seed) ----------
+
+# Verwachte resultaatregels (Taakcode, Aantal, Prijs op factuur) voor seed 7. De oude extractie
+# (extract_tables + extract_text) las elke tabelrij twee keer en gaf precies het dubbele.
+VERWACHT = {
+    "2120093001": (0.9, 23.6),
+    "2210261002": (1.25, 403.29),
+    "3724011308": (2.0, 1910.08),
+    "5212091011": (1.25, 20.6),
+    "5231003001": (1.0, 9.95),
+    "6120003001": (10.0, 895.9),
+    "7411882001": (10.0, 290.5),
+}
+
+
+@pytest.fixture(scope="module")
+def tekst_factuur(tmp_path_factory):
+    factuurregels = maak_regels(_laad_prijzen(STANDAARD_PRIJZENBOEK), random.Random(7), 12)
+    pad = str(tmp_path_factory.mktemp("corpus") / "tekst 2025000001.pdf")
+    schrijf_tekst_pdf(pad, tekst_paginas(factuurregels, "2025000001"))
+    return pad, factuurregels
+
+
+def test_tabelrijen_en_tekst_elk_een_keer(tekst_factuur):
+    pad, factuurregels = tekst_factuur
+    regels, _, methode = extraheer_regels_en_codes(pad)
+    assert methode == "PDF-tabel"
+    for regel in factuurregels:
+        assert sum(f"{regel.code} {regel.omschrijving}" in r for r in regels) == 1
+    # tekst buiten de tabel blijft bewaard, ook één keer
+    assert sum(r.startswith("Totaalbedrag EUR") for r in regels) == 1
+    assert sum(r.startswith("IBAN") for r in regels) == 1
+    assert len(regels) == len(factuurregels) + 1 + 7  # regels + kop van de tabel + 7 tekstregels
+
+
+def test_bedragen_en_aantallen_niet_dubbel_geteld(tekst_factuur):
+    pad, _ = tekst_factuur
+    with open(STANDAARD_PRIJZENBOEK, "rb") as fh:
+        prijzenboek = laad_prijzenboek(fh.read())
+    rows = list(process_pdf_path(pad, prijzenboek, use_fuzzy=False, fuzzy_threshold=100))
+    assert not [r for r in rows if r["Status"] == STATUS_ONBEKENDE_TAAKCODE]
+    assert {r["Taakcode"]: (r["Aantal (geschat)"], r["Prijs op factuur (som)"]) for r in rows} == VERWACHT
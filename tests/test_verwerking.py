@@ -0,0 +1,37 @@
+# Verwerking in het serverproces: gelijktijdige scans (scanjob en planner) in threads.
+
+import threading
+
+from factuurtool import verwerking
+from factuurtool.resultaten import ResultaatBouwer
+
+
+def test_gelijktijdige_scans_in_proces_houden_eigen_instellingen(monkeypatch):
+    # Beide scans pauzeren na hun eerste bestand, zodat de tweede scan begonnen is voordat de
+    # eerste aan zijn tweede bestand toe is.
+    barriere = threading.Barrier(2, timeout=10)
+    aanroepen = []
+
+    def nep_process_pdf_path(path, prijzenboek, metingen=None, vingerafdruk=None, ocr_max_in_flight=None, **opties):
+        aanroepen.append((path, prijzenboek, opties["TOLERANTIE"]))
+        if path.endswith("1"):
+            barriere.wait()
+        return ResultaatBouwer()
+
+    monkeypatch.setattr(verwerking, "process_pdf_path", nep_process_pdf_path)
+
+    def scan(naam, tolerantie):
+        taken = [(0, f"{naam}-1"), (1, f"{naam}-2")]
+        list(verwerking.verwerk_pdfs_parallel(taken, f"prijzenboek {naam}", workers=1, TOLERANTIE=tolerantie))
+
+    threads = [threading.Thread(target=scan, args=(naam, tolerantie)) for naam, tolerantie in (("a", 0.05), ("b", 1.0))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(aanroepen) == [
+        ("a-1", "prijzenboek a", 0.05), ("a-2", "prijzenboek a", 0.05),
+        ("b-1", "prijzenboek b", 1.0), ("b-2", "prijzenboek b", 1.0),
+    ]
+    assert verwerking._worker_context == {}